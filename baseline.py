@@ -0,0 +1,197 @@
+"""
+Baseline forecasts.
+Closed-form models that run in milliseconds on the same prepared history and
+horizon as the Prophet fit: seasonal naive, a moving average plus seasonal
+profile, and a least-squares linear trend with Fourier seasonality. The app
+shows the best of them as a preview while Prophet fits and keeps their
+holdout errors as an accuracy reference; batch runs can use them instead of
+Prophet for short series where a Stan fit is not worth the CPU.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import detect_frequency
+
+BASELINE_MODELS = {
+    "seasonal_naive": "Seasonal naive",
+    "moving_average": "Moving average + seasonal profile",
+    "fourier": "Least-squares trend + Fourier",
+}
+
+# z for an 80% interval, Prophet's default interval_width
+INTERVAL_Z = 1.2816
+
+# Share of the history held out to score the baselines
+HOLDOUT_FRACTION = 0.2
+
+# Prophet's default Fourier orders and the history span (days) each needs
+_FOURIER_TERMS = [(365.25, 10, 730), (7.0, 3, 14), (1.0, 4, 2)]
+
+_DAY_NS = 86400 * 10**9
+
+
+def season_length(step):
+    """Seasonal cycle (Timedelta) for a sampling step: daily for sub-daily, weekly for daily, else yearly."""
+    if step is not None and step < pd.Timedelta(days=1):
+        return pd.Timedelta(days=1)
+    if step is not None and step < pd.Timedelta(days=7):
+        return pd.Timedelta(days=7)
+    return pd.Timedelta(days=365.25)
+
+
+def future_dates(last_date, forecast_periods, forecast_freq):
+    """The dates make_future_dataframe would add after last_date."""
+    dates = pd.date_range(start=last_date, periods=int(forecast_periods) + 1, freq=forecast_freq)
+    return dates[dates > last_date][:int(forecast_periods)]
+
+
+def _nearest(ds, values, query):
+    """values at the ds (int64 ns, sorted) nearest to each query time."""
+    right = np.clip(np.searchsorted(ds, query), 1, len(ds) - 1)
+    left = right - 1
+    index = np.where(query - ds[left] <= ds[right] - query, left, right)
+    return values[index]
+
+
+def _buckets(ds, season, n_buckets):
+    """Position of each time within the seasonal cycle, as one of n_buckets bins."""
+    phase = np.mod(ds, season) / season
+    return np.minimum((phase * n_buckets).astype(np.int64), n_buckets - 1)
+
+
+def seasonal_naive(ds, y, query, season):
+    """Last observed value one or more whole seasons back.
+
+    Returns (fitted, yhat, spread): in-sample fit, forecast at query times
+    (all int64 ns) and the forecast standard deviation, which grows with the
+    square root of the number of seasons ahead.
+    """
+    if ds[-1] - ds[0] < season:
+        # Less than one season: naive (last value)
+        fitted = np.concatenate([[np.nan], y[:-1]])
+        residual_sd = np.nanstd(np.diff(y)) if len(y) > 2 else 0.0
+        yhat = np.full(len(query), y[-1])
+        return fitted, yhat, residual_sd * np.sqrt(np.arange(1, len(query) + 1))
+    seasons_ahead = np.maximum(np.ceil((query - ds[-1]) / season), 1)
+    yhat = _nearest(ds, y, query - seasons_ahead * season)
+    fitted = np.where(ds - season >= ds[0], _nearest(ds, y, ds - season), np.nan)
+    residual_sd = np.nanstd(y - fitted)
+    return fitted, yhat, residual_sd * np.sqrt(seasons_ahead)
+
+
+def moving_average(ds, y, query, season, step):
+    """Level of the last season plus the average deviation of each phase from a centered moving average."""
+    n_buckets = int(max(1, min(round(season / step), len(y) // 2)))
+    centered = pd.Series(y).rolling(n_buckets, center=True, min_periods=1).mean().to_numpy()
+    history_buckets = _buckets(ds, season, n_buckets)
+    deviation = y - centered
+    sums = np.bincount(history_buckets, weights=deviation, minlength=n_buckets)
+    counts = np.bincount(history_buckets, minlength=n_buckets)
+    profile = np.divide(sums, counts, out=np.zeros(n_buckets), where=counts > 0)
+    profile -= profile[counts > 0].mean()
+    level = y[-n_buckets:].mean() - profile[history_buckets[-n_buckets:]].mean()
+    fitted = centered + profile[history_buckets]
+    yhat = level + profile[_buckets(query, season, n_buckets)]
+    return fitted, yhat, np.full(len(query), np.std(y - fitted))
+
+
+def fourier_design(ds, origin, span, step):
+    """Intercept, linear trend and Prophet-style Fourier terms for the seasonalities the history supports."""
+    days = (ds - origin) / _DAY_NS
+    columns = [np.ones(len(ds)), days / max(span, 1.0)]
+    for period, order, min_span in _FOURIER_TERMS:
+        if span < min_span or step >= period * _DAY_NS:
+            continue
+        angles = 2 * np.pi * np.outer(days / period, np.arange(1, order + 1))
+        columns.extend([np.sin(angles), np.cos(angles)])
+    return np.column_stack(columns)
+
+
+def fourier(ds, y, query, step):
+    """Linear trend plus Fourier seasonality, fitted by least squares in one solve."""
+    span = (ds[-1] - ds[0]) / _DAY_NS
+    X = fourier_design(ds, ds[0], span, step)
+    if X.shape[1] >= len(y):
+        # Too few rows for the seasonal terms: trend only
+        X = X[:, :2]
+    beta, *_ = np.linalg.lstsq(X, y, rcond=None)
+    fitted = X @ beta
+    yhat = fourier_design(query, ds[0], span, step)[:, :X.shape[1]] @ beta
+    return fitted, yhat, np.full(len(query), np.std(y - fitted))
+
+
+def _fit_predict(model, ds, y, query):
+    """(fitted, yhat, spread) of one baseline model on int64 ns times."""
+    step = detect_frequency(pd.Series(ds.view('datetime64[ns]')))["step"]
+    step_ns = step.value if step is not None else _DAY_NS
+    season = season_length(step).value
+    if model == "seasonal_naive":
+        return seasonal_naive(ds, y, query, season)
+    if model == "moving_average":
+        return moving_average(ds, y, query, season, step_ns)
+    if model == "fourier":
+        return fourier(ds, y, query, step_ns)
+    raise ValueError(f"Unknown baseline model '{model}'")
+
+
+def forecast_errors(actual, predicted):
+    """(MAE, sMAPE in %) of predicted against actual, ignoring missing predictions."""
+    errors = np.abs(actual - predicted)
+    denominator = np.abs(actual) + np.abs(predicted)
+    smape = np.divide(2 * errors, denominator, out=np.zeros_like(errors), where=denominator > 0)
+    smape[np.isnan(errors)] = np.nan
+    return float(np.nanmean(errors)), float(100 * np.nanmean(smape))
+
+
+def baseline_scores(prepared_df, holdout_fraction=HOLDOUT_FRACTION):
+    """Holdout error of every baseline: fit on the history before the last holdout_fraction, score on it.
+
+    Returns a frame with model, label, mae, smape (%), holdout_rows and ms,
+    best (lowest MAE) first; empty if the history is too short to hold out.
+    """
+    ds = prepared_df['ds'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    y = prepared_df['y'].to_numpy(dtype=float)
+    n_holdout = int(len(y) * holdout_fraction)
+    if n_holdout < 1 or len(y) - n_holdout < 4:
+        return pd.DataFrame(columns=["model", "label", "mae", "smape", "holdout_rows", "ms"])
+    train, test = slice(None, -n_holdout), slice(-n_holdout, None)
+    rows = []
+    for model, label in BASELINE_MODELS.items():
+        start = time.perf_counter()
+        _, yhat, _ = _fit_predict(model, ds[train], y[train], ds[test])
+        mae, smape = forecast_errors(y[test], yhat)
+        rows.append({
+            "model": model, "label": label, "mae": mae, "smape": smape, "holdout_rows": n_holdout,
+            "ms": round(1000 * (time.perf_counter() - start), 2),
+        })
+    return pd.DataFrame(rows).sort_values("mae", kind="stable").reset_index(drop=True)
+
+
+def baseline_forecast(prepared_df, forecast_periods, forecast_freq, model="auto", scores=None):
+    """Baseline forecast over the history and horizon (ds, yhat, yhat_lower, yhat_upper).
+
+    model "auto" picks the lowest holdout MAE (see baseline_scores, which
+    may be passed in); seasonal naive if the history is too short to score.
+    Returns (forecast, model).
+    """
+    if model == "auto":
+        if scores is None:
+            scores = baseline_scores(prepared_df)
+        model = scores["model"].iloc[0] if len(scores) else "seasonal_naive"
+    ds = prepared_df['ds'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    y = prepared_df['y'].to_numpy(dtype=float)
+    future = future_dates(prepared_df['ds'].iloc[-1], forecast_periods, forecast_freq)
+    fitted, yhat, spread = _fit_predict(model, ds, y, future.asi8)
+
+    in_sample_sd = np.nanstd(y - fitted)
+    forecast = pd.DataFrame({
+        'ds': np.concatenate([prepared_df['ds'].to_numpy(dtype='datetime64[ns]'), future.to_numpy()]),
+        'yhat': np.concatenate([fitted, yhat]),
+    })
+    spread = np.concatenate([np.full(len(y), in_sample_sd), spread])
+    forecast['yhat_lower'] = forecast['yhat'] - INTERVAL_Z * spread
+    forecast['yhat_upper'] = forecast['yhat'] + INTERVAL_Z * spread
+    return forecast, model
@@ -0,0 +1,180 @@
+"""
+Multi-series batch forecasting.
+Splits a long-format upload (series key, ds, y) into one frame per series and
+fits every series on a process pool, yielding results as they complete.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from forecast_engine import validate_csv, prepare_data, fit_prophet, quiet_stan_logging
+from preprocessing import preprocess
+from uncertainty import predict_forecast
+
+# Column names recognised as the series key, in order of preference
+SERIES_COLUMN_CANDIDATES = ["series_id", "series", "unique_id", "key", "store_id", "market_id"]
+
+
+def default_worker_count():
+    """Number of worker processes to use when none is configured."""
+    return os.cpu_count() or 1
+
+
+def detect_series_column(columns):
+    """Return the first recognised series key among columns, or None."""
+    for col in SERIES_COLUMN_CANDIDATES:
+        if col in columns:
+            return col
+    return None
+
+
+def split_series(df, series_col):
+    """Split a long-format frame into (series_key, frame) pairs."""
+    return [
+        (key, group[['ds', 'y']])
+        for key, group in df.groupby(series_col, sort=False)
+    ]
+
+
+def _init_worker():
+    """Silence per-fit Stan logging inside pool workers."""
+    quiet_stan_logging()
+
+
+def fit_series(key, series_df, model_params, forecast_periods, forecast_freq,
+               country_code=None, holidays_df=None, preprocess_options=None,
+               warm_start=False, predict_options=None, baseline_below_rows=0):
+    """Validate, prepare, preprocess, fit and predict one series.
+
+    Errors are returned rather than raised so one bad series does not abort
+    the batch. predict_options (chunk_rows, include_history) switch to chunked
+    prediction (streaming_predict.py); series with fewer than
+    baseline_below_rows prepared rows get the best baseline (baseline.py)
+    instead of a Prophet fit. Returns a dict with key, forecast, rows,
+    seconds, error and model.
+    """
+    start = time.perf_counter()
+    result = {
+        "key": key, "forecast": None, "rows": len(series_df), "seconds": 0.0,
+        "error": None, "warm_start": False, "model": "prophet",
+    }
+    try:
+        is_valid, message = validate_csv(series_df)
+        if not is_valid:
+            result["error"] = message
+            return result
+        prepared_df = prepare_data(series_df)
+        if preprocess_options:
+            prepared_df, _ = preprocess(prepared_df, **preprocess_options)
+        if len(prepared_df) < 2:
+            result["error"] = "Series has fewer than 2 non-null rows"
+            return result
+        if len(prepared_df) < baseline_below_rows:
+            # Too little data to be worth a Stan fit
+            from baseline import baseline_forecast
+
+            result["forecast"], result["model"] = baseline_forecast(
+                prepared_df, forecast_periods, forecast_freq
+            )
+            return result
+        if warm_start:
+            # Imported here: warm_start pulls in prophet.serialize
+            from warm_start import warm_fit
+
+            m, warm_rows = warm_fit(
+                prepared_df, model_params, forecast_periods, forecast_freq,
+                country_code=country_code, holidays_df=holidays_df
+            )
+            result["warm_start"] = warm_rows > 0
+        else:
+            m = fit_prophet(
+                prepared_df, model_params, forecast_periods, forecast_freq,
+                country_code=country_code, holidays_df=holidays_df
+            )
+        if predict_options:
+            # Bounded chunks: the interval simulation never holds the whole horizon
+            from streaming_predict import predict_chunks
+
+            forecast = pd.concat(
+                list(predict_chunks(m, forecast_periods, forecast_freq, **predict_options)),
+                ignore_index=True
+            )
+        else:
+            future = m.make_future_dataframe(periods=forecast_periods, freq=forecast_freq)
+            forecast = predict_forecast(m, future)
+        result["forecast"] = forecast
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_batch_forecast(df, series_col, model_params, forecast_periods, forecast_freq,
+                       country_code=None, holidays_df=None, max_workers=None,
+                       preprocess_options=None, warm_start=False, predict_options=None,
+                       baseline_below_rows=0):
+    """Fit every series in df on a process pool.
+
+    Generator: yields one result dict (see fit_series) per series in
+    completion order, so callers can stream progress and partial output.
+    """
+    series = split_series(df, series_col)
+    max_workers = max(1, min(max_workers or default_worker_count(), len(series) or 1))
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+        futures = [
+            executor.submit(
+                fit_series, key, series_df, model_params, forecast_periods, forecast_freq,
+                country_code, holidays_df, preprocess_options, warm_start, predict_options,
+                baseline_below_rows
+            )
+            for key, series_df in series
+        ]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Drop queued work if the consumer stops early (e.g. Streamlit rerun)
+            for future in futures:
+                future.cancel()
+
+
+def combine_forecasts(results, series_col, history_end=None):
+    """Concatenate per-series forecasts into one long-format frame.
+
+    If history_end is a mapping of series key -> last observed ds, only
+    future rows are kept for each series.
+    """
+    frames = []
+    for result in results:
+        forecast = result["forecast"]
+        if forecast is None:
+            continue
+        if history_end is not None and result["key"] in history_end:
+            forecast = forecast[forecast['ds'] > history_end[result["key"]]]
+        forecast = forecast.copy()
+        forecast.insert(0, series_col, result["key"])
+        frames.append(forecast)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def summarize_results(results):
+    """One row per series with status, row count and fit time."""
+    return pd.DataFrame([
+        {
+            "series": r["key"],
+            "status": "failed" if r["error"] else "ok",
+            "model": r.get("model", "prophet"),
+            "rows": r["rows"],
+            "fit_seconds": round(r["seconds"], 2),
+            "warm_start": r.get("warm_start", False),
+            "error": r["error"] or "",
+        }
+        for r in results
+    ])
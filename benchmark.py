@@ -0,0 +1,322 @@
+"""
+Benchmark suite for the forecast pipeline.
+Generates synthetic series (trend, weekly/yearly seasonality, holiday
+effects, noise) over a size matrix and times every stage of the app's flow
+separately: read_csv, validate_csv, prepare_data, fit, make_future_dataframe,
+predict, plot_plotly and CSV export. Wall time and peak memory per stage are
+written to JSON; compared against a saved baseline, slower stages are
+flagged as regressions.
+
+Usage:
+    python benchmark.py --preset quick --save-baseline
+    python benchmark.py --preset quick --baseline benchmark_baseline.json
+    python benchmark.py --span 10y --freq h --series 1 --output hourly.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from forecast_engine import (
+    DEFAULT_MODEL_PARAMS, validate_csv, prepare_data, build_model, holiday_year_span,
+    export_frame, quiet_stan_logging
+)
+
+# History lengths in days
+SPANS = {"90d": 90, "1y": 365, "3y": 1095, "10y": 3650}
+
+# Sampling frequencies (pandas offset aliases) -> samples per day
+FREQS = {"D": 1, "h": 24}
+
+SERIES_COUNTS = [1, 10, 100, 1000]
+
+PRESETS = {
+    "quick": {"spans": ["90d", "1y"], "freqs": ["D"], "series": [1, 10]},
+    "standard": {"spans": ["90d", "1y", "3y"], "freqs": ["D", "h"], "series": [1, 10, 100]},
+    "full": {"spans": list(SPANS), "freqs": list(FREQS), "series": SERIES_COUNTS},
+}
+
+STAGES = [
+    "read_csv", "validate_csv", "prepare_data", "fit", "make_future_dataframe",
+    "predict", "plot_plotly", "csv_export",
+]
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+# A stage regresses when it is this much slower than baseline...
+DEFAULT_THRESHOLD = 0.25
+# ...and at least this many seconds slower (ignores timer noise on tiny stages)
+MIN_REGRESSION_SECONDS = 0.05
+
+HOLIDAY_DATES = ["01-01", "07-04", "11-25", "12-25"]
+
+
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def case_id(span, freq, n_series):
+    return f"{span}-{freq}-{n_series}"
+
+
+def synthetic_series(span, freq, n_series, seed=0):
+    """Long-format frame (series_id, ds, y) with trend, seasonality and holidays."""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp("2024-12-31")
+    ds = pd.date_range(end=end, periods=SPANS[span] * FREQS[freq], freq=freq)
+    t = np.asarray((ds - ds[0]) / pd.Timedelta(days=1), dtype=np.float64)
+    weekly = np.sin(2 * np.pi * t / 7)
+    yearly = np.sin(2 * np.pi * t / 365.25)
+    daily = np.sin(2 * np.pi * t) if freq != "D" else 0.0
+    holiday = np.isin(ds.strftime("%m-%d"), HOLIDAY_DATES).astype(np.float64)
+
+    frames = []
+    for i in range(n_series):
+        level = 10 + 5 * rng.random()
+        y = (
+            level + 0.002 * t * rng.normal(1, 0.2)
+            + 2 * weekly + 3 * yearly + daily + 4 * holiday
+            + rng.normal(0, 0.5, len(ds))
+        )
+        frames.append(pd.DataFrame({"series_id": f"s{i:04d}", "ds": ds, "y": y}))
+    return pd.concat(frames, ignore_index=True)
+
+
+class StageTimer:
+    """Accumulates wall time, or peak traced memory, per stage."""
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.stages = {}
+
+    def run(self, stage, func, *args, **kwargs):
+        entry = self.stages.setdefault(stage, {"seconds": 0.0, "peak_mb": 0.0})
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            result = func(*args, **kwargs)
+            peak = (tracemalloc.get_traced_memory()[1] - base) / (1024 * 1024)
+            entry["peak_mb"] = max(entry["peak_mb"], peak)
+            return result
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        entry["seconds"] += time.perf_counter() - start
+        return result
+
+
+def _fit(model, df):
+    model.fit(df)
+    return model
+
+
+def _run_pipeline(path, freq, horizon, timer, max_fits=None):
+    """The app's single-series flow, stage by stage, for every series in path.
+
+    Returns (rows, series_count, fitted_count).
+    """
+    from prophet.plot import plot_plotly
+
+    model_params = {**DEFAULT_MODEL_PARAMS, "daily_seasonality": freq != "D"}
+
+    raw = timer.run("read_csv", pd.read_csv, path)
+    is_valid, message = timer.run("validate_csv", validate_csv, raw)
+    if not is_valid:
+        raise ValueError(message)
+
+    groups = list(raw.groupby("series_id", sort=False))
+    n_fits = len(groups) if max_fits is None else min(max_fits, len(groups))
+    for i, (_, series_df) in enumerate(groups):
+        prepared = timer.run("prepare_data", prepare_data, series_df)
+        if i >= n_fits:
+            continue
+        model = build_model(
+            model_params, country_code="US",
+            holiday_years=holiday_year_span(prepared, horizon, freq)
+        )
+        timer.run("fit", _fit, model, prepared)
+        future = timer.run("make_future_dataframe", model.make_future_dataframe, periods=horizon, freq=freq)
+        forecast = timer.run("predict", model.predict, future)
+        timer.run("plot_plotly", plot_plotly, model, forecast)
+        timer.run(
+            "csv_export",
+            lambda: export_frame(forecast, history_end=prepared["ds"].max()).to_csv(io.StringIO(), index=False)
+        )
+    return len(raw), len(groups), n_fits
+
+
+def run_case(span, freq, n_series, horizon=90, max_fits=None, track_memory=True, workdir=None):
+    """Time every pipeline stage for one size; returns the case's result dict.
+
+    Wall times come from an untraced pass. With track_memory, a second pass
+    under tracemalloc (one fitted series; per-series stages are alike)
+    records each stage's peak Python allocation.
+    """
+    data = synthetic_series(span, freq, n_series)
+    path = os.path.join(workdir or tempfile.gettempdir(), f"bench-{case_id(span, freq, n_series)}.csv")
+    data.assign(ds=data["ds"].dt.strftime("%Y-%m-%d %H:%M:%S")).to_csv(path, index=False)
+
+    timer = StageTimer()
+    rows, n_groups, n_fits = _run_pipeline(path, freq, horizon, timer, max_fits)
+    # Per-series stages measured on a sample are scaled to every series
+    if n_fits and n_fits < n_groups:
+        for stage in STAGES[3:]:
+            timer.stages[stage]["seconds"] *= n_groups / n_fits
+
+    memory = StageTimer(track_memory=True)
+    if track_memory:
+        tracemalloc.start()
+        try:
+            _run_pipeline(path, freq, horizon, memory, max_fits=1)
+        finally:
+            tracemalloc.stop()
+    os.remove(path)
+
+    stages = {
+        stage: {
+            "seconds": round(timer.stages[stage]["seconds"], 4),
+            "peak_mb": round(memory.stages.get(stage, {}).get("peak_mb", 0.0), 2),
+        }
+        for stage in STAGES
+    }
+    return {
+        "span": span,
+        "freq": freq,
+        "series": n_series,
+        "rows": rows,
+        "fitted_series": n_fits,
+        "stages": stages,
+        "total_seconds": round(sum(s["seconds"] for s in stages.values()), 4),
+        "peak_mb": round(max(s["peak_mb"] for s in stages.values()), 2),
+    }
+
+
+def run_benchmarks(spans, freqs, series_counts, horizon=90, max_fits=None, track_memory=True):
+    """Run every case in the matrix; returns the full report dict."""
+    import prophet
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "prophet": prophet.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "horizon": horizon,
+        "max_fits": max_fits,
+        "cases": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for span in spans:
+            for freq in freqs:
+                for n_series in series_counts:
+                    cid = case_id(span, freq, n_series)
+                    _log(f"Running {cid}...")
+                    result = run_case(span, freq, n_series, horizon, max_fits, track_memory, workdir)
+                    report["cases"][cid] = result
+                    _log(f"  {result['rows']:,} rows: {result['total_seconds']:.2f}s, peak {result['peak_mb']:.1f} MB")
+    return report
+
+
+def compare_to_baseline(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """List of regressions: stages slower than baseline by more than threshold."""
+    regressions = []
+    for cid, case in report["cases"].items():
+        base_case = baseline.get("cases", {}).get(cid)
+        if base_case is None:
+            continue
+        for stage, current in case["stages"].items():
+            before = base_case["stages"].get(stage)
+            if before is None:
+                continue
+            slower = current["seconds"] - before["seconds"]
+            if slower > MIN_REGRESSION_SECONDS and current["seconds"] > before["seconds"] * (1 + threshold):
+                regressions.append({
+                    "case": cid,
+                    "stage": stage,
+                    "baseline_seconds": before["seconds"],
+                    "seconds": current["seconds"],
+                    "ratio": round(current["seconds"] / before["seconds"], 2) if before["seconds"] else None,
+                })
+    return regressions
+
+
+def print_summary(report):
+    rows = []
+    for cid, case in report["cases"].items():
+        row = {"case": cid, "rows": case["rows"]}
+        row.update({stage: case["stages"][stage]["seconds"] for stage in STAGES})
+        row["total"] = case["total_seconds"]
+        row["peak_mb"] = case["peak_mb"]
+        rows.append(row)
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="benchmark",
+        description="Time each stage of the forecast pipeline over synthetic series."
+    )
+    parser.add_argument("--preset", choices=list(PRESETS), default="quick", help="Size matrix to run (default: quick)")
+    parser.add_argument("--span", action="append", choices=list(SPANS), help="History length(s); overrides the preset")
+    parser.add_argument("--freq", action="append", choices=list(FREQS), help="Sampling frequency(ies); overrides the preset")
+    parser.add_argument("--series", action="append", type=int, help="Series count(s); overrides the preset")
+    parser.add_argument("--horizon", type=int, default=90, help="Forecast periods (default: 90)")
+    parser.add_argument("--max-fits", type=int, help="Fit at most this many series per case and scale the per-series stages")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass (no peak_mb)")
+    parser.add_argument("--output", help="Write the report JSON here (default: benchmark_<timestamp>.json)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help=f"Baseline JSON to compare against (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the report as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative slowdown flagged as a regression (default: 0.25)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    preset = PRESETS[args.preset]
+    quiet_stan_logging()
+
+    report = run_benchmarks(
+        args.span or preset["spans"], args.freq or preset["freqs"], args.series or preset["series"],
+        horizon=args.horizon, max_fits=args.max_fits, track_memory=not args.no_memory
+    )
+    print_summary(report)
+
+    output = args.output or f"benchmark_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    _log(f"Wrote {output}")
+
+    exit_code = 0
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.threshold)
+        for r in regressions:
+            _log(
+                f"REGRESSION {r['case']} {r['stage']}: {r['baseline_seconds']:.3f}s -> "
+                f"{r['seconds']:.3f}s ({r['ratio']}x)"
+            )
+        if regressions:
+            exit_code = 1
+        else:
+            _log(f"No regressions against {args.baseline}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        _log(f"Saved baseline to {args.baseline}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
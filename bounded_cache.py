@@ -0,0 +1,127 @@
+"""
+Memory-bounded LRU shared by the in-process caches.
+Entries carry their approximate size in bytes; the least-recently-used are
+evicted once the total passes the memory limit (the newest entry is always
+kept), and with a TTL entries unused for that long expire. Thread-safe.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class BoundedLRU:
+    """Thread-safe LRU of values bounded by their total size in bytes, with an optional TTL."""
+
+    def __init__(self, memory_limit_mb, ttl_seconds=None):
+        self.memory_limit = int(memory_limit_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> [value, nbytes, last_used]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def get(self, key):
+        """The value stored under key (marking it recently used), or None."""
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._touch(key, entry, now)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        """Store value under key, replacing any existing entry."""
+        now = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = [value, nbytes, now]
+            self._bytes += nbytes
+            self._evict(now)
+
+    def get_or_build(self, key, build, sizeof):
+        """(value, hit): the value for key, or build() stored under it with size sizeof(value).
+
+        build runs outside the lock; if another thread stored key meanwhile,
+        the stored value is kept and returned.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        value = build()
+        nbytes = sizeof(value)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._touch(key, entry, now)
+                return entry[0], False
+            self._entries[key] = [value, nbytes, now]
+            self._bytes += nbytes
+            self._evict(now)
+        return value, False
+
+    def nbytes(self, key):
+        """Size recorded for key, or 0 if it is not stored."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else 0
+
+    def items(self):
+        """Snapshot list of (key, value, nbytes), least recently used first."""
+        with self._lock:
+            self._evict(time.time())
+            return [(key, value, nbytes) for key, (value, nbytes, _) in self._entries.items()]
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evicted = self.expired = 0
+
+    def stats(self):
+        """Entry count, memory use and counters."""
+        with self._lock:
+            self._evict(time.time())
+            return {
+                "entries": len(self._entries),
+                "memory_mb": self._bytes / (1024 * 1024),
+                "limit_mb": self.memory_limit / (1024 * 1024),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    # Caller holds the lock
+
+    def _touch(self, key, entry, now):
+        entry[2] = now
+        self._entries.move_to_end(key)
+
+    def _evict(self, now):
+        # Oldest-used entries are at the front
+        if self.ttl_seconds is not None:
+            while self._entries:
+                key, entry = next(iter(self._entries.items()))
+                if now - entry[2] <= self.ttl_seconds:
+                    break
+                self._bytes -= self._entries.pop(key)[1]
+                self.expired += 1
+        while self._bytes > self.memory_limit and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry[1]
+            self.evicted += 1
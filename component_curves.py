@@ -0,0 +1,158 @@
+"""
+Forecast component curves and figure.
+Replaces Prophet's plot_components_plotly, which rebuilds the full seasonal
+design matrix and predicts every component once per seasonality it plots
+(over up to a year of minutes for minute data). Here each seasonality is
+evaluated once over a single period, from its own Fourier features and
+coefficients in one matrix product; trend, holidays and regressors come
+from the forecast frame, downsampled to the point budget.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from plot_rendering import DEFAULT_POINT_BUDGET, decimate
+
+# Points per seasonality curve at most (Prophet uses one per day/hour/minute)
+MAX_SEASONALITY_POINTS = 2000
+
+# Seasonal curves start here, as in Prophet's plots
+SEASONALITY_START = pd.Timestamp("2017-01-01")
+
+_LINE_COLOR = "#0072B2"
+_BAND_COLOR = "rgba(0, 114, 178, 0.2)"
+_PANEL_HEIGHT = 200
+
+
+def _plot_points(m, period):
+    """Points over one period at the history's time precision, capped."""
+    ds = m.history['ds']
+    if (ds.dt.hour == 0).all():
+        points = np.floor(period)
+    elif (ds.dt.minute == 0).all():
+        points = np.floor(period * 24)
+    else:
+        points = np.floor(period * 24 * 60)
+    return int(min(max(points, 2), MAX_SEASONALITY_POINTS))
+
+
+def seasonality_curve(m, name):
+    """One period of a fitted seasonality: dict with ds, y, lower and upper.
+
+    Same values as Prophet's predict_seasonal_components on a single-period
+    grid (conditions treated as met), computed from this seasonality's
+    coefficients only. Multiplicative seasonalities are fractions.
+    """
+    props = m.seasonalities[name]
+    period = props['period']
+    n_points = _plot_points(m, period)
+    end = SEASONALITY_START + pd.Timedelta(days=period)
+    ds = pd.Series(pd.to_datetime(
+        np.linspace(SEASONALITY_START.value, end.value, n_points, endpoint=False)
+    ))
+    features = m.fourier_series(ds, period, props['fourier_order'])
+    # Rows of train_component_cols are feature positions; this seasonality's are in feature order
+    beta_index = np.flatnonzero(m.train_component_cols[name].to_numpy())
+    values = features @ np.atleast_2d(m.params['beta'])[:, beta_index].T  # points x draws
+    if props['mode'] == 'additive':
+        values = values * m.y_scale
+    y = values.mean(axis=1)
+    if values.shape[1] == 1:
+        # MAP fit: a single coefficient draw, no interval
+        return {"ds": ds, "y": y, "lower": y, "upper": y}
+    lower_p = 100 * (1.0 - m.interval_width) / 2
+    lower, upper = np.percentile(values, [lower_p, 100 - lower_p], axis=1)
+    return {"ds": ds, "y": y, "lower": lower, "upper": upper}
+
+
+def component_curves(m, forecast, point_budget=DEFAULT_POINT_BUDGET):
+    """Curves for every component Prophet would plot, in Prophet's order.
+
+    Returns a list of dicts: name, kind ("forecast" or "seasonality"),
+    ds, y, lower, upper, multiplicative and (seasonalities) period.
+    """
+    names = ['trend']
+    if m.train_holiday_names is not None and 'holidays' in forecast:
+        names.append('holidays')
+    for mode in ('additive', 'multiplicative'):
+        column = f'extra_regressors_{mode}'
+        if any(props['mode'] == mode for props in m.extra_regressors.values()) and column in forecast:
+            names.append(column)
+
+    forecast = forecast.sort_values('ds')
+    curves = []
+    for name in names:
+        cols = ['ds', name] + [c for c in (f'{name}_lower', f'{name}_upper', 'cap') if c in forecast.columns]
+        frame = decimate(forecast[cols], name, point_budget)
+        curves.append({
+            "name": name,
+            "kind": "forecast",
+            "ds": frame['ds'],
+            "y": frame[name].to_numpy(),
+            "lower": frame[f'{name}_lower'].to_numpy() if f'{name}_lower' in frame else None,
+            "upper": frame[f'{name}_upper'].to_numpy() if f'{name}_upper' in frame else None,
+            "cap": frame['cap'].to_numpy() if name == 'trend' and 'cap' in frame else None,
+            "multiplicative": name == 'extra_regressors_multiplicative',
+        })
+    for name, props in m.seasonalities.items():
+        curves.append({
+            "name": name,
+            "kind": "seasonality",
+            "period": props['period'],
+            "multiplicative": props['mode'] == 'multiplicative',
+            **seasonality_curve(m, name),
+        })
+    return curves
+
+
+def _tickformat(period):
+    if period <= 2:
+        return '%H:%M'
+    if period < 7:
+        return '%A %H:%M'
+    if period < 14:
+        return '%A'
+    return '%B %e'
+
+
+def build_components_figure(curves, show_uncertainty=True):
+    """Stacked component panels (one per curve) in the style of Prophet's plot."""
+    fig = make_subplots(rows=len(curves), cols=1, print_grid=False)
+    for row, curve in enumerate(curves, start=1):
+        # Long forecast-length curves are drawn with WebGL
+        scatter = go.Scattergl if len(curve["y"]) > DEFAULT_POINT_BUDGET else go.Scatter
+        x = curve["ds"]
+        fig.add_trace(scatter(
+            x=x, y=curve["y"], mode='lines', name=curve["name"],
+            line=dict(color=_LINE_COLOR, width=2)
+        ), row=row, col=1)
+        if (show_uncertainty and curve["lower"] is not None and curve["upper"] is not None
+                and not np.array_equal(curve["lower"], curve["upper"])):
+            fig.add_trace(scatter(
+                x=x, y=curve["upper"], mode='lines', name=f'{curve["name"]}_upper',
+                line=dict(width=0, color=_BAND_COLOR), hoverinfo='skip'
+            ), row=row, col=1)
+            fig.add_trace(scatter(
+                x=x, y=curve["lower"], mode='lines', name=f'{curve["name"]}_lower',
+                line=dict(width=0, color=_BAND_COLOR), fill='tonexty', fillcolor=_BAND_COLOR
+            ), row=row, col=1)
+        if curve.get("cap") is not None:
+            fig.add_trace(scatter(
+                x=x, y=curve["cap"], mode='lines', name='cap',
+                line=dict(color='black', dash='dash', width=2)
+            ), row=row, col=1)
+
+        yaxis = dict(title_text=curve["name"], zerolinecolor='#AAA')
+        if curve["multiplicative"]:
+            yaxis.update(tickformat='%', hoverformat='.2%')
+        fig.update_yaxes(row=row, col=1, **yaxis)
+        if curve["kind"] == "seasonality":
+            margin = (x.iloc[-1] - x.iloc[0]) * 0.05
+            fig.update_xaxes(
+                row=row, col=1, type='date', tickformat=_tickformat(curve["period"]),
+                range=[x.iloc[0] - margin, x.iloc[-1] + margin]
+            )
+    fig.update_layout(showlegend=False, height=_PANEL_HEIGHT * len(curves))
+    return fig
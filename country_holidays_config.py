@@ -1,8 +1,12 @@
 """
 Country code to display name mapping for Prophet country holidays.
 Uses ISO 3166-1 alpha-2 codes. Names are common/official for user-friendly dropdown.
+Choice lists are built once per process (Streamlit reruns the script on every
+widget interaction).
 """
 
+from functools import lru_cache
+
 # ISO 3166-1 alpha-2 code -> display name (common name for dropdown)
 # Prophet uses python-holidays which supports these codes.
 COUNTRY_CODE_TO_NAME = {
@@ -258,17 +262,27 @@ COUNTRY_CODE_TO_NAME = {
 }
 
 
+@lru_cache(maxsize=1)
+def _supported_countries():
+    """{code: [subdivision codes]} from the holidays package, or None if unavailable."""
+    try:
+        import holidays as hl
+        return hl.list_supported_countries()
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=1)
 def get_country_holiday_choices():
     """
     Returns a list of (display_name, country_code) for the dropdown.
     US is first, then None (no country holidays), then all others sorted by display name.
     Only includes countries supported by the holidays package if available.
     """
-    try:
-        import holidays as hl
-        supported = hl.list_supported_countries()
+    supported = _supported_countries()
+    if supported is not None:
         supported_two_letter = sorted([c for c in supported if len(c) == 2])
-    except Exception:
+    else:
         supported_two_letter = sorted(COUNTRY_CODE_TO_NAME.keys())
 
     # Build (name, code) for all supported; use code as fallback if name missing
@@ -286,3 +300,25 @@ def get_country_holiday_choices():
     others = [(n, c) for (n, c) in name_code_pairs if c != "US"]
 
     return [us_option, none_option] + others
+
+
+@lru_cache(maxsize=None)
+def get_subdivision_choices(country_code):
+    """
+    Returns a list of (display_name, subdivision_code) for a country.
+    "Nationwide" (None) comes first; empty list if the country has no subdivisions.
+    """
+    supported = _supported_countries()
+    if not supported or not supported.get(country_code):
+        return []
+    try:
+        import holidays as hl
+        aliases = hl.country_holidays(country_code).subdivisions_aliases
+        code_to_name = {code: name for name, code in aliases.items()}
+    except Exception:
+        code_to_name = {}
+    subdivisions = [
+        (f"{code_to_name[code]} ({code})" if code in code_to_name else code, code)
+        for code in supported[country_code]
+    ]
+    return [("Nationwide", None)] + subdivisions
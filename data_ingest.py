@@ -0,0 +1,223 @@
+"""
+Input ingestion for forecast data.
+Reads CSV (pyarrow engine when available), Parquet and Feather files,
+projecting only the needed columns, and parses the 'ds' column exactly once
+with an explicit date format inferred from that column. Uploads are
+fingerprinted by content so ingest results can be memoized across reruns
+(IngestCache).
+"""
+
+import hashlib
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from bounded_cache import BoundedLRU
+
+# File extensions accepted by the uploader and CLI
+SUPPORTED_UPLOAD_TYPES = ['csv', 'parquet', 'pq', 'feather', 'arrow']
+
+# Explicit dtypes applied on read (ds is parsed separately by parse_ds)
+COLUMN_DTYPES = {'y': 'float64'}
+
+DEFAULT_INGEST_CACHE_MB = 512
+
+# Formats tried when pandas cannot guess one (e.g. ambiguous M/D/YY dates)
+FALLBACK_DATE_FORMATS = ['%m/%d/%y', '%m/%d/%Y', '%d/%m/%Y', '%d/%m/%y', '%Y/%m/%d', '%m/%d/%Y %H:%M']
+
+# Values, spread over the column, that every candidate date format must parse
+FORMAT_SAMPLE_SIZE = 100
+
+
+def pyarrow_available():
+    """Whether the pyarrow CSV engine / Parquet support can be used."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def detect_format(name):
+    """Map a file name to 'csv', 'parquet' or 'feather' (default 'csv')."""
+    ext = os.path.splitext(str(name or ''))[1].lower().lstrip('.')
+    if ext in ('parquet', 'pq'):
+        return 'parquet'
+    if ext in ('feather', 'arrow'):
+        return 'feather'
+    return 'csv'
+
+
+def _source_name(source, name):
+    return name or getattr(source, 'name', None) or (source if isinstance(source, str) else None)
+
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+
+def read_columns(source, name=None):
+    """Column names of an input file, reading only its header or schema."""
+    fmt = detect_format(_source_name(source, name))
+    _rewind(source)
+    try:
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            return list(pq.read_schema(source).names)
+        if fmt == 'feather':
+            import pyarrow.ipc as ipc
+            return list(ipc.open_file(source).schema.names)
+        return list(pd.read_csv(source, nrows=0).columns)
+    finally:
+        _rewind(source)
+
+
+def read_table(source, name=None, columns=None, parse_dates=True):
+    """Read an input file into a DataFrame.
+
+    columns restricts the read to those columns (projection); None reads all.
+    When parse_dates is True, 'ds' is converted to datetime64 once here so
+    downstream validation and preparation do not re-parse it.
+    """
+    fmt = detect_format(_source_name(source, name))
+    _rewind(source)
+    columns = list(columns) if columns is not None else None
+
+    if fmt == 'parquet':
+        df = pd.read_parquet(source, columns=columns)
+    elif fmt == 'feather':
+        df = pd.read_feather(source, columns=columns)
+    else:
+        df = _read_csv(source, columns)
+
+    if parse_dates and 'ds' in df.columns:
+        df['ds'] = parse_ds(df['ds'])
+    return df
+
+
+def _read_csv(source, columns):
+    """CSV read with projection and explicit dtypes, pyarrow engine if available."""
+    engine = 'pyarrow' if pyarrow_available() else 'c'
+    dtypes = {col: dtype for col, dtype in COLUMN_DTYPES.items() if columns is None or col in columns}
+    try:
+        return pd.read_csv(source, engine=engine, usecols=columns, dtype=dtypes)
+    except (ValueError, TypeError):
+        # Non-numeric y (or another dtype clash): read untyped so validation
+        # can report a friendly error instead of a parser exception
+        _rewind(source)
+        return pd.read_csv(source, engine=engine, usecols=columns)
+
+
+def _format_candidates(sample):
+    """Formats that may fit a sample value: pandas' guesses (month and day first), then the fallbacks."""
+    with warnings.catch_warnings():
+        # Day-first guesses warn when dayfirst is not requested
+        warnings.simplefilter("ignore", UserWarning)
+        guesses = [guess_datetime_format(sample), guess_datetime_format(sample, dayfirst=True)]
+    return list(dict.fromkeys(fmt for fmt in guesses + FALLBACK_DATE_FORMATS if fmt is not None))
+
+
+def _parse_all(strings, fmt):
+    """strings parsed with fmt, or None if any of them does not match it."""
+    parsed = pd.to_datetime(strings, format=fmt, errors='coerce')
+    return None if parsed.isna().any() else parsed
+
+
+def infer_date_format(values):
+    """Explicit date format for a column of date strings (None if unknown).
+
+    Candidates are checked against values spread over the whole column.
+    Formats that read the sample differently (01/02/2024 as January 2nd or
+    February 1st) are checked against every value; if several still fit, the
+    column is ambiguous and the month-first reading wins, as in
+    pd.to_datetime. Nothing is cached across columns, so a column parses the
+    same way whatever was parsed before it.
+    """
+    values = pd.Series(values).dropna()
+    if values.empty:
+        return None
+    positions = np.unique(np.linspace(0, len(values) - 1, min(len(values), FORMAT_SAMPLE_SIZE)).astype(int))
+    sample = values.iloc[positions].astype(str).str.strip()
+
+    readings = {}
+    for fmt in _format_candidates(sample.iloc[0]):
+        parsed = _parse_all(sample, fmt)
+        if parsed is not None:
+            readings[fmt] = parsed
+    if not readings:
+        return None
+    first_fmt, first = next(iter(readings.items()))
+    if all(parsed.equals(first) for parsed in readings.values()):
+        return first_fmt
+    # The sample reads differently under several formats: decide on the full column
+    strings = values.astype(str).str.strip()
+    fitting = [fmt for fmt in readings if _parse_all(strings, fmt) is not None]
+    return fitting[0] if fitting else None
+
+
+def parse_ds(values):
+    """Parse a date column once, using its inferred explicit format when possible.
+
+    Already-parsed datetime columns are returned unchanged. Values that
+    cannot be parsed are returned as-is so validate_csv reports the error.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    non_null = values.dropna()
+    if non_null.empty:
+        return values
+
+    fmt = infer_date_format(non_null)
+    if fmt is not None:
+        try:
+            return pd.to_datetime(values, format=fmt)
+        except (ValueError, TypeError):
+            pass
+    try:
+        return pd.to_datetime(values)
+    except (ValueError, TypeError):
+        return values
+
+
+def upload_fingerprint(source):
+    """Content hash of an uploaded file (or path): the same bytes give the same key."""
+    h = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    else:
+        h.update(source.getvalue())
+    h.update(str(detect_format(_source_name(source, None))).encode())
+    return h.hexdigest()
+
+
+def _nbytes(value):
+    """Approximate memory of the frames in a cached ingest result."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=False).sum())
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+class IngestCache(BoundedLRU):
+    """In-memory LRU of ingest results (parsed, validated, prepared frames) by key.
+
+    Keys start with an upload fingerprint. Cached frames are shared, so
+    callers must treat them as read-only.
+    """
+
+    def __init__(self, memory_limit_mb=DEFAULT_INGEST_CACHE_MB):
+        super().__init__(memory_limit_mb)
+
+    def get_or_build(self, key, build):
+        """(value, hit): the cached value for key, or build() stored under it."""
+        return super().get_or_build(key, build, _nbytes)
@@ -0,0 +1,84 @@
+"""
+Stan fitting backends.
+MAP fits run cmdstan's optimizer (L-BFGS or Newton) with iteration and
+tolerance limits for the fastest point fit; MCMC draws the full posterior
+with chains run in parallel across cores. The backend settings travel in
+model_params, so the fit cache and warm-start keys cover them like any other
+setting; build_model strips them before constructing Prophet.
+"""
+
+import os
+
+# Backend -> label
+FIT_BACKENDS = {
+    "auto": "MAP (auto: Newton under 100 rows, else L-BFGS)",
+    "lbfgs": "MAP - L-BFGS",
+    "newton": "MAP - Newton",
+    "mcmc": "MCMC (full posterior)",
+}
+
+# Fit settings carried in model_params (not Prophet constructor arguments)
+DEFAULT_FIT_PARAMS = {
+    "fit_backend": "auto",
+    "max_iter": 10000,
+    "tol_rel_grad": 1e7,
+    "mcmc_chains": 4,
+}
+
+# Prophet mcmc_samples (iterations per chain, half of them warmup) when MCMC is chosen without one
+DEFAULT_MCMC_SAMPLES = 300
+
+
+def fit_backend(model_params):
+    """The backend model_params select; a positive mcmc_samples always means MCMC."""
+    params = model_params or {}
+    if params.get("mcmc_samples"):
+        return "mcmc"
+    backend = params.get("fit_backend", DEFAULT_FIT_PARAMS["fit_backend"])
+    if backend not in FIT_BACKENDS:
+        raise ValueError(f"Unknown fit backend '{backend}'. Choose one of: {', '.join(FIT_BACKENDS)}")
+    return backend
+
+
+def prophet_params(model_params):
+    """model_params without the fit settings, with mcmc_samples set for the chosen backend."""
+    params = {k: v for k, v in (model_params or {}).items() if k not in DEFAULT_FIT_PARAMS}
+    if fit_backend(model_params) == "mcmc":
+        params["mcmc_samples"] = int(params.get("mcmc_samples") or DEFAULT_MCMC_SAMPLES)
+    else:
+        params.pop("mcmc_samples", None)
+    return params
+
+
+def fit_kwargs(model_params):
+    """Keyword arguments for Prophet.fit (passed through to cmdstanpy)."""
+    params = {**DEFAULT_FIT_PARAMS, **(model_params or {})}
+    backend = fit_backend(model_params)
+    if backend == "mcmc":
+        chains = max(1, int(params["mcmc_chains"]))
+        return {
+            "chains": chains,
+            "parallel_chains": min(chains, os.cpu_count() or 1),
+            "show_progress": False,
+        }
+    kwargs = {"iter": int(params["max_iter"])}
+    if backend == "lbfgs":
+        kwargs["algorithm"] = "LBFGS"
+        # Only passed when changed: cmdstan rejects it for Newton
+        if float(params["tol_rel_grad"]) != DEFAULT_FIT_PARAMS["tol_rel_grad"]:
+            kwargs["tol_rel_grad"] = float(params["tol_rel_grad"])
+    elif backend == "newton":
+        kwargs["algorithm"] = "Newton"
+    return kwargs
+
+
+def fit_model(m, prepared_df, model_params, **kwargs):
+    """m.fit with the backend settings in model_params (extra kwargs such as init win).
+
+    With a custom L-BFGS tolerance Prophet's fallback to Newton is disabled,
+    since Newton does not accept it; an L-BFGS failure is then raised.
+    """
+    kwargs = {**fit_kwargs(model_params), **kwargs}
+    if "tol_rel_grad" in kwargs and hasattr(m.stan_backend, "newton_fallback"):
+        m.stan_backend.newton_fallback = False
+    return m.fit(prepared_df, **kwargs)
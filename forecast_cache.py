@@ -0,0 +1,219 @@
+"""
+Content-addressed fit/forecast cache.
+Fits are keyed by a hash of the prepared data, holidays and every model and
+forecast parameter, so an identical configuration never refits. Results are
+kept in an in-memory LRU tier backed by an on-disk tier (serialized model +
+forecast frame); both tiers evict least-recently-used entries by size.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+from prophet.serialize import model_to_json, model_from_json
+
+from bounded_cache import BoundedLRU
+from forecast_engine import fit_forecast
+
+# Shared cache location for on-disk artifacts
+CACHE_DIR = os.environ.get(
+    "PROPHET_APP_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "prophet_forecast_app")
+)
+
+DEFAULT_MEMORY_LIMIT_MB = 512
+DEFAULT_DISK_LIMIT_MB = 2048
+
+
+def fingerprint_frame(df):
+    """Stable content hash of a DataFrame (values and column names)."""
+    if df is None:
+        return "none"
+    h = hashlib.sha256()
+    h.update(json.dumps([str(c) for c in df.columns]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def make_cache_key(prepared_df, model_params, forecast_periods, forecast_freq,
+                   country_code=None, holidays_df=None):
+    """Hash of the prepared data plus everything that affects the fit."""
+    payload = {
+        "data": fingerprint_frame(prepared_df),
+        "holidays": fingerprint_frame(holidays_df),
+        "params": model_params,
+        "periods": int(forecast_periods),
+        "freq": forecast_freq,
+        "country": country_code,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ForecastCache:
+    """Two-tier (memory LRU + disk) cache of fitted models and forecasts."""
+
+    def __init__(self, cache_dir=None, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB,
+                 disk_limit_mb=DEFAULT_DISK_LIMIT_MB):
+        self.cache_dir = os.path.join(cache_dir or CACHE_DIR, "fits")
+        self.disk_limit = int(disk_limit_mb * 1024 * 1024)
+        self._memory = BoundedLRU(memory_limit_mb)  # key -> (model, forecast)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get(self, key):
+        """Return (model, forecast, tier) for key, or None on a miss."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return entry[0], entry[1], "memory"
+
+        loaded = self._load_from_disk(key)
+        with self._lock:
+            if loaded is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        model, forecast, model_json = loaded
+        self._put_memory(key, model, forecast, len(model_json))
+        return model, forecast, "disk"
+
+    def put(self, key, model, forecast):
+        """Store a fitted model and its forecast in both tiers."""
+        model_json = model_to_json(model)
+        self._put_memory(key, model, forecast, len(model_json))
+        self._save_to_disk(key, model_json, forecast)
+
+    def clear(self):
+        """Drop every entry from both tiers and reset the counters."""
+        self._memory.clear()
+        with self._lock:
+            self.memory_hits = self.disk_hits = self.misses = 0
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def stats(self):
+        """Hit/miss counters and tier sizes for display."""
+        memory = self._memory.stats()
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": memory["entries"],
+                "memory_mb": memory["memory_mb"],
+                "disk_entries": len(self._disk_entries()),
+                "disk_mb": sum(size for _, size, _ in self._disk_entries()) / (1024 * 1024),
+            }
+
+    # Memory tier
+
+    def _put_memory(self, key, model, forecast, model_bytes):
+        nbytes = int(forecast.memory_usage(deep=True).sum()) + model_bytes
+        self._memory.put(key, (model, forecast), nbytes)
+
+    # Disk tier
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _disk_entries(self):
+        """List of (path, size_bytes, last_used) for every disk entry."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if ".tmp-" in name or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(
+                    os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)
+                )
+                entries.append((path, size, os.path.getmtime(path)))
+            except OSError:
+                # Entry removed concurrently by another session
+                continue
+        return entries
+
+    def _load_from_disk(self, key):
+        path = self._entry_dir(key)
+        try:
+            with open(os.path.join(path, "model.json"), "r") as f:
+                model_json = f.read()
+            forecast = pd.read_pickle(os.path.join(path, "forecast.pkl"))
+            model = model_from_json(model_json)
+        except (OSError, ValueError, KeyError):
+            return None
+        # Touch the entry so eviction treats it as recently used
+        now = time.time()
+        os.utime(path, (now, now))
+        return model, forecast, model_json
+
+    def _save_to_disk(self, key, model_json, forecast):
+        path = self._entry_dir(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            with open(os.path.join(tmp_path, "model.json"), "w") as f:
+                f.write(model_json)
+            forecast.to_pickle(os.path.join(tmp_path, "forecast.pkl"))
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        while entries and total > self.disk_limit:
+            path, size, _ = entries.pop(0)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+def cached_fit_forecast(cache, prepared_df, model_params, forecast_periods, forecast_freq,
+                        country_code=None, holidays_df=None, warm_start=False,
+                        on_point_forecast=None, on_stage=None):
+    """fit_forecast with a cache lookup in front.
+
+    Returns (model, forecast, tier) where tier is "memory" or "disk" for a
+    cache hit, "warm" for a fit warm-started from a previous run of the same
+    series (see warm_start.py), or None for a cold fit.
+    """
+    key = make_cache_key(
+        prepared_df, model_params, forecast_periods, forecast_freq,
+        country_code=country_code, holidays_df=holidays_df
+    )
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    tier = None
+    if warm_start:
+        from warm_start import warm_fit_forecast
+
+        m, forecast, warm_rows = warm_fit_forecast(
+            prepared_df, model_params, forecast_periods, forecast_freq,
+            country_code=country_code, holidays_df=holidays_df,
+            on_point_forecast=on_point_forecast, on_stage=on_stage
+        )
+        tier = "warm" if warm_rows else None
+    else:
+        m, forecast = fit_forecast(
+            prepared_df, model_params, forecast_periods, forecast_freq,
+            country_code=country_code, holidays_df=holidays_df,
+            on_point_forecast=on_point_forecast, on_stage=on_stage
+        )
+    cache.put(key, m, forecast)
+    return m, forecast, tier
@@ -0,0 +1,331 @@
+"""
+Command-line entry point for headless forecasting.
+Runs the same engine as the Streamlit app without importing Streamlit or
+Plotly, for cron jobs and schedulers.
+
+Usage:
+    python forecast_cli.py run --input data.csv --config config.json --output forecast.csv
+    python forecast_cli.py models
+    python forecast_cli.py predict --model-id <id> --periods 90 --freq D
+    python forecast_cli.py run --input hourly.csv --chunk-rows 1024 --output forecast.parquet
+    python forecast_cli.py serve --port 8765 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from data_ingest import read_columns, read_table
+from forecast_engine import (
+    load_run_config, load_custom_holidays, fit_run, run_forecast, export_frame, prophet_available,
+    quiet_stan_logging
+)
+
+
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def _default_output(input_path):
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return f"{stem}_forecast.csv"
+
+
+def run_command(args):
+    """Handle `forecast run`; returns the process exit code."""
+    try:
+        config = load_run_config(args.config)
+    except (OSError, ValueError) as e:
+        _log(f"Invalid config: {e}")
+        return 1
+    if args.periods is not None:
+        config["forecast_periods"] = args.periods
+    if args.freq is not None:
+        config["forecast_freq"] = args.freq
+    if args.workers is not None:
+        config["workers"] = args.workers
+    if args.chunk_rows is not None:
+        config["stream_chunk_rows"] = args.chunk_rows
+
+    if not prophet_available():
+        _log("Prophet is not installed. Please run: pip install prophet cmdstanpy")
+        return 1
+
+    if not args.verbose:
+        quiet_stan_logging()
+
+    start = time.perf_counter()
+    series_col = config["series_column"]
+    hierarchy_cols = config["hierarchy_columns"]
+    file_columns = read_columns(args.input)
+    needed_columns = [col for col in ('ds', 'y') if col in file_columns]
+    if hierarchy_cols:
+        missing = [col for col in hierarchy_cols if col not in file_columns]
+        if missing:
+            _log(f"Hierarchy column(s) not found in input: {', '.join(missing)}")
+            return 1
+        needed_columns.extend(hierarchy_cols)
+    elif series_col in file_columns:
+        needed_columns.append(series_col)
+    data_df = read_table(args.input, columns=needed_columns)
+    _log(f"Read {len(data_df)} rows from {args.input}")
+
+    hierarchy = None
+    if hierarchy_cols:
+        # Every node of the hierarchy becomes a series of the batch
+        from hierarchy import NODE_COLUMN, RECONCILIATION_METHODS, build_hierarchy
+
+        if config["reconciliation"] not in RECONCILIATION_METHODS:
+            _log(f"Unknown reconciliation '{config['reconciliation']}'. Choose one of: {', '.join(RECONCILIATION_METHODS)}")
+            return 1
+        data_df, hierarchy = build_hierarchy(data_df, hierarchy_cols)
+        series_col = NODE_COLUMN
+        _log(f"Hierarchy: {len(hierarchy.nodes)} nodes, {hierarchy.n_leaves} leaves")
+        if config["stream_chunk_rows"]:
+            _log("Streaming is not available for hierarchies (reconciliation needs every forecast); writing at the end")
+            config["stream_chunk_rows"] = None
+
+    holidays_df = None
+    if config["custom_holidays"]:
+        holidays_df, message = load_custom_holidays(config["custom_holidays"])
+        if holidays_df is None:
+            _log(message)
+            return 1
+        _log(message)
+
+    output_path = args.output or _default_output(args.input)
+    chunk_rows = config["stream_chunk_rows"]
+    if chunk_rows:
+        # Chunked predict straight into the output file; history rows are skipped for future_only
+        from forecast_export import ExportWriter
+
+        predict_options = {"chunk_rows": chunk_rows, "include_history": not config["future_only"]}
+
+    if series_col and chunk_rows:
+        # Multi-series streaming: each series is spooled to disk as soon as it completes
+        import tempfile
+
+        import pandas as pd
+
+        from batch_forecast import run_batch_forecast, combine_forecasts, summarize_results
+
+        if series_col not in data_df.columns:
+            _log(f"Series column '{series_col}' not found in input")
+            return 1
+        # Baseline forecasts include the history; Prophet chunks already skip it
+        history_end = data_df.groupby(series_col)['ds'].max().to_dict() if config["future_only"] else None
+        results = []
+        # Series differ in components (baselines have none, holidays vary with the history),
+        # so the output is written once every series is in, with the union of their columns
+        columns, spooled = {}, []
+        with tempfile.TemporaryDirectory(prefix="forecast-stream-") as spool_dir:
+            for result in run_batch_forecast(
+                data_df, series_col, config["model"], config["forecast_periods"], config["forecast_freq"],
+                country_code=config["country_holidays"], holidays_df=holidays_df,
+                max_workers=config["workers"],
+                preprocess_options={"reducer": config["aggregate_reducer"], "resample_rule": config["resample_rule"]},
+                warm_start=config["warm_start"], predict_options=predict_options,
+                baseline_below_rows=config["baseline_below_rows"]
+            ):
+                if result["forecast"] is not None:
+                    frame = combine_forecasts([result], series_col, history_end)
+                    columns.update(dict.fromkeys(frame.columns))
+                    spooled.append(os.path.join(spool_dir, f"{len(spooled)}.pkl"))
+                    frame.to_pickle(spooled[-1])
+                results.append({**result, "forecast": None})
+                status = f"failed: {result['error']}" if result["error"] else result["model"]
+                _log(f"[{len(results)}] {result['key']}: {status} ({result['seconds']:.1f}s)")
+            with ExportWriter(output_path, columns=list(columns)) as writer:
+                for path in spooled:
+                    writer.write(pd.read_pickle(path))
+        summary = summarize_results(results)
+        n_rows = writer.rows
+        n_failed = int((summary['status'] == 'failed').sum())
+    elif series_col:
+        # Multi-series: fit every series on the process pool
+        from batch_forecast import run_batch_forecast, combine_forecasts, summarize_results
+
+        if series_col not in data_df.columns:
+            _log(f"Series column '{series_col}' not found in input")
+            return 1
+        results = []
+        for result in run_batch_forecast(
+            data_df, series_col, config["model"], config["forecast_periods"], config["forecast_freq"],
+            country_code=config["country_holidays"], holidays_df=holidays_df,
+            max_workers=config["workers"],
+            preprocess_options={"reducer": config["aggregate_reducer"], "resample_rule": config["resample_rule"]},
+            warm_start=config["warm_start"], baseline_below_rows=config["baseline_below_rows"]
+        ):
+            results.append(result)
+            status = f"failed: {result['error']}" if result["error"] else result["model"]
+            _log(f"[{len(results)}] {result['key']}: {status} ({result['seconds']:.1f}s)")
+        summary = summarize_results(results)
+        if hierarchy is not None:
+            from hierarchy import reconcile
+
+            results, report = reconcile(results, data_df, hierarchy, config["reconciliation"])
+            if report["message"]:
+                _log(report["message"])
+            if report["coherence_after"] is not None:
+                _log(f"Reconciled ({report['method']}): max incoherence {report['coherence_after']:.3g}")
+        history_end = None
+        if config["future_only"]:
+            history_end = data_df.groupby(series_col)['ds'].max().to_dict()
+        output_df = export_frame(combine_forecasts(results, series_col, history_end))
+        if hierarchy is not None:
+            from hierarchy import label_levels
+
+            output_df = label_levels(output_df, hierarchy)
+        n_failed = int((summary['status'] == 'failed').sum())
+    elif chunk_rows:
+        from streaming_predict import predict_chunks
+
+        try:
+            m, _ = fit_run(data_df, config, holidays_df=holidays_df)
+        except ValueError as e:
+            _log(f"Invalid input: {e}")
+            return 1
+        with ExportWriter(output_path) as writer:
+            for chunk in predict_chunks(m, config["forecast_periods"], config["forecast_freq"], **predict_options):
+                writer.write(chunk)
+        n_rows = writer.rows
+        n_failed = 0
+    else:
+        try:
+            _, forecast, prepared_df = run_forecast(data_df, config, holidays_df=holidays_df)
+        except ValueError as e:
+            _log(f"Invalid input: {e}")
+            return 1
+        history_end = prepared_df['ds'].max() if config["future_only"] else None
+        output_df = export_frame(forecast, history_end)
+        n_failed = 0
+
+    if not chunk_rows:
+        output_df.to_csv(output_path, index=False)
+        n_rows = len(output_df)
+    _log(f"Wrote {n_rows} rows to {output_path} in {time.perf_counter() - start:.1f}s")
+    return 1 if n_failed else 0
+
+
+def models_command(args):
+    """Handle `forecast models`: list the model registry."""
+    from model_registry import list_models
+
+    for meta in list_models():
+        print(
+            f"{meta['model_id']}\t{meta['name']}\t{meta['created_at']}\t"
+            f"{meta['rows']} rows\t{meta['history_start'][:10]} -> {meta['history_end'][:10]}"
+        )
+    return 0
+
+
+def predict_command(args):
+    """Handle `forecast predict`: predict-only run from a saved model."""
+    from model_registry import load_model, predict_only
+
+    start = time.perf_counter()
+    try:
+        model, meta = load_model(args.model_id)
+    except OSError:
+        _log(f"Saved model '{args.model_id}' not found")
+        return 1
+    except ValueError as e:
+        _log(str(e))
+        return 1
+    periods = args.periods or meta.get("forecast_periods") or 365
+    freq = args.freq or meta.get("forecast_freq") or "D"
+    output_path = args.output or f"{args.model_id}_forecast.csv"
+    if args.chunk_rows:
+        # Future rows only, predicted chunk by chunk straight into the output file
+        from forecast_export import ExportWriter
+        from streaming_predict import predict_chunks
+
+        with ExportWriter(output_path) as writer:
+            for chunk in predict_chunks(model, periods, freq, chunk_rows=args.chunk_rows):
+                writer.write(chunk)
+        n_rows = writer.rows
+    else:
+        forecast = predict_only(model, periods, freq)
+        output_df = export_frame(forecast, history_end=model.history['ds'].max())
+        output_df.to_csv(output_path, index=False)
+        n_rows = len(output_df)
+    _log(f"Wrote {n_rows} rows to {output_path} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def serve_command(args):
+    """Handle `forecast serve`: run the local HTTP forecasting service until interrupted."""
+    if not prophet_available():
+        _log("Prophet is not installed. Please run: pip install prophet cmdstanpy")
+        return 1
+    from forecast_service import ForecastService, make_server
+
+    if not args.verbose:
+        quiet_stan_logging()
+    service = ForecastService(
+        workers=args.workers, queue_size=args.queue_size, request_timeout=args.timeout
+    )
+    server = make_server(args.host, args.port, service)
+    _log(
+        f"Serving forecasts on http://{args.host}:{server.server_address[1]} "
+        f"({service.workers} workers, queue {service.queue_size})"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="forecast",
+        description="Headless Prophet forecasting (same engine as the web app)."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Fit and forecast a CSV, Parquet or Feather file")
+    run_parser.add_argument("--input", required=True, help="Input CSV/Parquet/Feather with ds and y columns (plus a series column for batch runs or hierarchy columns)")
+    run_parser.add_argument("--config", help="JSON run configuration (model parameters, horizon, holidays)")
+    run_parser.add_argument("--output", help="Output CSV path (default: <input>_forecast.csv)")
+    run_parser.add_argument("--periods", type=int, help="Override forecast_periods from the config")
+    run_parser.add_argument("--freq", help="Override forecast_freq from the config")
+    run_parser.add_argument("--workers", type=int, help="Override worker processes for batch runs")
+    run_parser.add_argument("--chunk-rows", type=int, help="Override stream_chunk_rows: predict in chunks of this many rows, written to the output as they finish")
+    run_parser.add_argument("--verbose", action="store_true", help="Show Stan/Prophet log output")
+    run_parser.set_defaults(func=run_command)
+
+    models_parser = subparsers.add_parser("models", help="List saved models in the registry")
+    models_parser.set_defaults(func=models_command)
+
+    predict_parser = subparsers.add_parser("predict", help="Predict a new horizon from a saved model (no refit)")
+    predict_parser.add_argument("--model-id", required=True, help="Saved model ID (see `forecast models`)")
+    predict_parser.add_argument("--periods", type=int, help="Forecast periods (default: the saved run's)")
+    predict_parser.add_argument("--freq", help="Forecast frequency (default: the saved run's)")
+    predict_parser.add_argument("--output", help="Output CSV path (default: <model-id>_forecast.csv)")
+    predict_parser.add_argument("--chunk-rows", type=int, help="Predict in chunks of this many rows, written to the output as they finish")
+    predict_parser.set_defaults(func=predict_command)
+
+    # Defaults mirror forecast_service, which is imported only when serving
+    serve_parser = subparsers.add_parser("serve", help="Serve forecasts over local HTTP (JSON/Parquet)")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: localhost only)")
+    serve_parser.add_argument("--port", type=int, default=8765, help="Port (default: 8765)")
+    serve_parser.add_argument("--workers", type=int, help="Concurrent fits (default: CPU cores)")
+    serve_parser.add_argument("--queue-size", type=int, default=32, help="Requests waiting beyond running fits before 503 (default: 32)")
+    serve_parser.add_argument("--timeout", type=float, default=300, help="Seconds a request waits for its forecast before 504 (default: 300)")
+    serve_parser.add_argument("--verbose", action="store_true", help="Show Stan/Prophet log output")
+    serve_parser.set_defaults(func=serve_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""
+Forecast engine for the Prophet Forecast Web Application.
+Validation, data preparation, holiday assembly and the Prophet fit/predict
+flow. Importable without Streamlit or Plotly so the same forecasts can run
+from the CLI (forecast_cli.py), schedulers and worker processes.
+"""
+
+import importlib.util
+import json
+import logging
+from datetime import datetime
+
+import pandas as pd
+
+from data_ingest import parse_ds
+from fit_backend import DEFAULT_FIT_PARAMS, fit_model, prophet_params
+from preprocessing import preprocess
+from uncertainty import predict_forecast
+
+# Default Prophet settings (mirror the sidebar defaults in the app)
+DEFAULT_MODEL_PARAMS = {
+    "seasonality_mode": "additive",
+    "daily_seasonality": False,
+    "weekly_seasonality": True,
+    "yearly_seasonality": True,
+    "changepoint_prior_scale": 0.05,
+    "changepoint_range": 0.8,
+    "seasonality_prior_scale": 10.0,
+    "holidays_prior_scale": 10.0,
+    "uncertainty_samples": 1000,
+    "mcmc_samples": 0,
+    **DEFAULT_FIT_PARAMS,
+}
+
+# Default headless run configuration (see load_run_config)
+DEFAULT_RUN_CONFIG = {
+    "model": {},
+    "forecast_periods": 365,
+    "forecast_freq": "D",
+    "country_holidays": "US",
+    "custom_holidays": None,
+    "series_column": None,
+    "hierarchy_columns": None,
+    "reconciliation": "mint_shrink",
+    "workers": None,
+    "future_only": True,
+    "aggregate_reducer": "mean",
+    "resample_rule": None,
+    "warm_start": False,
+    "stream_chunk_rows": None,
+    "baseline_below_rows": 0,
+}
+
+
+def prophet_available():
+    """Whether Prophet can be imported, without importing it."""
+    return importlib.util.find_spec("prophet") is not None
+
+
+def quiet_stan_logging():
+    """Limit cmdstanpy/prophet logging to warnings.
+
+    cmdstanpy installs an INFO handler on first use unless its logger already
+    has one, so a WARNING handler is attached up front.
+    """
+    for name in ("cmdstanpy", "prophet"):
+        logger = logging.getLogger(name)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setLevel(logging.WARNING)
+            logger.addHandler(handler)
+        logger.setLevel(logging.WARNING)
+
+
+def validate_csv(df):
+    """Validate that CSV has required columns."""
+    required_cols = ['ds', 'y']
+    missing_cols = [col for col in required_cols if col not in df.columns]
+    if missing_cols:
+        return False, f"Missing required columns: {', '.join(missing_cols)}"
+
+    # Check if ds is datetime-like (already parsed on ingest when possible)
+    if not pd.api.types.is_datetime64_any_dtype(df['ds']):
+        try:
+            pd.to_datetime(df['ds'])
+        except:
+            return False, "Column 'ds' must contain valid dates"
+
+    # Check if y is numeric
+    if not pd.api.types.is_numeric_dtype(df['y']):
+        return False, "Column 'y' must contain numeric values"
+
+    return True, "Valid"
+
+
+def prepare_data(df):
+    """Prepare data for Prophet."""
+    df = df[['ds', 'y']].copy()
+    if not pd.api.types.is_datetime64_any_dtype(df['ds']):
+        df['ds'] = pd.to_datetime(df['ds'])
+    df = df.dropna()
+    df = df.sort_values('ds').reset_index(drop=True)
+    return df
+
+
+def detect_data_frequency(df):
+    """Detect if data is sub-daily (hourly) or daily+."""
+    if len(df) < 2:
+        return "unknown"
+
+    # Calculate time differences
+    time_diffs = df['ds'].diff().dropna()
+    median_diff = time_diffs.median()
+
+    # If median difference is less than 1 day, it's sub-daily
+    if median_diff < pd.Timedelta(days=1):
+        return "sub-daily"
+    else:
+        return "daily-or-more"
+
+
+def load_custom_holidays(source):
+    """Read a custom holidays CSV (path or file-like).
+
+    Returns (holidays_df, message); holidays_df is None if the file is invalid.
+    """
+    try:
+        holidays_df = pd.read_csv(source)
+    except Exception as e:
+        return None, f"Could not load custom holidays: {str(e)}"
+
+    # Validate required columns
+    if 'holiday' not in holidays_df.columns or 'ds' not in holidays_df.columns:
+        return None, "Holidays CSV must have 'holiday' and 'ds' columns"
+
+    try:
+        # Inferred explicit format first; mixed layouts fall back to per-value parsing
+        holidays_df['ds'] = parse_ds(holidays_df['ds'])
+        if not pd.api.types.is_datetime64_any_dtype(holidays_df['ds']):
+            holidays_df['ds'] = pd.to_datetime(holidays_df['ds'], format="mixed")
+    except Exception as e:
+        return None, f"Could not load custom holidays: {str(e)}"
+    return holidays_df, f"Loaded {len(holidays_df)} custom holidays"
+
+
+def build_model(model_params, country_code=None, holidays_df=None, holiday_years=None):
+    """Create an unfitted Prophet model from the sidebar parameters.
+
+    country_code is one or more ISO country codes or ISO 3166-2 subdivisions
+    ("US", "US-CA,GB"). With holiday_years (first, last) every calendar comes
+    from the precomputed tables in holiday_tables.py and is merged with the
+    custom holidays by holiday_engine.py; otherwise Prophet builds a single
+    country calendar itself.
+    """
+    # Imported here so CLI startup and validation-only runs stay fast
+    from holiday_engine import (
+        HolidayEngineProphet, combine_holidays, deduplicate_holidays, normalize_holidays,
+        parse_country_codes
+    )
+
+    params = {**DEFAULT_MODEL_PARAMS, **(model_params or {})}
+    m = HolidayEngineProphet(**prophet_params(params))
+
+    codes = parse_country_codes(country_code)
+    if holiday_years is not None:
+        holidays_df = combine_holidays(codes, *holiday_years, custom_df=holidays_df)
+        # Predicting past holiday_years extends these calendars (cover_holiday_years)
+        m.holiday_calendars = codes
+        m.holiday_years = tuple(holiday_years)
+    else:
+        if len(codes) > 1:
+            raise ValueError("Several holiday calendars need holiday_years")
+        if codes:
+            # Add country holidays if a country is selected (backend uses ISO code)
+            m.add_country_holidays(country_name=codes[0])
+        if holidays_df is not None:
+            holidays_df = deduplicate_holidays(normalize_holidays(holidays_df))
+
+    # Custom holidays replace the model's holidays frame
+    if holidays_df is not None:
+        m.holidays = holidays_df
+    return m
+
+
+def fit_forecast(prepared_df, model_params, forecast_periods, forecast_freq,
+                 country_code=None, holidays_df=None, on_point_forecast=None, on_stage=None):
+    """Fit a Prophet model and predict the requested horizon.
+
+    on_point_forecast, if given, receives the point forecast before the
+    uncertainty intervals are computed; on_stage is called with "fitting"
+    and "predicting" as each stage starts. Returns (model, forecast).
+    """
+    # Fit model
+    if on_stage is not None:
+        on_stage("fitting")
+    m = fit_prophet(
+        prepared_df, model_params, forecast_periods, forecast_freq,
+        country_code=country_code, holidays_df=holidays_df
+    )
+
+    # Create future dataframe
+    if on_stage is not None:
+        on_stage("predicting")
+    future = m.make_future_dataframe(periods=forecast_periods, freq=forecast_freq)
+
+    # Generate forecast (point forecast first, then intervals)
+    forecast = predict_forecast(m, future, on_point_forecast=on_point_forecast)
+    return m, forecast
+
+
+def fit_prophet(prepared_df, model_params, forecast_periods, forecast_freq,
+                country_code=None, holidays_df=None):
+    """Build and fit a Prophet model (holiday calendars cover the forecast horizon); no predict."""
+    m = build_model(
+        model_params, country_code=country_code, holidays_df=holidays_df,
+        holiday_years=holiday_year_span(prepared_df, forecast_periods, forecast_freq)
+    )
+    fit_model(m, prepared_df, model_params)
+    return m
+
+
+def holiday_year_span(prepared_df, forecast_periods=0, forecast_freq="D"):
+    """(first, last) calendar years spanned by the history and forecast horizon."""
+    first = prepared_df['ds'].min()
+    last = prepared_df['ds'].max()
+    if forecast_periods:
+        last = pd.date_range(start=last, periods=int(forecast_periods) + 1, freq=forecast_freq)[-1]
+    return int(first.year), int(last.year)
+
+
+def export_frame(forecast, history_end=None, run_date=None):
+    """Forecast rows for download: adds run_date and keeps rows after history_end."""
+    forecast_download = forecast.copy()
+    forecast_download['run_date'] = run_date or datetime.now().strftime('%Y-%m-%d')
+    if history_end is not None:
+        forecast_download = forecast_download[forecast_download['ds'] > history_end].copy()
+    return forecast_download
+
+
+def load_run_config(path=None):
+    """Load a JSON run configuration merged over DEFAULT_RUN_CONFIG.
+
+    Raises ValueError for unknown keys so typos do not silently fall back
+    to defaults in scheduled runs.
+    """
+    if path is None:
+        return merge_run_config({})
+    with open(path, "r") as f:
+        return merge_run_config(json.load(f))
+
+
+def merge_run_config(user_config):
+    """A run configuration dict merged over DEFAULT_RUN_CONFIG (see load_run_config)."""
+    if not isinstance(user_config, dict):
+        raise ValueError("Config must be a JSON object")
+    config = {**DEFAULT_RUN_CONFIG, "model": dict(DEFAULT_MODEL_PARAMS)}
+    unknown = set(user_config) - set(DEFAULT_RUN_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown config keys: {', '.join(sorted(unknown))}")
+    unknown_params = set(user_config.get("model") or {}) - set(DEFAULT_MODEL_PARAMS)
+    if unknown_params:
+        raise ValueError(f"Unknown model parameters: {', '.join(sorted(unknown_params))}")
+
+    for key, value in user_config.items():
+        if key == "model":
+            config["model"].update(value or {})
+        else:
+            config[key] = value
+    return config
+
+
+def fit_run(data_df, config, holidays_df=None):
+    """Validate, prepare, preprocess and fit a single series from a run config, without predicting.
+
+    Returns (model, prepared_df). Raises ValueError if the input fails
+    validation.
+    """
+    is_valid, message = validate_csv(data_df)
+    if not is_valid:
+        raise ValueError(message)
+
+    prepared_df, _ = preprocess(
+        prepare_data(data_df), config["aggregate_reducer"], config["resample_rule"]
+    )
+    if config["warm_start"]:
+        from warm_start import warm_fit
+
+        m, _ = warm_fit(
+            prepared_df, config["model"], config["forecast_periods"], config["forecast_freq"],
+            country_code=config["country_holidays"], holidays_df=holidays_df
+        )
+    else:
+        m = fit_prophet(
+            prepared_df, config["model"], config["forecast_periods"], config["forecast_freq"],
+            country_code=config["country_holidays"], holidays_df=holidays_df
+        )
+    return m, prepared_df
+
+
+def run_forecast(data_df, config, holidays_df=None):
+    """Validate, prepare, preprocess, fit and predict a single series from a run config.
+
+    Returns (model, forecast, prepared_df). Raises ValueError if the input
+    fails validation.
+    """
+    m, prepared_df = fit_run(data_df, config, holidays_df=holidays_df)
+    future = m.make_future_dataframe(periods=config["forecast_periods"], freq=config["forecast_freq"])
+    return m, predict_forecast(m, future), prepared_df
@@ -0,0 +1,162 @@
+"""
+Lazy, cached forecast export.
+Downloads are serialized only when requested and cached per forecast ID,
+format and column selection, so reruns of the app never re-serialize a
+forecast nobody downloads. Supports CSV, gzip-compressed CSV and Parquet.
+Streamed forecasts (streaming_predict.py) are appended to the output file
+chunk by chunk with ExportWriter.
+"""
+
+import gzip
+import io
+from datetime import datetime
+
+from bounded_cache import BoundedLRU
+from forecast_engine import export_frame
+
+# Format -> (label, MIME type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("CSV", "text/csv", ".csv"),
+    "csv.gz": ("CSV (gzip)", "application/gzip", ".csv.gz"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet", ".parquet"),
+}
+
+# Columns preselected for download (run_date is always appended)
+DEFAULT_EXPORT_COLUMNS = ["ds", "yhat", "yhat_lower", "yhat_upper", "trend"]
+
+DEFAULT_EXPORT_CACHE_MB = 256
+
+
+def serialize_frame(df, fmt):
+    """DataFrame as bytes in one of EXPORT_FORMATS."""
+    if fmt == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    if fmt == "csv.gz":
+        return gzip.compress(df.to_csv(index=False).encode("utf-8"), compresslevel=6)
+    if fmt == "parquet":
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def export_file_name(prefix, fmt, when=None):
+    """Download file name with a timestamp and the format's extension."""
+    stamp = (when or datetime.now()).strftime('%Y%m%d_%H%M%S')
+    return f"{prefix}_{stamp}{EXPORT_FORMATS[fmt][2]}"
+
+
+class ExportCache(BoundedLRU):
+    """In-memory LRU of serialized exports keyed by forecast ID and options."""
+
+    def __init__(self, memory_limit_mb=DEFAULT_EXPORT_CACHE_MB):
+        super().__init__(memory_limit_mb)
+
+    def put(self, key, data):
+        super().put(key, data, len(data))
+
+
+def format_for_path(path):
+    """Export format for an output path by extension (CSV unless .csv.gz or .parquet/.pq)."""
+    lower = path.lower()
+    if lower.endswith(".csv.gz"):
+        return "csv.gz"
+    if lower.endswith((".parquet", ".pq")):
+        return "parquet"
+    return "csv"
+
+
+class ExportWriter:
+    """Appends forecast frames to one export file (CSV, gzip CSV or Parquet) as they arrive.
+
+    columns fixes the output columns up front; otherwise the first frame
+    does. Frames lacking some of them get empty values, and a frame with a
+    column outside them raises ValueError (the header is already written,
+    so it could only be dropped). Every row gets run_date, as in
+    export_frame. Use as a context manager.
+    """
+
+    def __init__(self, path, fmt=None, run_date=None, columns=None):
+        self.path = path
+        self.fmt = fmt or format_for_path(path)
+        if self.fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {self.fmt}")
+        self.run_date = run_date or datetime.now().strftime('%Y-%m-%d')
+        self.rows = 0
+        self._columns = None
+        if columns is not None:
+            self._columns = [c for c in columns if c != 'run_date'] + ['run_date']
+        self._file = None
+        self._parquet = None
+
+    def write(self, frame):
+        frame = export_frame(frame, run_date=self.run_date)
+        first = self._file is None and self._parquet is None
+        if self._columns is None:
+            self._columns = list(frame.columns)
+        extra = [c for c in frame.columns if c not in self._columns]
+        if extra:
+            raise ValueError(f"Columns not in the export file: {', '.join(extra)}")
+        frame = frame.reindex(columns=self._columns)
+        if first:
+            self._open(frame)
+        if self.fmt == "parquet":
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            self._parquet.write_table(table.cast(self._parquet.schema))
+        else:
+            frame.to_csv(self._file, header=first, index=False)
+        self.rows += len(frame)
+
+    def _open(self, frame):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self._parquet = pq.ParquetWriter(self.path, pa.Schema.from_pandas(frame, preserve_index=False))
+        elif self.fmt == "csv.gz":
+            self._file = gzip.open(self.path, "wt", compresslevel=6, newline="")
+        else:
+            self._file = open(self.path, "w", newline="")
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_columns(forecast, columns):
+    """Selected columns that exist in forecast, always including ds (run_date is added on export)."""
+    columns = [c for c in columns if c in forecast.columns and c != 'run_date']
+    if 'ds' not in columns:
+        columns.insert(0, 'ds')
+    return columns
+
+
+def export_key(forecast_id, fmt, columns, history_end=None, run_date=None):
+    """Cache key for one export of a forecast."""
+    return (forecast_id, fmt, tuple(columns), str(history_end), run_date or datetime.now().strftime('%Y-%m-%d'))
+
+
+def export_bytes(cache, forecast_id, forecast, fmt, columns, history_end=None, run_date=None):
+    """Serialized export of the selected columns plus run_date, cached per forecast ID.
+
+    Only the selected columns are copied; rows up to history_end are dropped.
+    """
+    run_date = run_date or datetime.now().strftime('%Y-%m-%d')
+    columns = export_columns(forecast, columns)
+    key = export_key(forecast_id, fmt, columns, history_end, run_date)
+    data = cache.get(key)
+    if data is None:
+        frame = export_frame(forecast[columns], history_end=history_end, run_date=run_date)
+        data = serialize_frame(frame, fmt)
+        cache.put(key, data)
+    return data
@@ -0,0 +1,311 @@
+"""
+Local HTTP forecasting service.
+Other tools POST a series (JSON or Parquet) and get the forecast frame back,
+through the same validate -> prepare -> preprocess -> fit -> predict pipeline
+as the app and CLI, with the shared fit cache in front. Fits run on a bounded
+worker pool; once every worker is busy and the queue is full, requests are
+rejected with 503 and Retry-After instead of piling up. Health and latency
+metrics are served as JSON, and every request is logged as a metric line.
+Standard library only (http.server); binds to localhost by default.
+
+Endpoints:
+    POST /forecast   JSON {"data": {"ds": [...], "y": [...]}, "config": {...}}
+                     or a Parquet body (config as JSON in X-Forecast-Config);
+                     responds in JSON, or Parquet with Accept: application/vnd.apache.parquet
+    GET  /health     Pool status
+    GET  /metrics    Request counts and latency percentiles
+"""
+
+import io
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from batch_forecast import default_worker_count
+from data_ingest import parse_ds, read_table
+from forecast_cache import ForecastCache, cached_fit_forecast
+from forecast_engine import export_frame, merge_run_config, prepare_data, validate_csv
+from instrumentation import metrics_logger
+from preprocessing import preprocess
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Requests allowed to wait for a worker beyond those running
+DEFAULT_QUEUE_SIZE = 32
+
+# Seconds a request waits for its forecast before 504
+DEFAULT_REQUEST_TIMEOUT = 300
+
+MAX_BODY_MB = 64
+
+# Recent requests kept for latency percentiles
+LATENCY_WINDOW = 1000
+
+JSON_TYPE = "application/json"
+PARQUET_TYPE = "application/vnd.apache.parquet"
+
+# Run config keys the service does not support (single series per request, whole response,
+# no server-side file paths)
+_UNSUPPORTED_CONFIG = (
+    "series_column", "hierarchy_columns", "stream_chunk_rows", "baseline_below_rows", "custom_holidays"
+)
+
+
+class ServiceBusy(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+
+def _latency_summary(values):
+    """Count, mean and percentiles (ms) of a sequence of seconds."""
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(ms), "mean": round(float(ms.mean()), 1), "p50": round(float(p50), 1),
+        "p95": round(float(p95), 1), "p99": round(float(p99), 1), "max": round(float(ms.max()), 1),
+    }
+
+
+def parse_json_payload(body):
+    """(data_df, user_config) from a JSON request body; data is columns or records."""
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(payload, dict) or "data" not in payload:
+        raise ValueError("JSON body must be an object with a 'data' field")
+    data = payload["data"]
+    data_df = pd.DataFrame(data) if isinstance(data, (dict, list)) else None
+    if data_df is None or data_df.empty:
+        raise ValueError("'data' must be a non-empty object of columns or list of records")
+    if "ds" in data_df.columns:
+        data_df["ds"] = parse_ds(data_df["ds"])
+    return data_df, payload.get("config") or {}
+
+
+def parse_parquet_payload(body, config_header=None):
+    """(data_df, user_config) from a Parquet body and an optional JSON config header."""
+    try:
+        data_df = read_table(io.BytesIO(body), name="payload.parquet")
+    except Exception as e:
+        raise ValueError(f"Invalid Parquet payload: {e}")
+    try:
+        user_config = json.loads(config_header) if config_header else {}
+    except ValueError as e:
+        raise ValueError(f"Invalid X-Forecast-Config header: {e}")
+    return data_df, user_config
+
+
+class ForecastService:
+    """Bounded worker pool running forecast requests, with request metrics."""
+
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 request_timeout=DEFAULT_REQUEST_TIMEOUT, cache=None):
+        self.workers = workers or default_worker_count()
+        self.queue_size = queue_size
+        self.request_timeout = request_timeout
+        self.cache = cache if cache is not None else ForecastCache()
+        # Stan runs in a cmdstan subprocess, so threads fit in parallel
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="forecast-service")
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.started_at = time.time()
+        self.counts = {"ok": 0, "client_error": 0, "server_error": 0, "rejected": 0, "timeout": 0}
+        self._latency = deque(maxlen=LATENCY_WINDOW)
+        self._fit_seconds = deque(maxlen=LATENCY_WINDOW)
+        self._queue_seconds = deque(maxlen=LATENCY_WINDOW)
+
+    def forecast(self, data_df, user_config):
+        """Run one request on the pool; returns (forecast frame, info). Raises ServiceBusy."""
+        config = merge_run_config(user_config)
+        unsupported = [key for key in _UNSUPPORTED_CONFIG if config[key]]
+        if unsupported:
+            raise ValueError(f"Not supported by the service (use the CLI): {', '.join(unsupported)}")
+        if not self._slots.acquire(blocking=False):
+            raise ServiceBusy()
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(self._run, data_df, config, time.perf_counter())
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.request_timeout)
+        except FutureTimeout:
+            # Drop it if still queued; a running fit finishes and fills the cache
+            future.cancel()
+            raise
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _run(self, data_df, config, submitted):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+        try:
+            is_valid, message = validate_csv(data_df)
+            if not is_valid:
+                raise ValueError(message)
+            prepared_df, _ = preprocess(
+                prepare_data(data_df), config["aggregate_reducer"], config["resample_rule"]
+            )
+            _, forecast, tier = cached_fit_forecast(
+                self.cache, prepared_df, config["model"], config["forecast_periods"], config["forecast_freq"],
+                country_code=config["country_holidays"], warm_start=config["warm_start"]
+            )
+            history_end = prepared_df['ds'].max() if config["future_only"] else None
+            info = {"rows": len(prepared_df), "cache": tier, "fit_seconds": time.perf_counter() - started,
+                    "queue_seconds": started - submitted}
+            return export_frame(forecast, history_end), info
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def record(self, outcome, seconds, info=None):
+        """Count a finished request and its latency."""
+        with self._lock:
+            self.counts[outcome] += 1
+            self._latency.append(seconds)
+            if info is not None:
+                self._fit_seconds.append(info["fit_seconds"])
+                self._queue_seconds.append(info["queue_seconds"])
+
+    def health(self):
+        with self._lock:
+            running, pending = self._running, self._pending
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "running": running,
+            "queued": pending - running,
+            "capacity": self.workers + self.queue_size,
+            "uptime_s": round(time.time() - self.started_at, 1),
+        }
+
+    def metrics(self):
+        with self._lock:
+            counts = dict(self.counts)
+            latency, fit, queue = list(self._latency), list(self._fit_seconds), list(self._queue_seconds)
+        cache = self.cache.stats()
+        return {
+            **self.health(),
+            "requests": {"total": sum(counts.values()), **counts},
+            "latency_ms": _latency_summary(latency),
+            "fit_ms": _latency_summary(fit),
+            "queue_wait_ms": _latency_summary(queue),
+            "fit_cache": {k: cache[k] for k in ("memory_hits", "disk_hits", "misses", "hit_rate")},
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ForecastRequestHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's ForecastService."""
+
+    server_version = "ProphetForecastService/1.0"
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            self._send_json(200, self.server.service.health())
+        elif path == "/metrics":
+            self._send_json(200, self.server.service.metrics())
+        else:
+            self._send_json(404, {"error": f"Unknown path {path}"})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        if path != "/forecast":
+            self._send_json(404, {"error": f"Unknown path {path}"})
+            return
+        service = self.server.service
+        request_id = uuid.uuid4().hex[:8]
+        start = time.perf_counter()
+        outcome, status, info = "ok", 200, None
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_MB * 1024 * 1024:
+                outcome, status = "client_error", 413
+                self._send_json(status, {"error": f"Payload larger than {MAX_BODY_MB} MB"})
+                return
+            body = self.rfile.read(length)
+            content_type = (self.headers.get("Content-Type") or JSON_TYPE).split(";")[0].strip()
+            if content_type == JSON_TYPE:
+                data_df, user_config = parse_json_payload(body)
+            else:
+                data_df, user_config = parse_parquet_payload(body, self.headers.get("X-Forecast-Config"))
+            forecast, info = service.forecast(data_df, user_config)
+            self._send_forecast(forecast, info, request_id)
+        except ServiceBusy:
+            outcome, status = "rejected", 503
+            self._send_json(status, {"error": "All workers busy and queue full; retry later"},
+                            headers={"Retry-After": "5"})
+        except FutureTimeout:
+            outcome, status = "timeout", 504
+            self._send_json(status, {"error": f"Forecast did not finish within {service.request_timeout}s"})
+        except ValueError as e:
+            outcome, status = "client_error", 400
+            self._send_json(status, {"error": str(e)})
+        except Exception as e:
+            outcome, status = "server_error", 500
+            self._send_json(status, {"error": str(e)})
+        finally:
+            seconds = time.perf_counter() - start
+            service.record(outcome, seconds, info)
+            metrics_logger().info(json.dumps({
+                "event": "request", "ts": round(time.time(), 3), "run_id": request_id,
+                "source": "service", "path": path, "status": status,
+                "seconds": round(seconds, 4), "rows": info["rows"] if info else None,
+                "cache": info["cache"] if info else None,
+            }))
+
+    def _send_forecast(self, forecast, info, request_id):
+        headers = {"X-Request-Id": request_id, "X-Fit-Cache": str(info["cache"] or "miss")}
+        if PARQUET_TYPE in (self.headers.get("Accept") or ""):
+            buffer = io.BytesIO()
+            forecast.to_parquet(buffer, index=False)
+            self._send(200, buffer.getvalue(), PARQUET_TYPE, headers)
+            return
+        body = (
+            f'{{"rows": {len(forecast)}, "history_rows": {info["rows"]}, '
+            f'"fit_seconds": {info["fit_seconds"]:.3f}, "forecast": '
+            + forecast.to_json(orient="records", date_format="iso") + "}"
+        )
+        self._send(200, body.encode(), JSON_TYPE, headers)
+
+    def _send_json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload).encode(), JSON_TYPE, headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Requests are logged as metric lines instead
+        pass
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, service=None):
+    """A ThreadingHTTPServer bound to host:port serving service (a ForecastService)."""
+    server = ThreadingHTTPServer((host, port), ForecastRequestHandler)
+    server.daemon_threads = True
+    server.service = service or ForecastService()
+    return server
@@ -0,0 +1,76 @@
+"""
+Indexed, paginated view of a forecast frame.
+Rows are kept sorted by ds so date filters are binary-search slices of the
+original frame (no copies or boolean masks); only the visible page is
+materialized, and summary statistics are cached per row range.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = [50, 100, 500, 1000]
+
+DEFAULT_PAGE_SIZE = 100
+
+# Cached (column, row range) summaries per table
+MAX_CACHED_SUMMARIES = 32
+
+SUMMARY_INDEX = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+class ForecastTable:
+    """A forecast sorted by ds with range lookups, pages and cached summaries."""
+
+    def __init__(self, forecast):
+        if not forecast['ds'].is_monotonic_increasing:
+            forecast = forecast.sort_values('ds', kind='stable').reset_index(drop=True)
+        self.frame = forecast
+        self.ds = forecast['ds'].to_numpy()
+        self._summaries = OrderedDict()
+
+    def __len__(self):
+        return len(self.frame)
+
+    def row_range(self, start=None, after=None):
+        """(lo, hi) row bounds for ds >= start, or ds > after."""
+        lo = 0
+        if after is not None:
+            lo = int(np.searchsorted(self.ds, np.datetime64(pd.Timestamp(after)), side='right'))
+        elif start is not None:
+            lo = int(np.searchsorted(self.ds, np.datetime64(pd.Timestamp(start)), side='left'))
+        return lo, len(self.ds)
+
+    def page(self, rows, page, page_size, columns):
+        """The columns of one page (1-based) within the (lo, hi) row range."""
+        lo, hi = rows
+        first = min(lo + (page - 1) * page_size, hi)
+        return self.frame.iloc[first:min(first + page_size, hi)][columns]
+
+    def summary(self, column, rows):
+        """describe()-style stats for a column over a row range, cached."""
+        key = (column, rows)
+        stats = self._summaries.get(key)
+        if stats is not None:
+            self._summaries.move_to_end(key)
+            return stats
+        lo, hi = rows
+        values = self.frame[column].to_numpy()[lo:hi]
+        values = values[~np.isnan(values)]
+        if len(values):
+            quantiles = np.percentile(values, [0, 25, 50, 75, 100])
+            std = values.std(ddof=1) if len(values) > 1 else np.nan
+            data = [len(values), values.mean(), std, *quantiles]
+        else:
+            data = [0] + [np.nan] * 7
+        stats = pd.Series(data, index=SUMMARY_INDEX, name=column)
+        self._summaries[key] = stats
+        while len(self._summaries) > MAX_CACHED_SUMMARIES:
+            self._summaries.popitem(last=False)
+        return stats
+
+
+def page_count(rows, page_size):
+    lo, hi = rows
+    return max(1, -(-(hi - lo) // page_size))
@@ -0,0 +1,248 @@
+"""
+Hierarchical forecasting.
+A long-format upload with hierarchy columns (e.g. country, market, store) is
+expanded into one series per node - every leaf plus every aggregate, up to
+the grand total - using a summing matrix S (nodes x leaves). Nodes are fitted
+like any batch (batch_forecast.py) and the base forecasts are reconciled
+with matrix operations so every parent equals the sum of its children:
+
+    reconciled = base @ P.T @ S.T,   P = (S' W^-1 S)^-1 S' W^-1
+
+W is the identity (OLS), the diagonal of in-sample residual variances (WLS)
+or their shrunk covariance (MinT); bottom-up simply sums the leaves.
+"""
+
+import numpy as np
+import pandas as pd
+
+NODE_COLUMN = "node"
+LEVEL_COLUMN = "level"
+TOTAL_NODE = "Total"
+NODE_SEPARATOR = "/"
+
+RECONCILIATION_METHODS = {
+    "mint_shrink": "MinT (shrinkage covariance)",
+    "wls_var": "WLS (residual variances)",
+    "ols": "OLS",
+    "bottom_up": "Bottom-up",
+    "none": "None (base forecasts)",
+}
+
+# Added to residual variances so constant nodes keep W invertible
+_MIN_VARIANCE = 1e-9
+
+
+class Hierarchy:
+    """Nodes (total first, leaves last), their level names and the summing matrix."""
+
+    def __init__(self, nodes, levels, summing_matrix):
+        self.nodes = nodes
+        self.levels = levels
+        self.summing_matrix = summing_matrix
+        self.n_leaves = summing_matrix.shape[1]
+
+    @property
+    def leaves(self):
+        return self.nodes[-self.n_leaves:]
+
+    def level_of(self):
+        """{node: level name}."""
+        return dict(zip(self.nodes, self.levels))
+
+
+def build_hierarchy(df, hierarchy_cols, reducer="sum"):
+    """Series for every node of the hierarchy defined by hierarchy_cols (top to bottom).
+
+    Rows sharing a leaf and ds are first combined with reducer. Aggregate
+    nodes sum their leaves on each ds where at least one leaf has a value.
+    Returns (node_df with node/ds/y columns, Hierarchy).
+    """
+    if not hierarchy_cols:
+        raise ValueError("At least one hierarchy column is needed")
+    df = df[hierarchy_cols + ['ds', 'y']].dropna(subset=['ds'])
+    paths = df[hierarchy_cols].astype(str)
+
+    # Node id per row at every level: "US", "US/East", "US/East/store1"
+    level_ids = [paths.iloc[:, 0]]
+    for col in hierarchy_cols[1:]:
+        level_ids.append(level_ids[-1] + NODE_SEPARATOR + paths[col])
+    leaf_ids = level_ids[-1]
+
+    leaves = (
+        pd.DataFrame({'leaf': leaf_ids.to_numpy(), 'ds': df['ds'].to_numpy(),
+                      'y': pd.to_numeric(df['y'], errors='coerce').to_numpy()})
+        .groupby(['leaf', 'ds'], sort=True)['y'].agg(reducer)
+        .unstack('leaf')
+    )
+    leaf_names = leaves.columns.tolist()
+
+    # Summing matrix: one row per node, one column per leaf
+    leaf_paths = pd.DataFrame({'leaf': leaf_ids, **{i: ids for i, ids in enumerate(level_ids)}})
+    leaf_paths = leaf_paths.drop_duplicates('leaf').set_index('leaf').loc[leaf_names]
+    nodes = [TOTAL_NODE]
+    levels = ["total"]
+    rows = [np.ones(len(leaf_names))]
+    for i, col in enumerate(hierarchy_cols):
+        codes, uniques = pd.factorize(leaf_paths[i], sort=True)
+        block = np.zeros((len(uniques), len(leaf_names)))
+        block[codes, np.arange(len(leaf_names))] = 1.0
+        nodes.extend(uniques.tolist())
+        levels.extend([col] * len(uniques))
+        rows.extend(block)
+    summing_matrix = np.vstack(rows)
+
+    # Every node's series in one matrix product
+    values = leaves.to_numpy()
+    observed = ~np.isnan(values)
+    sums = np.where(observed, values, 0.0) @ summing_matrix.T
+    counts = observed.astype(float) @ summing_matrix.T
+    node_values = pd.DataFrame(np.where(counts > 0, sums, np.nan), index=leaves.index, columns=nodes)
+    node_df = (
+        node_values.rename_axis(columns=NODE_COLUMN).stack().rename('y').reset_index()
+        [[NODE_COLUMN, 'ds', 'y']]
+    )
+    return node_df, Hierarchy(nodes, levels, summing_matrix)
+
+
+def _shrink_covariance(residuals):
+    """Schafer-Strimmer shrinkage of the residual covariance toward its diagonal."""
+    n = residuals.shape[0]
+    covariance = residuals.T @ residuals / n
+    std = np.sqrt(np.maximum(np.diag(covariance), _MIN_VARIANCE))
+    scaled = residuals / std
+    correlation = covariance / np.outer(std, std)
+    v = (scaled ** 2).T @ (scaled ** 2) - (scaled.T @ scaled) ** 2 / n
+    v *= 1.0 / (n * (n - 1))
+    np.fill_diagonal(v, 0.0)
+    off_diagonal = correlation.copy()
+    np.fill_diagonal(off_diagonal, 0.0)
+    denominator = (off_diagonal ** 2).sum()
+    shrinkage = 1.0 if denominator == 0 else min(max(v.sum() / denominator, 0.0), 1.0)
+    shrunk = shrinkage * np.diag(np.diag(covariance)) + (1 - shrinkage) * covariance
+    return shrunk + np.eye(len(shrunk)) * _MIN_VARIANCE, shrinkage
+
+
+def reconciliation_matrix(summing_matrix, method, residuals=None):
+    """P (leaves x nodes) such that base @ P.T @ S.T is coherent.
+
+    Returns (P, details) where details may hold the MinT shrinkage.
+    """
+    S = summing_matrix
+    n_nodes, n_leaves = S.shape
+    details = {}
+    if method == "bottom_up":
+        P = np.zeros((n_leaves, n_nodes))
+        P[:, n_nodes - n_leaves:] = np.eye(n_leaves)
+        return P, details
+    if method == "ols":
+        W = np.eye(n_nodes)
+    elif method == "wls_var":
+        W = np.diag(np.maximum((residuals ** 2).mean(axis=0), _MIN_VARIANCE))
+    elif method == "mint_shrink":
+        W, details["shrinkage"] = _shrink_covariance(residuals)
+    else:
+        raise ValueError(f"Unknown reconciliation method '{method}'")
+    W_inv_S = np.linalg.solve(W, S)
+    P = np.linalg.solve(S.T @ W_inv_S, W_inv_S.T)
+    return P, details
+
+
+def coherence_error(values, summing_matrix):
+    """Largest |node - sum of its leaves| over a (rows x nodes) matrix."""
+    n_leaves = summing_matrix.shape[1]
+    return float(np.nanmax(np.abs(values - values[:, -n_leaves:] @ summing_matrix.T))) if len(values) else 0.0
+
+
+def reconcile(results, node_df, hierarchy, method="mint_shrink"):
+    """Reconcile per-node batch results (see batch_forecast.fit_series) in place of their yhat.
+
+    Reconciliation runs on the ds values every node's forecast shares; the
+    base forecast is kept as yhat_base and the intervals are shifted by the
+    same adjustment. If a node failed, aggregates fall back to bottom-up
+    (and nothing is reconciled if a leaf failed). Returns (results, report).
+    """
+    report = {"method": method, "coherence_before": None, "coherence_after": None,
+              "rows": 0, "message": None}
+    if method == "none":
+        return results, report
+    forecasts = {r["key"]: r["forecast"] for r in results if r["forecast"] is not None}
+    missing = [node for node in hierarchy.nodes if node not in forecasts]
+    if any(node in missing for node in hierarchy.leaves):
+        report["message"] = "Some leaf series failed; forecasts were not reconciled"
+        return results, report
+    if missing and method != "bottom_up":
+        report["message"] = f"{len(missing)} aggregate node(s) failed; reconciled bottom-up instead"
+        method = report["method"] = "bottom_up"
+
+    # Base forecasts on shared dates: rows x nodes (failed aggregates stay NaN, unused by bottom-up)
+    common_ds = None
+    for node in hierarchy.nodes:
+        if node in forecasts:
+            ds = pd.Index(forecasts[node]['ds'])
+            common_ds = ds if common_ds is None else common_ds.intersection(ds)
+    common_ds = common_ds.sort_values()
+    base = np.column_stack([
+        forecasts[node].set_index('ds')['yhat'].reindex(common_ds).to_numpy()
+        if node in forecasts else np.full(len(common_ds), np.nan)
+        for node in hierarchy.nodes
+    ])
+
+    residuals = None
+    if method in ("wls_var", "mint_shrink"):
+        actual = node_df.pivot(index='ds', columns=NODE_COLUMN, values='y').reindex(
+            index=common_ds, columns=hierarchy.nodes
+        ).to_numpy()
+        residuals = actual - base
+        residuals = residuals[~np.isnan(residuals).any(axis=1)]
+        if len(residuals) < 2:
+            report["message"] = "Too few in-sample residuals for covariance scaling; used OLS"
+            method = report["method"] = "ols"
+
+    try:
+        P, details = reconciliation_matrix(hierarchy.summing_matrix, method, residuals)
+    except np.linalg.LinAlgError:
+        report["message"] = "Residual covariance is singular; reconciled bottom-up instead"
+        method = report["method"] = "bottom_up"
+        P, details = reconciliation_matrix(hierarchy.summing_matrix, method)
+    report.update(details)
+    S = hierarchy.summing_matrix
+    if method == "bottom_up":
+        reconciled = base[:, -hierarchy.n_leaves:] @ S.T
+    else:
+        reconciled = (base @ P.T) @ S.T
+    report["coherence_before"] = coherence_error(base, S) if not missing else None
+    report["coherence_after"] = coherence_error(reconciled, S)
+    report["rows"] = len(common_ds)
+
+    adjustment = pd.DataFrame(reconciled - base, index=common_ds, columns=hierarchy.nodes)
+    reconciled = pd.DataFrame(reconciled, index=common_ds, columns=hierarchy.nodes)
+    out = []
+    for result in results:
+        node = result["key"]
+        forecast = forecasts.get(node)
+        if forecast is None:
+            # A failed aggregate gets its bottom-up forecast (without intervals); the error stays
+            if node in hierarchy.nodes:
+                forecast = pd.DataFrame({
+                    'ds': common_ds, 'yhat': reconciled[node].to_numpy(), 'yhat_base': np.nan
+                })
+                result = {**result, "forecast": forecast}
+            out.append(result)
+            continue
+        forecast = forecast.copy()
+        forecast['yhat_base'] = forecast['yhat']
+        delta = adjustment[node].reindex(forecast['ds']).fillna(0.0).to_numpy()
+        for col in ('yhat', 'yhat_lower', 'yhat_upper'):
+            if col in forecast.columns:
+                forecast[col] = forecast[col] + delta
+        out.append({**result, "forecast": forecast})
+    return out, report
+
+
+def label_levels(frame, hierarchy):
+    """Insert the level name of each row's node after the node column."""
+    if frame.empty:
+        return frame
+    frame = frame.copy()
+    frame.insert(frame.columns.get_loc(NODE_COLUMN) + 1, LEVEL_COLUMN, frame[NODE_COLUMN].map(hierarchy.level_of()))
+    return frame
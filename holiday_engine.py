@@ -0,0 +1,212 @@
+"""
+Multi-calendar holiday engine.
+Combines several country/subdivision calendars with custom events into one
+deduplicated holidays frame, and builds Prophet's holiday feature matrix in a
+single vectorized pass (Prophet loops over every holiday row and window
+offset). Feature matrices are cached per (dates, holidays) so fits and
+predicts that share a date range - tuning folds, batch series, refits - reuse
+them instead of rebuilding wide design matrices.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+
+from bounded_cache import BoundedLRU
+from forecast_cache import fingerprint_frame
+from holiday_tables import country_holidays_frame
+
+DEFAULT_FEATURE_CACHE_MB = 256
+
+def parse_country_codes(country_code):
+    """Country codes from "US", "US,GB-ENG" or a list; empty for None. Order kept, duplicates dropped."""
+    if not country_code:
+        return []
+    if isinstance(country_code, str):
+        country_code = country_code.split(",")
+    codes = [code.strip().upper() for code in country_code if code and code.strip()]
+    return list(dict.fromkeys(codes))
+
+
+def normalize_holidays(holidays_df):
+    """Holidays frame with parsed ds and integer windows (missing windows become 0)."""
+    df = holidays_df.copy()
+    df["ds"] = pd.to_datetime(df["ds"])
+    df["holiday"] = df["holiday"].astype(str)
+    for col in ("lower_window", "upper_window"):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
+        else:
+            df[col] = 0
+    return df
+
+
+def deduplicate_holidays(holidays_df):
+    """One row per (ds, holiday); overlapping windows are merged to their union."""
+    agg = {"lower_window": "min", "upper_window": "max"}
+    if "prior_scale" in holidays_df.columns:
+        agg["prior_scale"] = "first"
+    return (
+        holidays_df.groupby(["ds", "holiday"], sort=True, as_index=False).agg(agg)
+    )
+
+
+def combine_holidays(country_code, start_year, end_year, custom_df=None):
+    """Deduplicated holidays for every calendar in country_code plus custom events, or None."""
+    frames = [
+        country_holidays_frame(code, start_year, end_year) for code in parse_country_codes(country_code)
+    ]
+    if custom_df is not None and len(custom_df):
+        frames.append(custom_df)
+    if not frames:
+        return None
+    combined = pd.concat([normalize_holidays(f) for f in frames], ignore_index=True, sort=False)
+    return deduplicate_holidays(combined)
+
+
+def cover_holiday_years(m, dates):
+    """Extend a model's holidays frame so its country calendars cover the years of dates.
+
+    The calendars (m.holiday_calendars, set by build_model or load_model)
+    are generated for the fit's history and horizon only; predicting further
+    would otherwise drop every country holiday effect. Custom events are
+    fixed dates and are kept as they are. No-op for models without calendars.
+    """
+    codes = getattr(m, "holiday_calendars", None)
+    if not codes or m.holidays is None or len(dates) == 0:
+        return
+    dates = pd.to_datetime(pd.Series(dates))
+    first, last = int(dates.min().year), int(dates.max().year)
+    covered = getattr(m, "holiday_years", None)
+    if covered is not None:
+        if covered[0] <= first and last <= covered[1]:
+            return
+        first, last = min(first, covered[0]), max(last, covered[1])
+    # Overlapping years deduplicate back to the rows already present
+    m.holidays = combine_holidays(codes, first, last, custom_df=m.holidays)
+    m.holiday_years = (first, last)
+
+
+def _normalized_days(values):
+    """datetime64 day values (time of day dropped) of a date Series."""
+    values = pd.Series(values)
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        values = pd.to_datetime(values)
+    return values.dt.normalize().to_numpy()
+
+
+def _windows(holidays):
+    """Per-row (lower, upper) windows, both 0 where either is missing (as Prophet does)."""
+    n = len(holidays)
+    lower = pd.to_numeric(holidays["lower_window"], errors="coerce").to_numpy(float) if "lower_window" in holidays else np.zeros(n)
+    upper = pd.to_numeric(holidays["upper_window"], errors="coerce").to_numpy(float) if "upper_window" in holidays else np.zeros(n)
+    invalid = np.isnan(lower) | np.isnan(upper)
+    lower = np.where(invalid, 0, np.trunc(lower)).astype(np.int64)
+    upper = np.where(invalid, 0, np.trunc(upper)).astype(np.int64)
+    return lower, upper
+
+
+def _prior_scales(holidays, default_prior_scale):
+    """{holiday: prior scale} in order of first appearance; validated like Prophet."""
+    names = holidays["holiday"].to_numpy()
+    if "prior_scale" in holidays:
+        scales = pd.to_numeric(holidays["prior_scale"], errors="coerce").to_numpy(float)
+        scales = np.where(np.isnan(scales), float(default_prior_scale), scales)
+    else:
+        scales = np.full(len(holidays), float(default_prior_scale))
+    per_name = pd.DataFrame({"holiday": names, "prior_scale": scales})
+    if (per_name.groupby("holiday", sort=False)["prior_scale"].nunique() > 1).any():
+        bad = per_name.groupby("holiday", sort=False)["prior_scale"].nunique()
+        raise ValueError(
+            f"Holiday {bad[bad > 1].index[0]!r} does not have consistent prior scale specification."
+        )
+    if (scales <= 0).any():
+        raise ValueError("Prior scale must be > 0")
+    first = per_name.drop_duplicates("holiday")
+    return dict(zip(first["holiday"], first["prior_scale"]))
+
+
+def holiday_features(dates, holidays, default_prior_scale):
+    """Vectorized equivalent of Prophet.make_holiday_features.
+
+    Returns (features, prior_scale_list, holiday_names) with the same
+    columns, column order and values as Prophet builds.
+    """
+    prior_scales = _prior_scales(holidays, default_prior_scale)
+    lower, upper = _windows(holidays)
+
+    # One entry per (holiday row, window offset)
+    counts = np.maximum(upper - lower + 1, 0)
+    rows = np.repeat(np.arange(len(holidays)), counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    offsets = lower[rows] + (np.arange(len(rows)) - starts)
+    event_days = _normalized_days(holidays["ds"])[rows] + offsets.astype("timedelta64[D]")
+    keys = (
+        pd.Series(holidays["holiday"].to_numpy()[rows], dtype=object)
+        + "_delim_" + np.where(offsets >= 0, "+", "-") + pd.Series(np.abs(offsets)).astype(str)
+    )
+    columns = sorted(set(keys))
+    column_index = pd.Index(columns).get_indexer(keys)
+
+    # Every date row on an event day (sub-daily data has several per day)
+    days = _normalized_days(dates)
+    order = np.argsort(days, kind="stable")
+    sorted_days = days[order]
+    lo = np.searchsorted(sorted_days, event_days, side="left")
+    hi = np.searchsorted(sorted_days, event_days, side="right")
+    matches = np.where(pd.isna(event_days), 0, hi - lo)
+    event_ids = np.repeat(np.arange(len(event_days)), matches)
+    positions = lo[event_ids] + (np.arange(len(event_ids)) - np.repeat(np.cumsum(matches) - matches, matches))
+
+    values = np.zeros((len(days), len(columns)))
+    values[order[positions], column_index[event_ids]] = 1.0
+    features = pd.DataFrame(values, columns=columns)
+    prior_scale_list = [prior_scales[c.split("_delim_")[0]] for c in columns]
+    return features, prior_scale_list, list(prior_scales)
+
+
+class HolidayFeatureCache(BoundedLRU):
+    """In-memory LRU of holiday feature matrices keyed by dates and holidays."""
+
+    def __init__(self, memory_limit_mb=DEFAULT_FEATURE_CACHE_MB):
+        super().__init__(memory_limit_mb)
+
+    def get_or_build(self, dates, holidays, default_prior_scale):
+        """(features, prior_scale_list, holiday_names) for dates and holidays."""
+        h = hashlib.sha256()
+        h.update(pd.util.hash_pandas_object(pd.Series(dates), index=False).values.tobytes())
+        h.update(fingerprint_frame(holidays).encode())
+        h.update(repr(float(default_prior_scale)).encode())
+        entry, _ = super().get_or_build(
+            h.hexdigest(),
+            lambda: holiday_features(dates, holidays, default_prior_scale),
+            lambda entry: entry[0].values.nbytes
+        )
+        return entry
+
+
+# Per process: batch and tuning workers each keep their own
+feature_cache = HolidayFeatureCache()
+
+
+class HolidayEngineProphet(Prophet):
+    """Prophet whose holiday features come from the vectorized, cached engine.
+
+    Serializes as a plain Prophet model (same features, built the slow way
+    after loading). Country calendars follow the predicted dates (see
+    cover_holiday_years).
+    """
+
+    def construct_holiday_dataframe(self, dates):
+        cover_holiday_years(self, dates)
+        return super().construct_holiday_dataframe(dates)
+
+    def make_holiday_features(self, dates, holidays):
+        features, prior_scale_list, holiday_names = feature_cache.get_or_build(
+            dates, holidays, self.holidays_prior_scale
+        )
+        if self.train_holiday_names is None:
+            self.train_holiday_names = pd.Series(holiday_names)
+        return features, list(prior_scale_list), list(holiday_names)
@@ -0,0 +1,62 @@
+"""
+Precomputed country holiday tables.
+Holiday frames are generated once per country (or ISO 3166-2 subdivision such
+as "US-CA") and year range, then kept in a per-process memory cache backed by
+pickles on disk, so fits pass a ready-made holidays frame to Prophet instead
+of regenerating dates from python-holidays on every fit.
+"""
+
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+from forecast_cache import CACHE_DIR
+
+HOLIDAY_CACHE_DIR = os.path.join(CACHE_DIR, "holidays")
+
+
+def split_country_code(country_code):
+    """"US-CA" -> ("US", "CA"); "US" -> ("US", None)."""
+    country, _, subdivision = country_code.partition("-")
+    return country, subdivision or None
+
+
+def _cache_path(country_code, start_year, end_year, cache_dir):
+    return os.path.join(cache_dir, f"{country_code}-{start_year}-{end_year}.pkl")
+
+
+@lru_cache(maxsize=128)
+def _holiday_frame(country_code, start_year, end_year, cache_dir):
+    path = _cache_path(country_code, start_year, end_year, cache_dir)
+    try:
+        return pd.read_pickle(path)
+    except (OSError, ValueError, EOFError):
+        pass
+
+    from prophet.make_holidays import make_holidays_df
+
+    country, subdivision = split_country_code(country_code)
+    frame = make_holidays_df(
+        year_list=list(range(start_year, end_year + 1)), country=country, province=subdivision
+    )
+    frame = frame.sort_values(['ds', 'holiday']).reset_index(drop=True)
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        frame.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    return frame
+
+
+def country_holidays_frame(country_code, start_year, end_year, cache_dir=HOLIDAY_CACHE_DIR):
+    """Holidays (ds, holiday) for a country or subdivision over a year range.
+
+    Built with prophet.make_holidays.make_holidays_df on first use, then
+    served from memory or disk. Returns a copy, safe to modify.
+    """
+    return _holiday_frame(country_code, int(start_year), int(end_year), cache_dir).copy()
+
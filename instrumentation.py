@@ -0,0 +1,205 @@
+"""
+Per-stage pipeline instrumentation.
+Each stage (read, validate, prepare, holidays, fit, predict, plot, export)
+is recorded with its wall time, row count and resident-memory delta. Every
+record is also emitted as a one-line JSON log message on the
+"prophet_forecast_app.metrics" logger for external collectors.
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+METRICS_LOGGER = "prophet_forecast_app.metrics"
+
+_PAGE_MB = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024) if hasattr(os, "sysconf") else None
+
+
+def metrics_logger():
+    """Logger for structured metric lines (JSON, one per line, on stderr)."""
+    logger = logging.getLogger(METRICS_LOGGER)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def current_rss_mb():
+    """Resident memory of this process in MB, or None if unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_MB
+    except (OSError, ValueError, IndexError, TypeError):
+        pass
+    try:
+        import resource
+        # Peak, not current, on platforms without /proc
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+    except (ImportError, OSError):
+        return None
+
+
+class RunTrace:
+    """Stage records for one pipeline run (a rerun, or a background fit)."""
+
+    def __init__(self, run_id, source):
+        self.run_id = run_id
+        self.source = source
+        self.stages = []
+        self.optimizer = None
+
+    def record(self, stage, seconds, rows=None, mem_delta_mb=None, **extra):
+        """Add a finished stage and emit it as a structured log line."""
+        entry = {
+            "stage": stage,
+            "seconds": round(seconds, 4),
+            "rows": rows,
+            "mem_delta_mb": None if mem_delta_mb is None else round(mem_delta_mb, 2),
+            **extra,
+        }
+        self.stages.append(entry)
+        metrics_logger().info(json.dumps({
+            "event": "stage", "ts": round(time.time(), 3), "run_id": self.run_id,
+            "source": self.source, **entry
+        }, default=str))
+        return entry
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Time the enclosed block. Yields a dict; set "rows" in it if only known afterwards."""
+        info = {"rows": rows}
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            seconds = time.perf_counter() - start
+            rss_after = current_rss_mb()
+            delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            self.record(name, seconds, info.get("rows"), delta)
+
+    def set_optimizer(self, details):
+        """Attach optimizer details and emit them as a structured log line."""
+        self.optimizer = details
+        if details is not None:
+            metrics_logger().info(json.dumps({
+                "event": "optimizer", "ts": round(time.time(), 3), "run_id": self.run_id,
+                "source": self.source, **details
+            }, default=str))
+
+    def to_frame(self):
+        return pd.DataFrame(self.stages, columns=["stage", "seconds", "rows", "mem_delta_mb"])
+
+
+# Largest split R-hat accepted as converged for MCMC fits
+MAX_CONVERGED_RHAT = 1.05
+
+
+def optimizer_details(m):
+    """cmdstanpy details of a freshly fitted model, or None (e.g. loaded from cache).
+
+    MAP fits: method, algorithm, iterations, iteration limit, convergence
+    flag and message, and the final log density. MCMC fits: chains, draws,
+    divergent transitions and the largest R-hat (converged if below
+    MAX_CONVERGED_RHAT).
+    """
+    backend = getattr(m, "stan_backend", None)
+    fit = getattr(backend, "stan_fit", None)
+    if fit is None:
+        return None
+    if m.mcmc_samples:
+        return _sampler_details(backend, fit)
+
+    details = {
+        "backend": backend.get_type() if hasattr(backend, "get_type") else None,
+        "method": "sample" if m.mcmc_samples else "optimize",
+        "algorithm": None,
+        "iterations": None,
+        "iter_limit": None,
+        "converged": getattr(fit, "converged", None),
+        "message": None,
+        "log_prob": None,
+    }
+    try:
+        cmd = fit.runset.cmd(0)
+        for arg in cmd:
+            if arg.startswith("algorithm="):
+                details["algorithm"] = arg.split("=", 1)[1]
+            elif arg.startswith("iter="):
+                details["iter_limit"] = int(arg.split("=", 1)[1])
+    except Exception:
+        pass
+    try:
+        with open(fit.runset.stdout_files[0], "r") as f:
+            stdout = f.read()
+        iterations = re.findall(r"^\s+(\d+)\s+-?[\d.e+-]+\s", stdout, flags=re.MULTILINE)
+        if iterations:
+            details["iterations"] = int(iterations[-1])
+        match = re.search(r"Optimization terminated [^\n]*\n\s*([^\n]+)", stdout)
+        if match:
+            details["message"] = match.group(1).strip()
+            # cmdstan reports hitting the iteration limit as a normal termination
+            if details["message"].startswith("Maximum number of iterations"):
+                details["converged"] = False
+    except (OSError, IndexError, AttributeError):
+        pass
+    try:
+        if not m.mcmc_samples:
+            details["log_prob"] = float(fit.optimized_params_dict["lp__"])
+    except Exception:
+        pass
+    return details
+
+
+def _sampler_details(backend, fit):
+    details = {
+        "backend": backend.get_type() if hasattr(backend, "get_type") else None,
+        "method": "sample",
+        "algorithm": "hmc-nuts",
+        "chains": getattr(fit, "chains", None),
+        "draws": getattr(fit, "num_draws_sampling", None),
+        "divergences": None,
+        "max_rhat": None,
+        "converged": None,
+    }
+    try:
+        details["divergences"] = int(sum(fit.divergences))
+    except Exception:
+        pass
+    try:
+        rhat = fit.summary()["R_hat"].dropna()
+        if len(rhat):
+            details["max_rhat"] = round(float(rhat.max()), 4)
+            details["converged"] = details["max_rhat"] < MAX_CONVERGED_RHAT
+    except Exception:
+        pass
+    return details
+
+
+def optimizer_summary(details):
+    """One-line description of optimizer_details, e.g. "LBFGS, 85 iterations, converged"."""
+    if not details:
+        return None
+    if details.get("method") == "sample":
+        parts = [f"MCMC, {details.get('chains')} chains x {details.get('draws')} draws"]
+        if details.get("max_rhat") is not None:
+            parts.append(f"max R-hat {details['max_rhat']:.3f}")
+        if details.get("divergences"):
+            parts.append(f"{details['divergences']} divergent")
+    else:
+        parts = [details.get("algorithm") or "optimize"]
+        if details.get("iterations") is not None:
+            parts.append(f"{details['iterations']} iterations")
+    if details.get("converged") is not None:
+        parts.append("converged" if details["converged"] else "NOT converged")
+    return ", ".join(parts)
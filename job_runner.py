@@ -0,0 +1,249 @@
+"""
+Background forecast jobs.
+Fits are submitted to a shared thread pool (Stan itself runs in a cmdstan
+subprocess) so a Streamlit rerun never blocks on or discards a running fit.
+Each job has an ID and a live status; finished results are kept in memory
+and written to disk so any rerun - or another session - can pick them up.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from prophet.serialize import model_to_json, model_from_json
+
+from batch_forecast import default_worker_count
+from forecast_cache import CACHE_DIR, cached_fit_forecast
+from instrumentation import RunTrace, current_rss_mb, optimizer_details
+
+JOBS_DIR = os.path.join(CACHE_DIR, "jobs")
+
+# Finished jobs kept in memory (results stay on disk beyond this)
+MAX_FINISHED_JOBS = 50
+
+# Job results kept on disk (oldest removed first)
+MAX_STORED_JOBS = 200
+
+QUEUED, FITTING, PREDICTING, DONE, FAILED, CANCELLED = (
+    "queued", "fitting", "predicting", "done", "failed", "cancelled"
+)
+FINISHED_STATES = {DONE, FAILED, CANCELLED}
+
+# Trace stage name for each running status
+STAGE_NAMES = {FITTING: "fit", PREDICTING: "predict"}
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it is cancelled between stages."""
+
+
+class Job:
+    """Status and result of one submitted forecast."""
+
+    def __init__(self, job_id, label, owner=None):
+        self.job_id = job_id
+        self.label = label
+        self.owner = owner
+        self.status = QUEUED
+        self.error = None
+        self.cache_tier = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.point_forecast = None
+        self.trace = RunTrace(job_id, "job")
+        self.model = None
+        self.forecast = None
+
+    @property
+    def elapsed(self):
+        """Seconds since the job started running (or was queued)."""
+        start = self.started_at or self.submitted_at
+        return (self.finished_at or time.time()) - start
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def as_row(self):
+        return {
+            "job_id": self.job_id,
+            "label": self.label,
+            "status": self.status,
+            "elapsed_s": round(self.elapsed, 1),
+            "error": self.error or "",
+        }
+
+
+class JobRunner:
+    """Thread pool running forecast jobs, shared by every session of the app."""
+
+    def __init__(self, max_workers=None, jobs_dir=JOBS_DIR):
+        self.jobs_dir = jobs_dir
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or default_worker_count(), thread_name_prefix="forecast-job"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+    def submit_fit(self, label, cache, prepared_df, model_params, forecast_periods, forecast_freq,
+                   country_code=None, holidays_df=None, warm_start=False, owner=None):
+        """Queue a cached fit + predict; returns the job ID."""
+        job = Job(f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}", label, owner)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        job.future = self._executor.submit(
+            self._run_fit, job, cache, prepared_df, model_params, forecast_periods, forecast_freq,
+            country_code, holidays_df, warm_start
+        )
+        return job.job_id
+
+    def get(self, job_id):
+        """The Job for job_id, reloaded from disk if it (or its result) is no longer in memory."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None and not (job.status == DONE and job.model is None):
+            return job
+        return self._load(job_id) or job
+
+    def release(self, job_id):
+        """Drop a finished job's result from memory once it has been collected (it stays on disk)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None and job.finished:
+            job.model = job.forecast = job.point_forecast = None
+
+    def jobs(self, owner=None):
+        """Jobs in memory (optionally one owner's), newest first."""
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if owner is None or j.owner == owner]
+        return sorted(jobs, key=lambda j: j.submitted_at, reverse=True)
+
+    def cancel(self, job_id):
+        """Cancel a job. Queued jobs never start; a running fit is stopped
+        before its next stage and its result discarded."""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return True
+
+    def _run_fit(self, job, cache, prepared_df, model_params, forecast_periods, forecast_freq,
+                 country_code, holidays_df, warm_start):
+        job.started_at = time.time()
+        # Stage timing: each status change closes the previous stage
+        clock = {"stage": None, "start": None, "rss": None}
+
+        def close_stage(rows=None, name=None):
+            if clock["stage"] is None:
+                return
+            rss = current_rss_mb()
+            job.trace.record(
+                name or STAGE_NAMES[clock["stage"]], time.perf_counter() - clock["start"], rows,
+                rss - clock["rss"] if rss is not None and clock["rss"] is not None else None
+            )
+            clock["stage"] = None
+
+        def on_stage(stage):
+            if job.cancel_event.is_set():
+                raise JobCancelled()
+            if stage == clock["stage"]:
+                return
+            close_stage(rows=len(prepared_df))
+            job.status = stage
+            clock.update(stage=stage, start=time.perf_counter(), rss=current_rss_mb())
+
+        def on_point_forecast(point_forecast):
+            job.point_forecast = point_forecast
+
+        try:
+            on_stage(FITTING)
+            m, forecast, tier = cached_fit_forecast(
+                cache, prepared_df, model_params, forecast_periods, forecast_freq,
+                country_code=country_code, holidays_df=holidays_df, warm_start=warm_start,
+                on_point_forecast=on_point_forecast, on_stage=on_stage
+            )
+            close_stage(rows=len(forecast), name=f"{tier}_cache_load" if tier in ("memory", "disk") else None)
+            if tier not in ("memory", "disk"):
+                job.trace.set_optimizer(optimizer_details(m))
+            if job.cancel_event.is_set():
+                raise JobCancelled()
+            job.model, job.forecast, job.cache_tier = m, forecast, tier
+            self._save(job)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    # Caller holds the lock
+    def _prune(self):
+        finished = sorted(
+            (j for j in self._jobs.values() if j.finished), key=lambda j: j.submitted_at
+        )
+        for job in finished[:-MAX_FINISHED_JOBS]:
+            del self._jobs[job.job_id]
+
+    def _save(self, job):
+        path = os.path.join(self.jobs_dir, job.job_id)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            with open(os.path.join(tmp_path, "model.json"), "w") as f:
+                f.write(model_to_json(job.model))
+            job.forecast.to_pickle(os.path.join(tmp_path, "forecast.pkl"))
+            with open(os.path.join(tmp_path, "job.json"), "w") as f:
+                json.dump({
+                    "job_id": job.job_id,
+                    "label": job.label,
+                    "owner": job.owner,
+                    "cache_tier": job.cache_tier,
+                    "submitted_at": job.submitted_at,
+                    "started_at": job.started_at,
+                    "finished_at": time.time(),
+                }, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+
+        stored = sorted(
+            (os.path.join(self.jobs_dir, name) for name in os.listdir(self.jobs_dir) if ".tmp-" not in name),
+            key=os.path.getmtime
+        )
+        for old_path in stored[:-MAX_STORED_JOBS]:
+            shutil.rmtree(old_path, ignore_errors=True)
+
+    def _load(self, job_id):
+        path = os.path.join(self.jobs_dir, job_id)
+        try:
+            with open(os.path.join(path, "job.json"), "r") as f:
+                meta = json.load(f)
+            with open(os.path.join(path, "model.json"), "r") as f:
+                model = model_from_json(f.read())
+            forecast = pd.read_pickle(os.path.join(path, "forecast.pkl"))
+        except (OSError, ValueError, KeyError):
+            return None
+        job = Job(meta["job_id"], meta["label"], meta.get("owner"))
+        job.status = DONE
+        job.cache_tier = meta.get("cache_tier")
+        job.submitted_at = meta["submitted_at"]
+        job.started_at = meta["started_at"]
+        job.finished_at = meta["finished_at"]
+        job.model, job.forecast = model, forecast
+        return job
@@ -0,0 +1,126 @@
+"""
+Persistent model registry.
+Saves fitted Prophet models (prophet.serialize.model_to_json) with their data
+fingerprint and parameters so they can be listed, loaded and used for
+predict-only runs (new horizon or frequency) without refitting.
+"""
+
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+
+from prophet.serialize import model_to_json, model_from_json
+
+from forecast_cache import fingerprint_frame
+from holiday_engine import cover_holiday_years, parse_country_codes
+from uncertainty import predict_intervals
+
+REGISTRY_DIR = os.environ.get(
+    "PROPHET_APP_REGISTRY_DIR",
+    os.path.join(os.path.expanduser("~"), ".prophet_forecast_app", "models")
+)
+
+
+def _slugify(name):
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '-', name.strip()).strip('-').lower()
+    return slug or "model"
+
+
+def _model_dir(model_id, registry_dir):
+    """Directory of a saved model; ValueError unless model_id names a direct child of registry_dir."""
+    if not model_id or ".." in model_id or any(sep and sep in model_id for sep in (os.sep, os.altsep)):
+        raise ValueError(f"Invalid model ID: {model_id!r}")
+    root = os.path.realpath(registry_dir)
+    model_dir = os.path.realpath(os.path.join(root, model_id))
+    if os.path.dirname(model_dir) != root:
+        raise ValueError(f"Invalid model ID: {model_id!r}")
+    return model_dir
+
+
+def save_model(name, model, history_df, model_params, country_code=None,
+               forecast_periods=None, forecast_freq=None, registry_dir=REGISTRY_DIR):
+    """Save a fitted model and its metadata; returns the new model ID."""
+    created_at = datetime.now()
+    model_id = f"{_slugify(name)}-{created_at.strftime('%Y%m%d-%H%M%S-%f')}"
+    model_dir = os.path.join(registry_dir, model_id)
+    os.makedirs(model_dir, exist_ok=True)
+
+    meta = {
+        "model_id": model_id,
+        "name": name,
+        "created_at": created_at.isoformat(timespec="seconds"),
+        "fingerprint": fingerprint_frame(history_df[['ds', 'y']]),
+        "rows": len(history_df),
+        "history_start": str(history_df['ds'].min()),
+        "history_end": str(history_df['ds'].max()),
+        "params": model_params,
+        "country_holidays": country_code,
+        "forecast_periods": forecast_periods,
+        "forecast_freq": forecast_freq,
+    }
+    with open(os.path.join(model_dir, "model.json"), "w") as f:
+        f.write(model_to_json(model))
+    with open(os.path.join(model_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2, default=str)
+    return model_id
+
+
+def list_models(registry_dir=REGISTRY_DIR):
+    """Metadata of every saved model, newest first."""
+    if not os.path.isdir(registry_dir):
+        return []
+    metas = []
+    for model_id in os.listdir(registry_dir):
+        meta_path = os.path.join(registry_dir, model_id, "meta.json")
+        try:
+            with open(meta_path, "r") as f:
+                metas.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(metas, key=lambda m: m["created_at"], reverse=True)
+
+
+def load_model(model_id, registry_dir=REGISTRY_DIR):
+    """Return (model, meta) for a saved model ID.
+
+    The model's country calendars are restored from the metadata so
+    predictions past the fitted horizon keep their holiday effects.
+    Raises ValueError for an invalid model ID.
+    """
+    model_dir = _model_dir(model_id, registry_dir)
+    with open(os.path.join(model_dir, "meta.json"), "r") as f:
+        meta = json.load(f)
+    with open(os.path.join(model_dir, "model.json"), "r") as f:
+        model = model_from_json(f.read())
+    if model.country_holidays is None:
+        # Calendars precomputed at fit time are stored in model.holidays only
+        model.holiday_calendars = parse_country_codes(meta.get("country_holidays"))
+    return model, meta
+
+
+def delete_model(model_id, registry_dir=REGISTRY_DIR):
+    """Remove a saved model from the registry.
+
+    Raises ValueError for an invalid model ID and OSError if the model
+    does not exist or cannot be removed.
+    """
+    model_dir = _model_dir(model_id, registry_dir)
+    if not os.path.isfile(os.path.join(model_dir, "meta.json")):
+        raise FileNotFoundError(f"Saved model '{model_id}' not found")
+    shutil.rmtree(model_dir)
+
+
+def model_history(model):
+    """Training data (ds, y) stored inside a fitted model."""
+    return model.history[['ds', 'y']].reset_index(drop=True)
+
+
+def predict_only(model, forecast_periods, forecast_freq, include_history=True):
+    """Forecast a new horizon from a fitted model without touching Stan."""
+    future = model.make_future_dataframe(
+        periods=forecast_periods, freq=forecast_freq, include_history=include_history
+    )
+    cover_holiday_years(model, future['ds'])
+    return predict_intervals(model, future)
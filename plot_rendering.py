@@ -0,0 +1,156 @@
+"""
+Decimated WebGL rendering for large forecast plots.
+History and forecast are downsampled with Largest-Triangle-Three-Buckets
+(LTTB), which keeps peaks and troughs, and drawn with Scattergl. A zoom
+window re-renders the visible range at full resolution (within the budget).
+Built figures are cached per forecast ID and view (FigureCache).
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from bounded_cache import BoundedLRU
+
+# Above this many points (history + forecast) the decimated WebGL path is used
+LARGE_PLOT_THRESHOLD = 5000
+
+DEFAULT_POINT_BUDGET = 4000
+
+DEFAULT_FIGURE_CACHE_MB = 256
+
+
+def lttb_indices(x, y, n_out):
+    """Indices selected by Largest-Triangle-Three-Buckets downsampling.
+
+    x and y are 1-D numeric arrays of equal length (x sorted ascending).
+    Always keeps the first and last points.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket boundaries over the interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) as the third vertex
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        if end > start:
+            # Triangle areas for every candidate in this bucket, in one pass
+            areas = np.abs(
+                (x[prev] - avg_x) * (y[start:end] - y[prev])
+                - (x[prev] - x[start:end]) * (avg_y - y[prev])
+            )
+            prev = start + int(np.argmax(areas))
+        else:
+            prev = start
+        selected[i + 1] = prev
+    return selected
+
+
+def decimate(df, value_col, n_out):
+    """Rows of df (sorted by ds) chosen by LTTB on value_col."""
+    if len(df) <= n_out:
+        return df
+    x = df['ds'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    idx = lttb_indices(x, df[value_col].to_numpy(), n_out)
+    return df.iloc[idx]
+
+
+def _window(df, x_range):
+    if x_range is None:
+        return df
+    start, end = pd.Timestamp(x_range[0]), pd.Timestamp(x_range[1])
+    ds = df['ds']
+    return df.iloc[ds.searchsorted(start, side='left'):ds.searchsorted(end, side='right')]
+
+
+def build_forecast_figure(history_df, forecast, point_budget=DEFAULT_POINT_BUDGET,
+                          x_range=None, title="Prophet Forecast"):
+    """WebGL forecast figure with history and forecast downsampled to a budget.
+
+    x_range (start, end) restricts the figure to a window, which is then
+    rendered at full resolution if it fits the budget. Returns
+    (figure, stats) where stats holds total and rendered point counts.
+    """
+    history = _window(history_df[['ds', 'y']].sort_values('ds'), x_range)
+    band_cols = [c for c in ('yhat_lower', 'yhat_upper') if c in forecast.columns]
+    fc = _window(forecast[['ds', 'yhat'] + band_cols].sort_values('ds'), x_range)
+
+    total = len(history) + len(fc)
+    # Split the budget in proportion to each part's size
+    history_budget = max(3, int(point_budget * len(history) / total)) if total else 0
+    forecast_budget = max(3, point_budget - history_budget)
+    history_plot = decimate(history, 'y', history_budget)
+    fc_plot = decimate(fc, 'yhat', forecast_budget)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(
+        x=history_plot['ds'], y=history_plot['y'], mode='markers',
+        name='Actual', marker=dict(color='black', size=4)
+    ))
+    if band_cols:
+        fig.add_trace(go.Scattergl(
+            x=fc_plot['ds'], y=fc_plot['yhat_upper'], mode='lines',
+            line=dict(width=0), showlegend=False, hoverinfo='skip'
+        ))
+        fig.add_trace(go.Scattergl(
+            x=fc_plot['ds'], y=fc_plot['yhat_lower'], mode='lines',
+            line=dict(width=0), fill='tonexty', fillcolor='rgba(0, 114, 178, 0.2)',
+            name='Uncertainty'
+        ))
+    fig.add_trace(go.Scattergl(
+        x=fc_plot['ds'], y=fc_plot['yhat'], mode='lines',
+        name='Predicted', line=dict(color='#0072B2', width=2)
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Date",
+        yaxis_title="Value",
+        height=600,
+        showlegend=False
+    )
+
+    stats = {
+        "points_total": total,
+        "points_rendered": len(history_plot) + len(fc_plot),
+    }
+    return fig, stats
+
+
+def _figure_nbytes(fig):
+    """Approximate memory of a figure's trace data."""
+    total = 0
+    for trace in fig.data:
+        for attr in ('x', 'y'):
+            values = getattr(trace, attr, None)
+            if values is not None:
+                total += np.asarray(values).nbytes
+    return total
+
+
+class FigureCache(BoundedLRU):
+    """In-memory LRU of built figures keyed by forecast ID and view options.
+
+    Figures are immutable once built: st.plotly_chart serializes a Figure
+    without re-validating it, so reruns skip curve evaluation and trace
+    construction entirely.
+    """
+
+    def __init__(self, memory_limit_mb=DEFAULT_FIGURE_CACHE_MB):
+        super().__init__(memory_limit_mb)
+
+    def get_or_build(self, key, build):
+        """(figure, extra, hit) for key; build() returns (figure, extra) on a miss."""
+        (fig, extra), hit = super().get_or_build(key, build, lambda entry: _figure_nbytes(entry[0]))
+        return fig, extra, hit
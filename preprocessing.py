@@ -0,0 +1,102 @@
+"""
+Pre-fit preprocessing for forecast data.
+Vectorized frequency detection, duplicate-timestamp aggregation and optional
+resampling to a coarser grain, so Prophet is fitted on no more rows than the
+forecast actually needs.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Reducers offered for duplicate timestamps and resampling
+REDUCERS = ['mean', 'sum', 'median', 'min', 'max', 'last']
+
+# Resample grains, finest first: rule -> (label, bin width)
+RESAMPLE_RULES = {
+    'min': ("Minute", pd.Timedelta(minutes=1)),
+    '15min': ("15 minutes", pd.Timedelta(minutes=15)),
+    'h': ("Hourly", pd.Timedelta(hours=1)),
+    'D': ("Daily", pd.Timedelta(days=1)),
+    'W': ("Weekly", pd.Timedelta(weeks=1)),
+}
+
+# Named frequencies used when describing the detected step
+_FREQUENCY_NAMES = [
+    (pd.Timedelta(minutes=1), "minute"),
+    (pd.Timedelta(minutes=5), "5-minute"),
+    (pd.Timedelta(minutes=15), "15-minute"),
+    (pd.Timedelta(minutes=30), "30-minute"),
+    (pd.Timedelta(hours=1), "hourly"),
+    (pd.Timedelta(days=1), "daily"),
+    (pd.Timedelta(weeks=1), "weekly"),
+]
+
+
+def detect_frequency(ds):
+    """Describe the sampling of a sorted datetime series.
+
+    Returns a dict with the modal step (Timedelta), a readable label, the
+    number of duplicate timestamps, the number of gaps (steps longer than
+    the modal step) and the number of periods missing inside those gaps.
+    """
+    info = {"step": None, "label": "unknown", "duplicates": 0, "gaps": 0, "missing_periods": 0}
+    values = ds.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    if len(values) < 2:
+        return info
+
+    diffs = np.diff(values)
+    info["duplicates"] = int((diffs == 0).sum())
+    positive = diffs[diffs > 0]
+    if len(positive) == 0:
+        return info
+
+    steps, counts = np.unique(positive, return_counts=True)
+    step = int(steps[np.argmax(counts)])
+    info["step"] = pd.Timedelta(step, unit='ns')
+    info["label"] = next(
+        (name for td, name in _FREQUENCY_NAMES if td == info["step"]),
+        f"every {info['step']}"
+    )
+
+    gap_mask = positive > step
+    info["gaps"] = int(gap_mask.sum())
+    info["missing_periods"] = int((positive[gap_mask] // step - 1).sum())
+    return info
+
+
+def coarser_rules(step):
+    """Resample rules strictly coarser than the detected step."""
+    if step is None:
+        return list(RESAMPLE_RULES)
+    return [rule for rule, (_, width) in RESAMPLE_RULES.items() if width > step]
+
+
+def aggregate_duplicates(df, reducer='mean'):
+    """Collapse rows sharing a 'ds' value with the given reducer."""
+    if not df['ds'].duplicated().any():
+        return df
+    return df.groupby('ds', sort=True)['y'].agg(reducer).reset_index()
+
+
+def resample(df, rule, reducer='mean'):
+    """Resample to a coarser grain; empty bins are dropped, not zero-filled."""
+    resampler = df.set_index('ds')['y'].resample(rule)
+    if reducer == 'sum':
+        out = resampler.sum(min_count=1)
+    else:
+        out = resampler.agg(reducer)
+    return out.dropna().reset_index()
+
+
+def preprocess(prepared_df, reducer='mean', resample_rule=None):
+    """Aggregate duplicates and optionally resample a prepared frame.
+
+    Returns (df, report) where report holds the row counts after each step.
+    """
+    report = {"rows_in": len(prepared_df)}
+    df = aggregate_duplicates(prepared_df, reducer)
+    report["rows_deduplicated"] = len(df)
+    if resample_rule:
+        df = resample(df, resample_rule, reducer)
+    report["rows_out"] = len(df)
+    return df, report
@@ -6,14 +6,13 @@ A user-friendly web interface for generating Prophet forecasts from CSV files.
 import streamlit as st
 import pandas as pd
 import numpy as np
-from datetime import datetime
-import io
 import os
+import time
+import uuid
 
 # Check if Prophet is installed
 try:
-    from prophet import Prophet
-    from prophet.plot import plot_plotly, plot_components_plotly
+    from prophet.plot import plot_plotly
     PROPHET_AVAILABLE = True
 except ImportError:
     PROPHET_AVAILABLE = False
@@ -29,13 +28,45 @@ except ImportError:
     """)
     st.stop()
 
-import plotly.graph_objects as go
 
 try:
-    from country_holidays_config import get_country_holiday_choices
+    from country_holidays_config import COUNTRY_CODE_TO_NAME, get_country_holiday_choices, get_subdivision_choices
 except ImportError:
     get_country_holiday_choices = None
 
+from forecast_engine import (
+    validate_csv, prepare_data, detect_data_frequency, load_custom_holidays,
+    holiday_year_span
+)
+from preprocessing import REDUCERS, RESAMPLE_RULES, detect_frequency, coarser_rules, preprocess
+from data_ingest import SUPPORTED_UPLOAD_TYPES, IngestCache, read_columns, read_table, upload_fingerprint
+from forecast_cache import ForecastCache
+from model_registry import (
+    save_model, list_models, load_model, delete_model, model_history, predict_only
+)
+from plot_rendering import (
+    LARGE_PLOT_THRESHOLD, DEFAULT_POINT_BUDGET, FigureCache, build_forecast_figure
+)
+from uncertainty import UNCERTAINTY_TIERS
+from job_runner import JobRunner, DONE, FAILED
+from instrumentation import METRICS_LOGGER, RunTrace, current_rss_mb, optimizer_summary
+from fit_backend import DEFAULT_FIT_PARAMS, DEFAULT_MCMC_SAMPLES, FIT_BACKENDS
+from holiday_engine import combine_holidays
+from component_curves import build_components_figure, component_curves
+from session_store import ArtifactStore, compact_forecast, expand_forecast
+from forecast_table import DEFAULT_PAGE_SIZE, PAGE_SIZES, ForecastTable, page_count
+from forecast_export import (
+    EXPORT_FORMATS, DEFAULT_EXPORT_COLUMNS, ExportCache, export_bytes, export_columns, export_key,
+    export_file_name
+)
+from tuning import build_param_grid, default_cv_windows, run_tuning, rank_results
+from batch_forecast import (
+    detect_series_column, default_worker_count, run_batch_forecast,
+    combine_forecasts, summarize_results
+)
+from hierarchy import NODE_COLUMN, RECONCILIATION_METHODS, build_hierarchy, reconcile
+from baseline import BASELINE_MODELS, baseline_forecast, baseline_scores, forecast_errors
+
 # Page configuration
 st.set_page_config(
     page_title="Prophet Forecast Generator",
@@ -57,90 +88,641 @@ st.sidebar.header("⚙️ Model Configuration")
 # File upload
 uploaded_file = st.file_uploader(
     "Upload your CSV file",
-    type=['csv'],
-    help="CSV file must contain 'ds' (date) and 'y' (value) columns"
+    type=SUPPORTED_UPLOAD_TYPES,
+    help="CSV, Parquet or Feather file that must contain 'ds' (date) and 'y' (value) columns"
 )
 
+# Advanced Options slider defaults (session state keys) and tuning slider bounds
+ADVANCED_PARAM_DEFAULTS = {
+    "changepoint_prior_scale": 0.05,
+    "changepoint_range": 0.8,
+    "seasonality_prior_scale": 10.0,
+    "holidays_prior_scale": 10.0,
+}
+TUNING_SLIDERS = {
+    "changepoint_prior_scale": ("Changepoint Prior Scale", 0.001, 0.5, 0.001),
+    "changepoint_range": ("Changepoint Range", 0.2, 1.0, 0.05),
+    "seasonality_prior_scale": ("Seasonality Prior Scale", 0.01, 10.0, 0.1),
+    "holidays_prior_scale": ("Holidays Prior Scale", 0.01, 10.0, 0.1),
+}
+
+def apply_tuned_params(params):
+    """Copy a tuned configuration into the Advanced Options sliders."""
+    for name, value in params.items():
+        if name in TUNING_SLIDERS:
+            _, low, high, step = TUNING_SLIDERS[name]
+            # Snap to the slider's step grid
+            snapped = low + round((value - low) / step) * step
+            st.session_state[name] = round(float(min(max(snapped, low), high)), 4)
+
+def load_registry_forecast():
+    """Load the selected saved model and predict a new horizon (no refit).
+
+    Reads the registry widgets from session state: callback args are bound
+    on the previous run and would miss the latest widget values.
+    """
+    model_id = st.session_state.registry_select
+    forecast_periods = int(st.session_state.registry_periods)
+    forecast_freq = st.session_state.registry_freq
+    model, _ = load_model(model_id)
+    store_result(
+        model=model,
+        forecast=compact_forecast(predict_only(model, forecast_periods, forecast_freq)),
+        history=model_history(model)
+    )
+    st.session_state.forecast_source = "registry"
+    st.session_state.forecast_id = f"registry-{model_id}-{forecast_periods}{forecast_freq}-{uuid.uuid4().hex[:6]}"
+    st.session_state.registry_model_id = model_id
+
+@st.cache_resource
+def get_forecast_cache():
+    """Process-wide fit cache shared by all sessions."""
+    return ForecastCache()
+
+forecast_cache = get_forecast_cache()
+
+@st.cache_resource
+def get_job_runner():
+    """Process-wide background job pool shared by all sessions."""
+    return JobRunner()
+
+job_runner = get_job_runner()
+
+@st.cache_resource
+def get_export_cache():
+    """Process-wide cache of serialized downloads, keyed by forecast ID."""
+    return ExportCache()
+
+export_cache = get_export_cache()
+
+@st.cache_resource
+def get_artifact_store():
+    """Process-wide store of session forecasts, histories and models (keyed by content)."""
+    return ArtifactStore()
+
+artifact_store = get_artifact_store()
+
+@st.cache_resource
+def get_figure_cache():
+    """Process-wide cache of built forecast and component figures, keyed by forecast ID."""
+    return FigureCache()
+
+figure_cache = get_figure_cache()
+
+def cached_figure(key, build, trace, stage, rows=None):
+    """(figure, extra) for key from the figure cache; timed into trace as stage (or stage_cache_hit).
+
+    key starts with the forecast ID; figures without one are built every time.
+    """
+    start = time.perf_counter()
+    if key[1] is None:
+        (fig, extra), hit = build(), False
+    else:
+        fig, extra, hit = figure_cache.get_or_build(key, build)
+    trace.record(f"{stage}_cache_hit" if hit else stage, time.perf_counter() - start, rows)
+    return fig, extra
+
+@st.cache_resource
+def get_ingest_cache():
+    """Process-wide memo of parsed, validated and prepared uploads, keyed by upload fingerprint."""
+    return IngestCache()
+
+ingest_cache = get_ingest_cache()
+
+def store_result(**artifacts):
+    """Put artifacts in the shared store; session state keeps only their keys."""
+    for name, obj in artifacts.items():
+        st.session_state[f"{name}_key"] = None if obj is None else artifact_store.put(obj, name)
+
+def load_result(name):
+    """A stored artifact of this session, or None if unset or released."""
+    return artifact_store.get(st.session_state[f"{name}_key"])
+
+def cancel_active_job():
+    """Cancel this session's running forecast job."""
+    if st.session_state.active_job_id is not None:
+        job_runner.cancel(st.session_state.active_job_id)
+
+@st.fragment(run_every=1.0)
+def render_active_job():
+    """Status of this session's background fit; loads the result once it finishes."""
+    job = job_runner.get(st.session_state.active_job_id)
+    if job is None:
+        st.session_state.active_job_id = None
+        return
+    
+    if not job.finished:
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.info(f"⏳ Job `{job.job_id}`: {job.status} ({job.elapsed:.1f}s)")
+        with col2:
+            st.button("Cancel", on_click=cancel_active_job, use_container_width=True)
+        pending = st.session_state.pending_fit
+        history = artifact_store.get(pending["history_key"])
+        if job.point_forecast is not None:
+            # Point forecast is ready while the intervals are simulated
+            st.caption("Point forecast ready; computing uncertainty intervals...")
+            fig, _ = build_forecast_figure(history, job.point_forecast)
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            baseline = artifact_store.get(pending["baseline_key"])
+            if baseline is not None:
+                # Instant baseline until Prophet's point forecast arrives
+                st.caption(
+                    f"Preview: {BASELINE_MODELS[pending['baseline_model']]} baseline. "
+                    "It is replaced by the Prophet forecast when the fit finishes."
+                )
+                fig, _ = build_forecast_figure(history, baseline, title="Baseline Preview")
+                st.plotly_chart(fig, use_container_width=True)
+        return
+    
+    st.session_state.active_job_id = None
+    if job.status == DONE:
+        pending = st.session_state.pending_fit
+        store_result(model=job.model, forecast=compact_forecast(job.forecast))
+        st.session_state.history_key = pending["history_key"]
+        st.session_state.forecast_source = "fit"
+        st.session_state.fit_settings = pending["fit_settings"]
+        st.session_state.fit_trace = job.trace
+        st.session_state.forecast_id = job.job_id
+        st.session_state.baseline_scores = pending["baseline_scores"]
+        if job.cache_tier == "warm":
+            message = "✅ Forecast generated successfully! (warm-started from the previous fit of this series)"
+        elif job.cache_tier is not None:
+            message = f"✅ Forecast loaded from {job.cache_tier} cache (identical data and settings, no refit needed)"
+        else:
+            message = f"✅ Forecast generated successfully in {job.elapsed:.1f}s!"
+        fit_summary = optimizer_summary(job.trace.optimizer)
+        if fit_summary:
+            message += f" ({fit_summary})"
+        st.session_state.job_message = ("success", message)
+    elif job.status == FAILED:
+        st.session_state.job_message = ("error", f"❌ Error generating forecast: {job.error}")
+    else:
+        st.session_state.job_message = ("warning", "⚠️ Forecast job cancelled.")
+    job_runner.release(job.job_id)
+    st.rerun()
+
 # Initialize session state
-if 'forecast_df' not in st.session_state:
-    st.session_state.forecast_df = None
-if 'model' not in st.session_state:
-    st.session_state.model = None
-if 'data_df' not in st.session_state:
-    st.session_state.data_df = None
-
-def validate_csv(df):
-    """Validate that CSV has required columns."""
-    required_cols = ['ds', 'y']
-    missing_cols = [col for col in required_cols if col not in df.columns]
-    if missing_cols:
-        return False, f"Missing required columns: {', '.join(missing_cols)}"
+for _param, _value in ADVANCED_PARAM_DEFAULTS.items():
+    if _param not in st.session_state:
+        st.session_state[_param] = _value
+if 'tuning_results' not in st.session_state:
+    st.session_state.tuning_results = None
+if 'forecast_source' not in st.session_state:
+    st.session_state.forecast_source = None
+# Large artifacts live in artifact_store; the session keeps their keys
+for _name in ('forecast', 'model', 'history', 'batch_forecast', 'batch_summary'):
+    if f'{_name}_key' not in st.session_state:
+        st.session_state[f'{_name}_key'] = None
+if 'active_job_id' not in st.session_state:
+    st.session_state.active_job_id = None
+if 'job_message' not in st.session_state:
+    st.session_state.job_message = None
+if 'session_owner' not in st.session_state:
+    st.session_state.session_owner = uuid.uuid4().hex
+if 'fit_trace' not in st.session_state:
+    st.session_state.fit_trace = None
+if 'forecast_id' not in st.session_state:
+    st.session_state.forecast_id = None
+if 'batch_forecast_id' not in st.session_state:
+    st.session_state.batch_forecast_id = None
+if 'reconciliation_report' not in st.session_state:
+    st.session_state.reconciliation_report = None
+if 'baseline_scores' not in st.session_state:
+    st.session_state.baseline_scores = None
+
+# Drop keys of results the store has released (TTL or memory limit)
+for _names in (('forecast', 'model', 'history'), ('batch_forecast', 'batch_summary')):
+    if st.session_state[f'{_names[0]}_key'] is not None and any(load_result(n) is None for n in _names):
+        for _name in _names:
+            st.session_state[f'{_name}_key'] = None
+        st.session_state.forecast_table = None
+        st.session_state.job_message = ("warning", "⚠️ Previous results were released from memory; generate the forecast again.")
+
+# Stage timings for this rerun (see the Diagnostics panel)
+rerun_trace = RunTrace(uuid.uuid4().hex[:8], "app")
+
+def get_forecast_table(forecast_id, forecast):
+    """Indexed table view of the current forecast, built once per forecast ID."""
+    cached = st.session_state.get('forecast_table')
+    if forecast_id is None or cached is None or cached[0] != forecast_id:
+        cached = (forecast_id, ForecastTable(forecast))
+        st.session_state.forecast_table = cached
+    return cached[1]
+
+@st.fragment
+def render_forecast_table(forecast, history_df, forecast_id):
+    """Filterable, paginated forecast table (reruns on its own)."""
+    history_end = history_df['ds'].max()
+    st.subheader("Forecast Data")
     
-    # Check if ds is datetime-like
-    try:
-        pd.to_datetime(df['ds'])
-    except:
-        return False, "Column 'ds' must contain valid dates"
+    # Filter options
+    col1, col2 = st.columns(2)
+    with col1:
+        show_only_forecast = st.checkbox("Show only forecast period", value=False)
+    with col2:
+        min_date_filter = st.date_input(
+            "Min Date",
+            value=history_df['ds'].min().date(),
+            min_value=history_df['ds'].min().date()
+        )
+    
+    # Filter rows: binary-search bounds on the ds-sorted forecast, no copies
+    table = get_forecast_table(forecast_id, forecast)
+    if show_only_forecast:
+        rows = table.row_range(after=history_end)
+    else:
+        rows = table.row_range(start=min_date_filter)
+    
+    # Select columns to display
+    columns_to_show = st.multiselect(
+        "Select columns to display",
+        options=forecast.columns.tolist(),
+        default=[c for c in ['ds', 'yhat', 'yhat_lower', 'yhat_upper', 'trend'] if c in forecast.columns]
+    )
     
-    # Check if y is numeric
-    if not pd.api.types.is_numeric_dtype(df['y']):
-        return False, "Column 'y' must contain numeric values"
+    if columns_to_show:
+        # Only the visible page is sent to the browser
+        col1, col2 = st.columns(2)
+        with col1:
+            page_size = st.selectbox(
+                "Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), key="table_page_size"
+            )
+        n_pages = page_count(rows, page_size)
+        with col2:
+            page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key="table_page")
+        page = min(int(page), n_pages)
+        st.dataframe(table.page(rows, page, page_size, columns_to_show), use_container_width=True)
+        n_rows = rows[1] - rows[0]
+        st.caption(
+            f"Rows {min((page - 1) * page_size + 1, n_rows):,}–{min(page * page_size, n_rows):,} "
+            f"of {n_rows:,} (page {page} of {n_pages})"
+        )
+        
+        # Summary statistics (over all filtered rows, cached per range)
+        if 'yhat' in columns_to_show:
+            st.subheader("Summary Statistics")
+            st.dataframe(table.summary('yhat', rows), use_container_width=True)
+
+def render_forecast_results(model, forecast, history_df, trace, forecast_id):
+    """Forecast plot, components, data table and download tabs (plot/export timed into trace)."""
+    history_end = history_df['ds'].max()
     
-    return True, "Valid"
-
-def prepare_data(df):
-    """Prepare data for Prophet."""
-    df = df.copy()
-    df['ds'] = pd.to_datetime(df['ds'])
-    df = df[['ds', 'y']].dropna()
-    df = df.sort_values('ds').reset_index(drop=True)
-    return df
-
-def detect_data_frequency(df):
-    """Detect if data is sub-daily (hourly) or daily+."""
-    if len(df) < 2:
-        return "unknown"
+    st.header("📈 Forecast Results")
     
-    # Calculate time differences
-    time_diffs = df['ds'].diff().dropna()
-    median_diff = time_diffs.median()
+    # Create tabs for different views
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Forecast Plot", "🔍 Components", "📋 Data Table", "💾 Download"])
     
-    # If median difference is less than 1 day, it's sub-daily
-    if median_diff < pd.Timedelta(days=1):
-        return "sub-daily"
-    else:
-        return "daily-or-more"
+    with tab1:
+        st.subheader("Forecast Visualization")
+        
+        # Create interactive plot (decimated WebGL rendering for large series)
+        large_plot = len(history_df) + len(forecast) > LARGE_PLOT_THRESHOLD
+        if large_plot:
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                point_budget = st.number_input(
+                    "Point budget",
+                    min_value=500,
+                    max_value=50000,
+                    value=DEFAULT_POINT_BUDGET,
+                    step=500,
+                    help="Maximum points sent to the browser. History and forecast are downsampled with LTTB, which keeps peaks and troughs."
+                )
+            with col2:
+                plot_start, plot_end = forecast['ds'].min().to_pydatetime(), forecast['ds'].max().to_pydatetime()
+                zoom_window = st.slider(
+                    "Zoom window",
+                    min_value=plot_start,
+                    max_value=plot_end,
+                    value=(plot_start, plot_end),
+                    help="Narrow the window to re-render that range at full resolution"
+                )
+            fig, plot_stats = cached_figure(
+                ("forecast", forecast_id, int(point_budget), tuple(zoom_window)),
+                lambda: build_forecast_figure(
+                    history_df, forecast, point_budget=int(point_budget), x_range=zoom_window
+                ),
+                trace, "plot"
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption(
+                f"Rendering {plot_stats['points_rendered']:,} of {plot_stats['points_total']:,} points "
+                f"in this window (WebGL)"
+            )
+        else:
+            def build_plot():
+                fig = plot_plotly(model, forecast)
+                fig.update_layout(
+                    title="Prophet Forecast",
+                    xaxis_title="Date",
+                    yaxis_title="Value",
+                    height=600
+                )
+                return fig, None
+            
+            fig, _ = cached_figure(("forecast", forecast_id), build_plot, trace, "plot", rows=len(history_df) + len(forecast))
+            st.plotly_chart(fig, use_container_width=True)
+        
+        # Show forecast summary
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Historical Data Points", len(history_df))
+        with col2:
+            st.metric("Forecast Periods", int((forecast['ds'] > history_end).sum()))
+        with col3:
+            latest_forecast = forecast[forecast['ds'] > history_end].iloc[-1]
+            st.metric("Latest Forecast Value", f"{latest_forecast['yhat']:,.2f}")
+    
+    with tab2:
+        st.subheader("Forecast Components")
+        
+        # Component curves (seasonalities over one period) and figure, once per forecast
+        budget = int(point_budget) if large_plot else len(forecast)
+        fig_components, _ = cached_figure(
+            ("components", forecast_id, budget),
+            lambda: (build_components_figure(component_curves(model, expand_forecast(forecast), budget)), None),
+            trace, "plot_components", rows=len(forecast)
+        )
+        st.plotly_chart(fig_components, use_container_width=True)
+    
+    with tab3:
+        # Fragment: filters and paging rerun only the table, never the plots above
+        render_forecast_table(forecast, history_df, forecast_id)
+    
+    with tab4:
+        st.subheader("Download Forecast Results")
+        n_future = int((forecast['ds'] > history_end).sum())
+        render_download(
+            forecast, forecast_id, "prophet_forecast", trace, key="single_export",
+            history_end=history_end,
+            default_columns=[c for c in DEFAULT_EXPORT_COLUMNS if c in forecast.columns]
+        )
+        
+        st.info(f"💡 The download includes {n_future} forecast periods starting from {forecast.loc[forecast['ds'] > history_end, 'ds'].min().date()}")
+        
+        # Show preview of download
+        st.subheader("Download Preview (Future Periods Only)")
+        st.dataframe(forecast[forecast['ds'] > history_end].head(20), use_container_width=True)
+
+@st.fragment
+def render_download(forecast, forecast_id, file_prefix, trace, key, history_end=None, default_columns=None):
+    """Column/format pickers and a download button; the file is built only on request."""
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        columns = st.multiselect(
+            "Columns to export",
+            options=forecast.columns.tolist(),
+            default=default_columns,
+            key=f"{key}_columns",
+            help="ds and run_date are always included"
+        )
+    with col2:
+        fmt = st.selectbox(
+            "Format",
+            list(EXPORT_FORMATS),
+            format_func=lambda f: EXPORT_FORMATS[f][0],
+            key=f"{key}_format"
+        )
+    label, mime, _ = EXPORT_FORMATS[fmt]
+    
+    data = export_cache.get(export_key(forecast_id, fmt, export_columns(forecast, columns), history_end))
+    if data is None and st.button(f"Prepare {label} file", key=f"{key}_prepare", use_container_width=True):
+        with trace.stage("export") as export_info:
+            data = export_bytes(export_cache, forecast_id, forecast, fmt, columns, history_end=history_end)
+            export_info["rows"] = len(forecast) if history_end is None else int((forecast['ds'] > history_end).sum())
+    if data is not None:
+        st.download_button(
+            label=f"📥 Download {label} ({len(data) / 1024:,.0f} KB)",
+            data=data,
+            file_name=export_file_name(file_prefix, fmt),
+            mime=mime,
+            key=f"{key}_download",
+            use_container_width=True
+        )
+
+def ingest_upload(uploaded_file, needed_columns, series_col, hierarchy_cols):
+    """Read, validate and prepare an upload (memoized per fingerprint by the caller).
+
+    Returns a dict with data_df, is_valid, message, hierarchy and - for
+    valid data - prepared_df (the first series in batch modes) and freq_info.
+    """
+    with rerun_trace.stage("read") as read_info:
+        data_df = read_table(uploaded_file, columns=needed_columns)
+        read_info["rows"] = len(data_df)
+    with rerun_trace.stage("validate", rows=len(data_df)):
+        is_valid, message = validate_csv(data_df)
+    ingested = {"raw_df": data_df, "data_df": data_df, "is_valid": is_valid, "message": message,
+                "hierarchy": None, "prepared_df": None, "freq_info": None}
+    if not is_valid:
+        return ingested
+    if hierarchy_cols:
+        # One series per node (leaves and every aggregate above them)
+        with rerun_trace.stage("hierarchy") as hierarchy_info:
+            data_df, ingested["hierarchy"] = build_hierarchy(data_df, hierarchy_cols)
+            hierarchy_info["rows"] = len(data_df)
+        ingested["data_df"] = data_df
+    with rerun_trace.stage("prepare") as prepare_info:
+        if series_col is not None:
+            # Per-series preparation happens in the workers; use the first series
+            # to detect frequency and date bounds for the sidebar.
+            first_key = data_df[series_col].iloc[0]
+            prepared_df = prepare_data(data_df[data_df[series_col] == first_key])
+        else:
+            prepared_df = prepare_data(data_df)
+        prepare_info["rows"] = len(prepared_df)
+    ingested["prepared_df"] = prepared_df
+    ingested["freq_info"] = detect_frequency(prepared_df['ds'])
+    return ingested
+
+def render_diagnostics(trace, fit_trace):
+    """Collapsible per-stage timings for this rerun and the last fit."""
+    with st.expander("🩺 Diagnostics"):
+        st.caption(
+            "Wall time, rows and resident-memory delta per stage. Each stage is also "
+            f"logged as a JSON line on the `{METRICS_LOGGER}` logger."
+        )
+        st.markdown("**This rerun**")
+        st.dataframe(trace.to_frame(), use_container_width=True, hide_index=True)
+        if fit_trace is not None:
+            st.markdown(f"**Last fit** (job `{fit_trace.run_id}`)")
+            st.dataframe(fit_trace.to_frame(), use_container_width=True, hide_index=True)
+            if fit_trace.optimizer is not None:
+                st.markdown("**Stan fit**")
+                st.dataframe(
+                    pd.DataFrame([fit_trace.optimizer]).T.rename(columns={0: "value"}).astype(str),
+                    use_container_width=True
+                )
+            else:
+                st.caption("No optimizer run: the forecast came from the fit cache.")
 
 if uploaded_file is not None:
     # Read CSV
     try:
-        data_df = pd.read_csv(uploaded_file)
-        st.session_state.data_df = data_df
+        # Everything parsed from the upload is memoized by its content hash, so
+        # reruns (widget changes) skip reading, validating and preparing it again
+        upload_key = upload_fingerprint(uploaded_file)
+        
+        # Header/schema only: decide which columns are needed before the full read
+        file_columns, _ = ingest_cache.get_or_build(("columns", upload_key), lambda: read_columns(uploaded_file))
+        
+        # Forecast mode: one series, or many series keyed by a column (long format)
+        st.sidebar.subheader("Forecast Mode")
+        extra_columns = [col for col in file_columns if col not in ('ds', 'y')]
+        detected_series_col = detect_series_column(file_columns)
+        forecast_mode = st.sidebar.radio(
+            "Mode",
+            ["Single series", "Multi-series batch", "Hierarchical"],
+            index=1 if detected_series_col is not None else 0,
+            help="Multi-series batch fits one Prophet model per series key in parallel. Upload long-format data: series_id, ds, y. "
+                 "Hierarchical also fits every aggregate (e.g. country, market, store) and reconciles them."
+        )
+        hierarchical_mode = forecast_mode == "Hierarchical"
+        batch_mode = forecast_mode == "Multi-series batch" or hierarchical_mode
+        series_col = None
+        hierarchy_cols = []
+        batch_workers = default_worker_count()
+        if hierarchical_mode:
+            if not extra_columns:
+                st.error("❌ Hierarchical mode needs hierarchy columns (e.g. country, market, store) besides 'ds' and 'y'")
+                st.stop()
+            hierarchy_cols = st.sidebar.multiselect(
+                "Hierarchy columns (top to bottom)",
+                options=extra_columns,
+                default=extra_columns,
+                help="Each level is nested in the one before it; leaves are the unique combinations"
+            )
+            if not hierarchy_cols:
+                st.error("❌ Select at least one hierarchy column")
+                st.stop()
+            reconciliation_method = st.sidebar.selectbox(
+                "Reconciliation",
+                options=list(RECONCILIATION_METHODS),
+                format_func=RECONCILIATION_METHODS.get,
+                help="How node forecasts are adjusted so every parent equals the sum of its children. "
+                     "MinT and WLS weight nodes by their in-sample errors."
+            )
+            series_col = NODE_COLUMN
+        elif batch_mode:
+            if not extra_columns:
+                st.error("❌ Multi-series batch needs a series key column (e.g. series_id) besides 'ds' and 'y'")
+                st.stop()
+            series_col = st.sidebar.selectbox(
+                "Series key column",
+                options=extra_columns,
+                index=extra_columns.index(detected_series_col) if detected_series_col in extra_columns else 0,
+                help="Column identifying each series (store, market, ...)"
+            )
+        if batch_mode:
+            batch_workers = st.sidebar.number_input(
+                "Parallel workers",
+                min_value=1,
+                max_value=max(64, default_worker_count()),
+                value=default_worker_count(),
+                help="Number of worker processes fitting series in parallel (defaults to all CPU cores)"
+            )
+            baseline_below_rows = st.sidebar.number_input(
+                "Baseline below rows",
+                min_value=0,
+                value=0,
+                step=10,
+                help="Series with fewer prepared rows than this get the best millisecond baseline "
+                     "(seasonal naive, moving average or least-squares Fourier) instead of a Prophet fit. 0 = always Prophet."
+            )
+        
+        # Read only the needed columns; 'ds' is parsed once here
+        needed_columns = [col for col in ('ds', 'y') if col in file_columns]
+        if hierarchical_mode:
+            needed_columns.extend(hierarchy_cols)
+        elif series_col is not None:
+            needed_columns.append(series_col)
+        ingest_key = ("ingest", upload_key, tuple(needed_columns), series_col, tuple(hierarchy_cols))
+        ingest_start = time.perf_counter()
+        ingested, ingest_hit = ingest_cache.get_or_build(
+            ingest_key, lambda: ingest_upload(uploaded_file, needed_columns, series_col, hierarchy_cols)
+        )
+        if ingest_hit:
+            rerun_trace.record("ingest_cache_hit", time.perf_counter() - ingest_start, len(ingested["raw_df"]))
+        data_df = ingested["data_df"]
+        hierarchy = ingested["hierarchy"]
         
         # Show data preview
         st.subheader("📊 Data Preview")
-        st.dataframe(data_df.head(10), use_container_width=True)
-        st.info(f"Total rows: {len(data_df)}")
+        st.dataframe(ingested["raw_df"].head(10), use_container_width=True)
+        st.info(f"Total rows: {len(ingested['raw_df'])}")
         
         # Validate data
-        is_valid, message = validate_csv(data_df)
-        if not is_valid:
-            st.error(f"❌ {message}")
+        if not ingested["is_valid"]:
+            st.error(f"❌ {ingested['message']}")
             st.stop()
         else:
-            st.success(f"✅ {message}")
+            st.success(f"✅ {ingested['message']}")
+        
+        if hierarchical_mode:
+            level_counts = pd.Series(hierarchy.levels).value_counts(sort=False)
+            st.info(
+                f"Hierarchy nodes: {len(hierarchy.nodes)} "
+                f"({', '.join(f'{n} {level}' for level, n in level_counts.items())})"
+            )
+        elif batch_mode:
+            st.info(f"Series found: {data_df[series_col].nunique()}")
+        
+        prepared_df = ingested["prepared_df"]
+        freq_info = ingested["freq_info"]
+        
+        # Settings below only take effect on submit, so adjusting them does not
+        # rerun the page for every change
+        settings = st.sidebar.form("forecast_settings")
+        settings.caption("Changes apply when you press **Apply settings**.")
+        
+        # Preprocessing: aggregate duplicate timestamps and optionally resample
+        settings.subheader("Preprocessing")
+        aggregate_reducer = settings.selectbox(
+            "Aggregate duplicates / bins with",
+            REDUCERS,
+            index=0,
+            help="How rows sharing a timestamp (or a resample bin) are combined before fitting"
+        )
+        resample_options = [None] + coarser_rules(freq_info["step"])
+        resample_rule = settings.selectbox(
+            "Resample to",
+            resample_options,
+            format_func=lambda rule: "No resampling" if rule is None else RESAMPLE_RULES[rule][0],
+            help="Fit on a coarser grain (e.g. minute → hour, hour → day). Fit time scales with row count."
+        )
+        preprocess_options = {"reducer": aggregate_reducer, "resample_rule": resample_rule}
+        
+        rows_before = len(prepared_df)
+        
+        def run_preprocess():
+            with rerun_trace.stage("preprocess") as preprocess_info:
+                processed_df, report = preprocess(ingested["prepared_df"], aggregate_reducer, resample_rule)
+                preprocess_info["rows"] = len(processed_df)
+            return processed_df, report, detect_data_frequency(processed_df)
         
-        # Prepare data
-        prepared_df = prepare_data(data_df)
+        (prepared_df, preprocess_report, data_freq), _ = ingest_cache.get_or_build(
+            ("preprocess", ingest_key, aggregate_reducer, resample_rule), run_preprocess
+        )
         
-        # Detect data frequency
-        data_freq = detect_data_frequency(prepared_df)
+        freq_message = f"Detected frequency: **{freq_info['label']}**"
+        if freq_info["duplicates"]:
+            freq_message += f" · {freq_info['duplicates']:,} duplicate timestamps"
+        if freq_info["gaps"]:
+            freq_message += f" · {freq_info['gaps']:,} gaps ({freq_info['missing_periods']:,} missing periods)"
+        st.info(freq_message)
+        if preprocess_report["rows_out"] < rows_before:
+            reduction = 1 - preprocess_report["rows_out"] / rows_before
+            st.info(
+                f"Training rows: {rows_before:,} → {preprocess_report['rows_out']:,} "
+                f"({reduction:.0%} fewer){' for the first series' if batch_mode else ''}"
+            )
         
         # Model configuration in sidebar
-        st.sidebar.subheader("Seasonality Settings")
+        settings.subheader("Seasonality Settings")
         
         # Add seasonality explanation
-        with st.sidebar.expander("ℹ️ What is Seasonality?", expanded=False):
+        with settings.expander("ℹ️ What is Seasonality?", expanded=False):
             st.markdown("""
             Seasonality captures repeating patterns in your data:
             
@@ -165,13 +747,13 @@ if uploaded_file is not None:
             - **Multiplicative**: Seasonal effects grow proportionally with the trend
             """)
         
-        seasonality_mode = st.sidebar.selectbox(
+        seasonality_mode = settings.selectbox(
             "Seasonality Mode",
             ['additive', 'multiplicative'],
             help="Additive: constant seasonal fluctuations. Multiplicative: seasonal effects scale with trend level."
         )
         
-        daily_seasonality = st.sidebar.checkbox(
+        daily_seasonality = settings.checkbox(
             "Daily Seasonality",
             value=False,
             help="⚠️ For HOURLY data only - captures hour-of-day patterns (e.g., 9am spike, 5pm peak)"
@@ -179,94 +761,67 @@ if uploaded_file is not None:
         
         # Warning if daily seasonality is enabled but data is not sub-daily
         if daily_seasonality and data_freq == "daily-or-more":
-            st.sidebar.warning("⚠️ **Daily Seasonality Warning**: Your data appears to be daily or less frequent. Daily seasonality is only useful for hourly/sub-daily data.")
+            settings.warning("⚠️ **Daily Seasonality Warning**: Your data appears to be daily or less frequent. Daily seasonality is only useful for hourly/sub-daily data.")
         
-        weekly_seasonality = st.sidebar.checkbox(
+        weekly_seasonality = settings.checkbox(
             "Weekly Seasonality",
             value=True,
             help="Captures day-of-week patterns (e.g., Monday vs Sunday behavior)"
         )
-        yearly_seasonality = st.sidebar.checkbox(
+        yearly_seasonality = settings.checkbox(
             "Yearly Seasonality",
             value=True,
             help="Captures annual patterns (e.g., holiday seasons, quarterly cycles)"
         )
         
         # Holidays configuration
-        st.sidebar.subheader("Holidays")
+        settings.subheader("Holidays")
         
-        # Country holidays dropdown (display name in UI, ISO code in backend)
+        # Country holiday calendars (display names in UI, ISO codes in backend)
         if get_country_holiday_choices is not None:
-            country_choices = get_country_holiday_choices()
-            country_options = [label for label, _ in country_choices]
-            label_to_code = {label: code for label, code in country_choices}
-            default_index = 0  # United States first
-            selected_country_label = st.sidebar.selectbox(
+            country_choices = [(label, code) for label, code in get_country_holiday_choices() if code is not None]
+            label_to_code = dict(country_choices)
+            selected_country_labels = settings.multiselect(
                 "Country holidays",
-                options=country_options,
-                index=default_index,
-                help="Select a country to include its public holidays in the model. Uses Prophet's built-in holiday calendar (ISO country code in backend)."
+                options=[label for label, _ in country_choices],
+                default=["United States"],
+                help="Public holidays of every selected country are combined (overlapping events are merged). Leave empty for no country holidays."
             )
-            selected_country_code = label_to_code.get(selected_country_label, "US")
+            selected_codes = [label_to_code[label] for label in selected_country_labels]
+            subdivision_options = {
+                f"{COUNTRY_CODE_TO_NAME.get(code, code)}: {label}": f"{code}-{sub}"
+                for code in selected_codes
+                for label, sub in get_subdivision_choices(code) if sub is not None
+            }
+            if subdivision_options:
+                selected_subdivisions = [
+                    subdivision_options[label] for label in settings.multiselect(
+                        "Subdivisions",
+                        options=list(subdivision_options),
+                        help="States, provinces or regions whose additional holidays should be included (they replace their country's nationwide calendar)"
+                    )
+                ]
+                # A subdivision calendar already contains its country's national holidays
+                covered = {code.split("-")[0] for code in selected_subdivisions}
+                selected_codes = [code for code in selected_codes if code not in covered] + selected_subdivisions
+            # ISO 3166-2 style codes, comma separated, e.g. "US-CA,GB"
+            selected_country_code = ",".join(selected_codes) or None
         else:
             selected_country_code = "US"
-            st.sidebar.info("Using United States holidays (country list unavailable).")
+            settings.info("Using United States holidays (country list unavailable).")
         
-        use_custom_holidays = st.sidebar.checkbox("Upload Custom Holidays CSV", value=False)
+        use_custom_holidays = settings.checkbox("Upload Custom Holidays CSV", value=False)
         custom_holidays_file = None
         if use_custom_holidays:
-            # Show example holidays format
-            with st.sidebar.expander("📝 Holidays CSV Format", expanded=False):
-                st.markdown("""
-                Your holidays CSV should have the following columns:
-                
-                | holiday | ds | lower_window | upper_window |
-                |---------|----|--------------|--------------|
-                | Super Bowl | 2/12/23 | 0 | 0 |
-                | Black Friday | 11/24/23 | 0 | 3 |
-                | Easter | 4/9/23 | -2 | 0 |
-                
-                **Column Requirements:**
-                - **holiday**: Name of the holiday (required)
-                - **ds**: Date of the holiday (M/D/YY or YYYY-MM-DD format) (required)
-                - **lower_window**: Days before the holiday to include (optional, default: 0)
-                - **upper_window**: Days after the holiday to include (optional, default: 0)
-                
-                **Window Examples:**
-                - Black Friday with `upper_window=3` → affects holiday + 3 days after
-                - Easter with `lower_window=-2` → affects 2 days before + holiday
-                
-                **Tips:** Download the example file below to see a full year of holidays with proper formatting.
-                """)
-                
-                # Load and provide example holidays CSV
-                try:
-                    # Get the directory where the script is located
-                    script_dir = os.path.dirname(os.path.abspath(__file__))
-                    example_file_path = os.path.join(script_dir, 'example_holidays.csv')
-                    with open(example_file_path, 'r') as f:
-                        example_holidays_csv = f.read()
-                    st.download_button(
-                        label="📥 Download Example Holidays CSV",
-                        data=example_holidays_csv,
-                        file_name="example_holidays.csv",
-                        mime="text/csv",
-                        use_container_width=True
-                    )
-                except FileNotFoundError:
-                    st.info("Example file not found. Please check the app directory.")
-                except Exception as e:
-                    st.info(f"Could not load example file: {str(e)}")
-            
-            custom_holidays_file = st.sidebar.file_uploader(
+            custom_holidays_file = settings.file_uploader(
                 "Upload Holidays CSV",
                 type=['csv'],
-                help="CSV with 'holiday', 'ds', 'lower_window', and 'upper_window' columns. Download example above."
+                help="CSV with 'holiday', 'ds', 'lower_window', and 'upper_window' columns. See the Holidays CSV Format panel below the settings for an example."
             )
         
         # Forecast settings
-        st.sidebar.subheader("Forecast Settings")
-        forecast_periods = st.sidebar.number_input(
+        settings.subheader("Forecast Settings")
+        forecast_periods = settings.number_input(
             "Forecast Periods",
             min_value=1,
             max_value=3650,
@@ -274,21 +829,81 @@ if uploaded_file is not None:
             help="Number of periods to forecast"
         )
         
-        forecast_freq = st.sidebar.selectbox(
+        forecast_freq = settings.selectbox(
             "Forecast Frequency",
             ['D', 'W', 'M', 'Q', 'Y'],
             index=0,
             help="D=daily, W=weekly, M=monthly, Q=quarterly, Y=yearly"
         )
         
+        uncertainty_level = settings.selectbox(
+            "Uncertainty Intervals",
+            list(UNCERTAINTY_TIERS),
+            index=list(UNCERTAINTY_TIERS).index("full"),
+            format_func=lambda tier: {
+                "none": "None (point forecast only)",
+                "fast": f"Fast ({UNCERTAINTY_TIERS['fast']} samples)",
+                "full": f"Full ({UNCERTAINTY_TIERS['full']} samples)",
+            }[tier],
+            help="Intervals are simulated after the point forecast is shown. Fast uses fewer simulations (slightly noisier bounds); None skips them."
+        )
+        
+        # Fitting backend: fast MAP point fit vs full posterior (MCMC)
+        fit_backend_choice = settings.selectbox(
+            "Fitting Backend",
+            list(FIT_BACKENDS),
+            format_func=FIT_BACKENDS.get,
+            help="MAP optimization is the fastest point fit. MCMC samples the full posterior, so intervals include parameter uncertainty, but it is typically 10-100x slower."
+        )
+        max_iter = DEFAULT_FIT_PARAMS["max_iter"]
+        tol_rel_grad = DEFAULT_FIT_PARAMS["tol_rel_grad"]
+        mcmc_samples = 0
+        mcmc_chains = DEFAULT_FIT_PARAMS["mcmc_chains"]
+        if fit_backend_choice == "mcmc":
+            col1, col2 = settings.columns(2)
+            with col1:
+                mcmc_samples = st.number_input(
+                    "Samples per chain",
+                    min_value=20,
+                    max_value=5000,
+                    value=DEFAULT_MCMC_SAMPLES,
+                    step=50,
+                    help="Iterations per chain; the first half is warmup"
+                )
+            with col2:
+                mcmc_chains = st.number_input(
+                    "Chains",
+                    min_value=1,
+                    max_value=16,
+                    value=DEFAULT_FIT_PARAMS["mcmc_chains"],
+                    help="Chains run in parallel, one per CPU core"
+                )
+        else:
+            max_iter = settings.number_input(
+                "Max optimizer iterations",
+                min_value=10,
+                max_value=100000,
+                value=DEFAULT_FIT_PARAMS["max_iter"],
+                step=100,
+                help="Lower limits stop the optimizer early: faster, possibly less accurate"
+            )
+            if fit_backend_choice == "lbfgs":
+                tol_rel_grad = settings.select_slider(
+                    "Relative gradient tolerance",
+                    options=[1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9],
+                    value=DEFAULT_FIT_PARAMS["tol_rel_grad"],
+                    format_func=lambda tol: f"{tol:.0e}",
+                    help="L-BFGS stops once the relative gradient falls below this multiple of machine precision. Higher = earlier stop."
+                )
+        
         # Advanced options (collapsible)
-        with st.sidebar.expander("Advanced Options"):
+        with settings.expander("Advanced Options"):
             changepoint_prior_scale = st.slider(
                 "Changepoint Prior Scale",
                 min_value=0.001,
                 max_value=0.5,
-                value=0.05,
                 step=0.001,
+                key="changepoint_prior_scale",
                 help="Flexibility of trend changes"
             )
             
@@ -296,8 +911,8 @@ if uploaded_file is not None:
                 "Changepoint Range",
                 min_value=0.2,
                 max_value=1.0,
-                value=0.8,
                 step=0.05,
+                key="changepoint_range",
                 help="Share of history (from the start) where automatic trend changepoints may be placed. Lower = smoother tail, fewer kinks near the end; higher = changepoints allowed closer to the latest data."
             )
             
@@ -305,186 +920,420 @@ if uploaded_file is not None:
                 "Seasonality Prior Scale",
                 min_value=0.01,
                 max_value=10.0,
-                value=10.0,
                 step=0.1,
+                key="seasonality_prior_scale",
                 help="Strength of seasonality"
             )
             
             holidays_prior_scale = st.slider(
                 "Holidays Prior Scale",
                 min_value=0.01,
-                value=10.0,
                 max_value=10.0,
                 step=0.1,
+                key="holidays_prior_scale",
                 help="Strength of holiday effects"
             )
+            
+            incremental_refit = st.checkbox(
+                "Incremental refit (warm start)",
+                value=True,
+                help="When the upload extends a previously fitted series (same rows plus new ones, same settings), start the optimizer from the previous fit's parameters. Typically converges in far fewer iterations."
+            )
+            
+            # Tuning mode: ranges instead of single values, scored by cross-validation
+            tuning_mode = st.checkbox(
+                "Tuning mode",
+                value=False,
+                disabled=batch_mode,
+                help="Search ranges of the parameters above with rolling-origin cross-validation (single series only)"
+            )
+            tuning_ranges = {}
+            if tuning_mode and not batch_mode:
+                for name, (label, low, high, step) in TUNING_SLIDERS.items():
+                    tuning_ranges[name] = st.slider(
+                        f"{label} range",
+                        min_value=low,
+                        max_value=high,
+                        value=(low if name != "changepoint_range" else 0.6, high if name != "changepoint_prior_scale" else 0.2),
+                        step=step
+                    )
+                tuning_steps = st.number_input("Values per parameter", min_value=1, max_value=6, value=3)
+                default_initial, default_period, default_horizon = default_cv_windows(prepared_df)
+                cv_initial = st.number_input("CV initial window (days)", min_value=1, value=default_initial)
+                cv_period = st.number_input("CV period (days)", min_value=1, value=default_period)
+                cv_horizon = st.number_input("CV horizon (days)", min_value=1, value=default_horizon)
+                tuning_workers = st.number_input(
+                    "Max concurrent fits",
+                    min_value=1,
+                    max_value=max(64, default_worker_count()),
+                    value=default_worker_count()
+                )
+                tuning_budget = st.number_input(
+                    "Time budget (seconds, 0 = none)",
+                    min_value=0,
+                    value=0,
+                    help="Stop the search and keep the configurations scored so far once this much time has passed"
+                )
+        
+        settings.form_submit_button("✅ Apply settings", use_container_width=True)
+        
+        if use_custom_holidays:
+            # Example holidays format (download buttons cannot live in the form)
+            with st.sidebar.expander("📝 Holidays CSV Format", expanded=False):
+                st.markdown("""
+                Your holidays CSV should have the following columns:
+                
+                | holiday | ds | lower_window | upper_window |
+                |---------|----|--------------|--------------|
+                | Super Bowl | 2/12/23 | 0 | 0 |
+                | Black Friday | 11/24/23 | 0 | 3 |
+                | Easter | 4/9/23 | -2 | 0 |
+                
+                **Column Requirements:**
+                - **holiday**: Name of the holiday (required)
+                - **ds**: Date of the holiday (M/D/YY or YYYY-MM-DD format) (required)
+                - **lower_window**: Days before the holiday to include (optional, default: 0)
+                - **upper_window**: Days after the holiday to include (optional, default: 0)
+                
+                **Window Examples:**
+                - Black Friday with `upper_window=3` → affects holiday + 3 days after
+                - Easter with `lower_window=-2` → affects 2 days before + holiday
+                
+                **Tips:** Download the example file below to see a full year of holidays with proper formatting.
+                """)
+                
+                # Load and provide example holidays CSV
+                try:
+                    # Get the directory where the script is located
+                    script_dir = os.path.dirname(os.path.abspath(__file__))
+                    example_file_path = os.path.join(script_dir, 'example_holidays.csv')
+                    with open(example_file_path, 'r') as f:
+                        example_holidays_csv = f.read()
+                    st.download_button(
+                        label="📥 Download Example Holidays CSV",
+                        data=example_holidays_csv,
+                        file_name="example_holidays.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
+                except FileNotFoundError:
+                    st.info("Example file not found. Please check the app directory.")
+                except Exception as e:
+                    st.info(f"Could not load example file: {str(e)}")
+        
+        # Fit cache status
+        with st.sidebar.expander("Fit Cache"):
+            cache_stats = forecast_cache.stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Hits", cache_stats["memory_hits"] + cache_stats["disk_hits"])
+            col2.metric("Misses", cache_stats["misses"])
+            col3.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+            st.caption(
+                f"Memory: {cache_stats['memory_entries']} fits, {cache_stats['memory_mb']:.1f} MB · "
+                f"Disk: {cache_stats['disk_entries']} fits, {cache_stats['disk_mb']:.1f} MB"
+            )
+            if st.button("Clear cache", use_container_width=True):
+                forecast_cache.clear()
+                st.rerun()
+        
+        model_params = {
+            "seasonality_mode": seasonality_mode,
+            "daily_seasonality": daily_seasonality,
+            "weekly_seasonality": weekly_seasonality,
+            "yearly_seasonality": yearly_seasonality,
+            "changepoint_prior_scale": changepoint_prior_scale,
+            "changepoint_range": changepoint_range,
+            "seasonality_prior_scale": seasonality_prior_scale,
+            "holidays_prior_scale": holidays_prior_scale,
+            "uncertainty_samples": UNCERTAINTY_TIERS[uncertainty_level],
+            "mcmc_samples": int(mcmc_samples),
+            "fit_backend": fit_backend_choice,
+            "max_iter": int(max_iter),
+            "tol_rel_grad": float(tol_rel_grad),
+            "mcmc_chains": int(mcmc_chains),
+        }
         
         # Generate forecast button
         if st.button("🚀 Generate Forecast", type="primary", use_container_width=True):
             with st.spinner("Training Prophet model and generating forecast..."):
                 try:
-                    # Initialize Prophet model
-                    m = Prophet(
-                        seasonality_mode=seasonality_mode,
-                        daily_seasonality=daily_seasonality,
-                        weekly_seasonality=weekly_seasonality,
-                        yearly_seasonality=yearly_seasonality,
-                        changepoint_prior_scale=changepoint_prior_scale,
-                        changepoint_range=changepoint_range,
-                        seasonality_prior_scale=seasonality_prior_scale,
-                        holidays_prior_scale=holidays_prior_scale
-                    )
-                    
-                    # Add country holidays if a country is selected (backend uses ISO code)
-                    if selected_country_code is not None:
-                        m.add_country_holidays(country_name=selected_country_code)
-                    
-                    # Add custom holidays if provided
-                    if use_custom_holidays and custom_holidays_file is not None:
-                        try:
-                            holidays_df = pd.read_csv(custom_holidays_file)
-                            # Parse dates with infer_datetime_format for flexibility
-                            holidays_df['ds'] = pd.to_datetime(holidays_df['ds'], infer_datetime_format=True)
-                            
-                            # Validate required columns
-                            if 'holiday' not in holidays_df.columns or 'ds' not in holidays_df.columns:
-                                st.sidebar.error("❌ Holidays CSV must have 'holiday' and 'ds' columns")
+                    with rerun_trace.stage("holidays") as holidays_info:
+                        # Add custom holidays if provided
+                        holidays_df = None
+                        if use_custom_holidays and custom_holidays_file is not None:
+                            holidays_df, holidays_message = load_custom_holidays(custom_holidays_file)
+                            if holidays_df is not None:
+                                st.sidebar.success(f"✅ {holidays_message}")
                             else:
-                                m.holidays = holidays_df
-                                st.sidebar.success(f"✅ Loaded {len(holidays_df)} custom holidays")
-                        except Exception as e:
-                            st.sidebar.warning(f"⚠️ Could not load custom holidays: {str(e)}")
-                    
-                    # Fit model
-                    m.fit(prepared_df)
-                    
-                    # Create future dataframe
-                    future = m.make_future_dataframe(periods=forecast_periods, freq=forecast_freq)
+                                st.sidebar.warning(f"⚠️ {holidays_message}")
+                        # Build (or load) the country tables here so the fit finds them cached
+                        combined_holidays = combine_holidays(
+                            selected_country_code,
+                            *holiday_year_span(prepared_df, forecast_periods, forecast_freq),
+                            custom_df=holidays_df
+                        )
+                        holidays_info["rows"] = 0 if combined_holidays is None else len(combined_holidays)
                     
-                    # Generate forecast
-                    forecast = m.predict(future)
-                    
-                    # Store in session state
-                    st.session_state.forecast_df = forecast
-                    st.session_state.model = m
-                    
-                    st.success("✅ Forecast generated successfully!")
+                    if batch_mode:
+                        # Fit every series on the process pool, streaming progress
+                        n_series = data_df[series_col].nunique()
+                        progress = st.progress(0.0, text=f"Fitting 0 / {n_series} series...")
+                        results = []
+                        for result in run_batch_forecast(
+                            data_df, series_col, model_params, forecast_periods, forecast_freq,
+                            country_code=selected_country_code, holidays_df=holidays_df,
+                            max_workers=int(batch_workers), preprocess_options=preprocess_options,
+                            warm_start=incremental_refit, baseline_below_rows=int(baseline_below_rows)
+                        ):
+                            results.append(result)
+                            progress.progress(
+                                len(results) / n_series,
+                                text=f"Fitting {len(results)} / {n_series} series..."
+                            )
+                        progress.empty()
+                        
+                        batch_summary = summarize_results(results)
+                        st.session_state.reconciliation_report = None
+                        if hierarchical_mode:
+                            # Coherent forecasts: adjust every node in one matrix pass
+                            with rerun_trace.stage("reconcile", rows=n_series):
+                                results, st.session_state.reconciliation_report = reconcile(
+                                    results, data_df, hierarchy, reconciliation_method
+                                )
+                            batch_summary.insert(1, "level", batch_summary["series"].map(hierarchy.level_of()))
+                        
+                        history_end = data_df.groupby(series_col)['ds'].max().to_dict()
+                        
+                        # Store in session state
+                        store_result(
+                            batch_forecast=compact_forecast(combine_forecasts(results, series_col, history_end)),
+                            batch_summary=batch_summary
+                        )
+                        st.session_state.batch_forecast_id = f"batch-{uuid.uuid4().hex[:12]}"
+                        n_failed = sum(1 for r in results if r["error"])
+                        if n_failed:
+                            st.warning(f"⚠️ {n_failed} of {n_series} series failed. See the Summary tab for details.")
+                        st.success(f"✅ Forecast generated for {n_series - n_failed} series!")
+                    else:
+                        # Fit in the background; the job panel below tracks it
+                        if st.session_state.active_job_id is not None:
+                            job_runner.cancel(st.session_state.active_job_id)
+                        # Millisecond baselines: a preview while Prophet fits and an accuracy reference
+                        with rerun_trace.stage("baseline", rows=len(prepared_df)):
+                            scores = baseline_scores(prepared_df)
+                            baseline_fc, baseline_model = baseline_forecast(
+                                prepared_df, forecast_periods, forecast_freq, scores=scores
+                            )
+                        st.session_state.pending_fit = {
+                            "baseline_key": artifact_store.put(baseline_fc, "baseline"),
+                            "baseline_model": baseline_model,
+                            "baseline_scores": scores,
+                            "history_key": artifact_store.put(prepared_df, "history"),
+                            "fit_settings": {
+                                "model_params": model_params,
+                                "country_code": selected_country_code,
+                                "forecast_periods": int(forecast_periods),
+                                "forecast_freq": forecast_freq,
+                            },
+                        }
+                        st.session_state.active_job_id = job_runner.submit_fit(
+                            getattr(uploaded_file, 'name', 'forecast'), forecast_cache,
+                            prepared_df, model_params, forecast_periods, forecast_freq,
+                            country_code=selected_country_code, holidays_df=holidays_df,
+                            warm_start=incremental_refit, owner=st.session_state.session_owner
+                        )
                     
                 except Exception as e:
                     st.error(f"❌ Error generating forecast: {str(e)}")
                     st.exception(e)
         
-        # Display results if forecast exists
-        if st.session_state.forecast_df is not None:
-            forecast = st.session_state.forecast_df
-            model = st.session_state.model
+        # Live status of the background fit
+        if not batch_mode and st.session_state.active_job_id is not None:
+            render_active_job()
+        if st.session_state.job_message is not None:
+            kind, text = st.session_state.job_message
+            getattr(st, kind)(text)
+            st.session_state.job_message = None
+        
+        # Hyperparameter tuning (single series)
+        if tuning_mode and not batch_mode:
+            grid = build_param_grid(tuning_ranges, int(tuning_steps))
+            if st.button(f"🔍 Run Tuning ({len(grid)} configurations)", use_container_width=True):
+                # Any rerun (e.g. this button) interrupts the search and drops queued configs
+                st.button("⏹ Cancel Tuning", use_container_width=True)
+                # Score the same model the forecast will fit, custom holidays included
+                holidays_df = None
+                if use_custom_holidays and custom_holidays_file is not None:
+                    holidays_df, holidays_message = load_custom_holidays(custom_holidays_file)
+                    if holidays_df is None:
+                        st.warning(f"⚠️ {holidays_message}")
+                progress = st.progress(0.0, text=f"Cross-validating 0 / {len(grid)} configurations...")
+                results = []
+                for result in run_tuning(
+                    prepared_df, model_params, grid,
+                    (int(cv_initial), int(cv_period), int(cv_horizon)),
+                    country_code=selected_country_code, holidays_df=holidays_df,
+                    max_workers=int(tuning_workers),
+                    time_budget=float(tuning_budget) or None
+                ):
+                    results.append(result)
+                    st.session_state.tuning_results = rank_results(results)
+                    progress.progress(
+                        len(results) / len(grid),
+                        text=f"Cross-validating {len(results)} / {len(grid)} configurations..."
+                    )
+                progress.empty()
+                if len(results) < len(grid):
+                    st.warning(f"⚠️ Time budget reached: {len(results)} of {len(grid)} configurations scored")
             
-            st.header("📈 Forecast Results")
+            tuning_results = st.session_state.tuning_results
+            if tuning_results is not None and not tuning_results.empty:
+                ranked_by = tuning_results.attrs.get("ranked_by", "mape").upper()
+                st.subheader(f"🔍 Tuning Results (ranked by {ranked_by})")
+                st.dataframe(tuning_results, use_container_width=True)
+                best = tuning_results.iloc[0]
+                best_params = {name: float(best[name]) for name in TUNING_SLIDERS}
+                st.button(
+                    "✅ Apply Best Config",
+                    on_click=apply_tuned_params,
+                    args=(best_params,),
+                    help="Copy the top-ranked parameters into Advanced Options"
+                )
+        
+        # Display batch results if a batch forecast exists
+        batch_forecast = load_result("batch_forecast")
+        if batch_mode and batch_forecast is not None and (batch_forecast.empty or series_col in batch_forecast.columns):
+            batch_summary = load_result("batch_summary")
             
-            # Create tabs for different views
-            tab1, tab2, tab3, tab4 = st.tabs(["📊 Forecast Plot", "🔍 Components", "📋 Data Table", "💾 Download"])
+            st.header("📈 Batch Forecast Results")
+            
+            tab1, tab2, tab3 = st.tabs(["📊 Series Plot", "📋 Summary", "💾 Download"])
             
             with tab1:
                 st.subheader("Forecast Visualization")
-                
-                # Create interactive plot
-                fig = plot_plotly(model, forecast)
-                fig.update_layout(
-                    title="Prophet Forecast",
-                    xaxis_title="Date",
-                    yaxis_title="Value",
-                    height=600
-                )
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Show forecast summary
+                if batch_forecast.empty:
+                    st.info("No series produced a forecast.")
+                else:
+                    series_keys = batch_forecast[series_col].unique().tolist()
+                    selected_series = st.selectbox("Series", options=series_keys)
+                    
+                    def build_series_plot():
+                        history = prepare_data(data_df[data_df[series_col] == selected_series])
+                        series_forecast = batch_forecast[batch_forecast[series_col] == selected_series]
+                        fig, plot_stats = build_forecast_figure(
+                            history, series_forecast, title=f"Prophet Forecast: {selected_series}"
+                        )
+                        fig.update_layout(showlegend=True)
+                        return fig, plot_stats
+                    
+                    fig, plot_stats = cached_figure(
+                        ("batch", st.session_state.batch_forecast_id, selected_series),
+                        build_series_plot, rerun_trace, "plot"
+                    )
+                    if plot_stats['points_rendered'] < plot_stats['points_total']:
+                        st.caption(f"Rendering {plot_stats['points_rendered']:,} of {plot_stats['points_total']:,} points (WebGL)")
+                    st.plotly_chart(fig, use_container_width=True)
+            
+            with tab2:
+                st.subheader("Series Summary")
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    st.metric("Historical Data Points", len(prepared_df))
+                    st.metric("Series", len(batch_summary))
                 with col2:
-                    st.metric("Forecast Periods", forecast_periods)
+                    st.metric("Failed", int((batch_summary['status'] == 'failed').sum()))
                 with col3:
-                    latest_forecast = forecast[forecast['ds'] > prepared_df['ds'].max()].iloc[-1]
-                    st.metric("Latest Forecast Value", f"{latest_forecast['yhat']:,.2f}")
-            
-            with tab2:
-                st.subheader("Forecast Components")
-                
-                # Plot components
-                fig_components = plot_components_plotly(model, forecast)
-                st.plotly_chart(fig_components, use_container_width=True)
+                    st.metric("Total Fit Time (s)", f"{batch_summary['fit_seconds'].sum():,.1f}")
+                report = st.session_state.reconciliation_report
+                if hierarchical_mode and report is not None and report["method"] != "none":
+                    if report["message"]:
+                        st.warning(f"⚠️ {report['message']}")
+                    if report["coherence_after"] is not None:
+                        before = report["coherence_before"]
+                        st.info(
+                            f"Reconciled with **{RECONCILIATION_METHODS[report['method']]}** over {report['rows']:,} dates · "
+                            f"max |parent − sum of children|: "
+                            f"{'n/a' if before is None else f'{before:,.4g}'} → {report['coherence_after']:,.2g}"
+                            + (f" · shrinkage {report['shrinkage']:.2f}" if "shrinkage" in report else "")
+                        )
+                st.dataframe(batch_summary, use_container_width=True)
             
             with tab3:
-                st.subheader("Forecast Data")
-                
-                # Filter options
-                col1, col2 = st.columns(2)
-                with col1:
-                    show_only_forecast = st.checkbox("Show only forecast period", value=False)
-                with col2:
-                    min_date_filter = st.date_input(
-                        "Min Date",
-                        value=prepared_df['ds'].min().date(),
-                        min_value=prepared_df['ds'].min().date()
-                    )
-                
-                # Filter dataframe
-                display_df = forecast.copy()
-                if show_only_forecast:
-                    display_df = display_df[display_df['ds'] > prepared_df['ds'].max()]
-                else:
-                    display_df = display_df[display_df['ds'] >= pd.to_datetime(min_date_filter)]
-                
-                # Select columns to display
-                columns_to_show = st.multiselect(
-                    "Select columns to display",
-                    options=forecast.columns.tolist(),
-                    default=['ds', 'yhat', 'yhat_lower', 'yhat_upper', 'trend']
-                )
-                
-                if columns_to_show:
-                    display_df = display_df[columns_to_show]
-                    st.dataframe(display_df, use_container_width=True)
-                    
-                    # Summary statistics
-                    if 'yhat' in columns_to_show:
-                        st.subheader("Summary Statistics")
-                        st.dataframe(display_df['yhat'].describe(), use_container_width=True)
-            
-            with tab4:
                 st.subheader("Download Forecast Results")
                 
-                # Add run date column
-                forecast_download = forecast.copy()
-                forecast_download['run_date'] = datetime.now().strftime('%Y-%m-%d')
-                
-                # Filter future dates only
-                forecast_future = forecast_download[forecast_download['ds'] > prepared_df['ds'].max()].copy()
-                
-                # Convert to CSV
-                csv_buffer = io.StringIO()
-                forecast_future.to_csv(csv_buffer, index=False)
-                csv_string = csv_buffer.getvalue()
-                
-                st.download_button(
-                    label="📥 Download Forecast CSV",
-                    data=csv_string,
-                    file_name=f"prophet_forecast_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
-                    use_container_width=True
+                # Rows are already future-only per series
+                render_download(
+                    batch_forecast, st.session_state.batch_forecast_id, "prophet_batch_forecast",
+                    rerun_trace, key="batch_export",
+                    default_columns=[series_col] + [c for c in DEFAULT_EXPORT_COLUMNS if c in batch_forecast.columns]
                 )
                 
-                st.info(f"💡 The download includes {len(forecast_future)} forecast periods starting from {forecast_future['ds'].min().date()}")
+                st.info(f"💡 The download includes {len(batch_forecast)} forecast rows across {batch_forecast[series_col].nunique() if not batch_forecast.empty else 0} series")
                 
-                # Show preview of download
                 st.subheader("Download Preview (Future Periods Only)")
-                st.dataframe(forecast_future.head(20), use_container_width=True)
+                st.dataframe(batch_forecast.head(20), use_container_width=True)
+        
+        # Display results if forecast exists
+        forecast_df = load_result("forecast")
+        if not batch_mode and forecast_df is not None:
+            render_forecast_results(
+                load_result("model"), forecast_df, load_result("history"),
+                rerun_trace, st.session_state.forecast_id
+            )
+            
+            scores = st.session_state.baseline_scores
+            if st.session_state.forecast_source == "fit" and scores is not None and len(scores):
+                with st.expander("📏 Baseline Reference"):
+                    st.caption(
+                        f"Each baseline was fitted without the last {int(scores['holdout_rows'].iloc[0]):,} "
+                        "history rows and scored on them. A useful Prophet model should beat the best one; "
+                        "Prophet's own error on those rows is in-sample (it was trained on them), so it is optimistic."
+                    )
+                    history = load_result("history")
+                    holdout = history.tail(int(scores['holdout_rows'].iloc[0]))
+                    fitted = forecast_df.set_index('ds')['yhat'].reindex(holdout['ds']).to_numpy()
+                    mae, smape = forecast_errors(holdout['y'].to_numpy(dtype=float), fitted)
+                    reference = scores.copy()
+                    reference.loc[len(reference)] = pd.Series({
+                        "model": "prophet", "label": "Prophet (in-sample)", "mae": mae, "smape": smape,
+                        "holdout_rows": len(holdout), "ms": np.nan,
+                    })
+                    st.dataframe(
+                        reference.drop(columns="model").round({"mae": 4, "smape": 2}),
+                        use_container_width=True, hide_index=True
+                    )
+            
+            # Save the fitted model for later predict-only runs
+            if st.session_state.forecast_source == "fit":
+                with st.expander("💾 Save Model to Registry"):
+                    default_name = os.path.splitext(getattr(uploaded_file, 'name', 'model'))[0]
+                    model_name = st.text_input("Model name", value=default_name)
+                    if st.button("Save Model", use_container_width=True):
+                        fit_settings = st.session_state.fit_settings
+                        model_id = save_model(
+                            model_name, load_result("model"), load_result("history"),
+                            fit_settings["model_params"],
+                            country_code=fit_settings["country_code"],
+                            forecast_periods=fit_settings["forecast_periods"],
+                            forecast_freq=fit_settings["forecast_freq"]
+                        )
+                        st.success(f"✅ Saved as `{model_id}`. Load it any time from **Model Registry** in the sidebar.")
+        
+        render_diagnostics(rerun_trace, st.session_state.fit_trace)
     
     except Exception as e:
         st.error(f"❌ Error reading CSV file: {str(e)}")
         st.exception(e)
         st.info("Please check that your CSV file is properly formatted and try again.")
     
+elif st.session_state.forecast_source == "registry" and st.session_state.forecast_key is not None:
+    # Predict-only run from a saved model: no upload needed
+    st.info(f"📚 Showing a predict-only forecast from saved model `{st.session_state.registry_model_id}`")
+    render_forecast_results(
+        load_result("model"), load_result("forecast"), load_result("history"),
+        rerun_trace, st.session_state.forecast_id
+    )
+    render_diagnostics(rerun_trace, None)
+    
 else:
     # Show instructions when no file is uploaded
     st.info("👆 Please upload a CSV file to get started.")
@@ -524,6 +1373,88 @@ else:
             mime="text/csv"
         )
 
+# Background jobs across every session of this deployment
+with st.sidebar.expander("🧵 Forecast Jobs"):
+    all_jobs = job_runner.jobs()
+    if not all_jobs:
+        st.caption("No forecast jobs yet.")
+    else:
+        running = sum(1 for job in all_jobs if not job.finished)
+        st.caption(f"{running} running or queued · {len(all_jobs) - running} finished")
+        jobs_table = pd.DataFrame([job.as_row() for job in all_jobs])
+        jobs_table["yours"] = [job.owner == st.session_state.session_owner for job in all_jobs]
+        st.dataframe(jobs_table, use_container_width=True, hide_index=True)
+
+# Shared artifact store and process memory
+with st.sidebar.expander("🧠 Memory"):
+    store_stats = artifact_store.stats()
+    rss_mb = current_rss_mb()
+    col1, col2 = st.columns(2)
+    col1.metric("Process RSS", f"{rss_mb:,.0f} MB" if rss_mb is not None else "n/a")
+    col2.metric("Shared Store", f"{store_stats['memory_mb']:,.1f} MB")
+    session_mb = sum(
+        artifact_store.nbytes(st.session_state[f"{name}_key"])
+        for name in ('forecast', 'model', 'history', 'batch_forecast', 'batch_summary')
+    ) / (1024 * 1024)
+    st.caption(
+        f"{store_stats['entries']} artifacts of {store_stats['limit_mb']:,.0f} MB limit · "
+        f"this session: {session_mb:,.1f} MB · reused {store_stats['shared_puts']}× · "
+        f"evicted {store_stats['evicted']}, expired {store_stats['expired']}"
+    )
+    if store_stats["by_kind"]:
+        st.dataframe(
+            pd.DataFrame(
+                [(kind, count, round(mb, 2)) for kind, (count, mb) in sorted(store_stats["by_kind"].items())],
+                columns=["artifact", "entries", "MB"]
+            ),
+            use_container_width=True, hide_index=True
+        )
+
+# Model registry: list, load and predict-only runs (no Stan fit)
+with st.sidebar.expander("📚 Model Registry"):
+    saved_models = list_models()
+    if not saved_models:
+        st.caption("No saved models yet. Fit a forecast and use **Save Model to Registry**.")
+    else:
+        models_by_id = {meta["model_id"]: meta for meta in saved_models}
+        registry_model_id = st.selectbox(
+            "Saved model",
+            options=list(models_by_id),
+            format_func=lambda model_id: f"{models_by_id[model_id]['name']} ({models_by_id[model_id]['created_at']})",
+            key="registry_select"
+        )
+        registry_meta = models_by_id[registry_model_id]
+        st.caption(
+            f"{registry_meta['rows']:,} rows, {registry_meta['history_start'][:10]} → "
+            f"{registry_meta['history_end'][:10]}"
+        )
+        registry_periods = st.number_input(
+            "Forecast Periods",
+            min_value=1,
+            max_value=3650,
+            value=int(registry_meta.get("forecast_periods") or 365),
+            key="registry_periods"
+        )
+        registry_freq_options = ['D', 'W', 'M', 'Q', 'Y', 'h']
+        registry_freq = st.selectbox(
+            "Forecast Frequency",
+            registry_freq_options,
+            index=registry_freq_options.index(registry_meta.get("forecast_freq") or 'D')
+            if (registry_meta.get("forecast_freq") or 'D') in registry_freq_options else 0,
+            key="registry_freq"
+        )
+        col1, col2 = st.columns(2)
+        col1.button(
+            "Load & Predict",
+            on_click=load_registry_forecast,
+            use_container_width=True
+        )
+        col2.button(
+            "Delete",
+            on_click=lambda: delete_model(st.session_state.registry_select),
+            use_container_width=True
+        )
+
 # Footer
 st.markdown("---")
 st.markdown("""
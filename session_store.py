@@ -0,0 +1,136 @@
+"""
+Process-wide store for large session artifacts.
+Sessions keep only content-hash keys in st.session_state; forecasts, training
+history and fitted models live here once and are shared by every session
+that produced identical content. Forecast frames are stored compactly
+(float32 components, no duplicate interval columns). Entries not used within a TTL
+expire, and the least-recently-used are evicted beyond a memory limit.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from bounded_cache import BoundedLRU
+from forecast_cache import fingerprint_frame
+
+DEFAULT_STORE_MEMORY_MB = 1024
+
+# Entries unused for this long are released
+DEFAULT_STORE_TTL_SECONDS = 2 * 60 * 60
+
+# Columns never downcast or dropped
+_KEEP_COLUMNS = {"ds", "yhat", "yhat_lower", "yhat_upper", "trend", "trend_lower", "trend_upper"}
+
+
+def compact_forecast(forecast):
+    """Copy of a forecast with float32 components, without component bounds that equal the component.
+
+    ds, yhat, trend and their bounds (_KEEP_COLUMNS) keep full precision for
+    export. For MAP fits every seasonal/holiday component's _lower/_upper
+    columns are exact copies of the component; their names are kept in
+    attrs["bounds_from_point"] so expand_forecast can restore them.
+    """
+    columns = {}
+    dropped = []
+    for col in forecast.columns:
+        for suffix in ("_lower", "_upper"):
+            base = col[:-len(suffix)] if col.endswith(suffix) else None
+            if (base is not None and col not in _KEEP_COLUMNS and base in forecast.columns
+                    and np.array_equal(forecast[col].to_numpy(), forecast[base].to_numpy())):
+                dropped.append(col)
+                break
+        else:
+            values = forecast[col]
+            downcast = values.dtype == np.float64 and col not in _KEEP_COLUMNS
+            columns[col] = values.astype(np.float32) if downcast else values
+    compact = pd.DataFrame(columns, index=forecast.index)
+    compact.attrs["bounds_from_point"] = dropped
+    return compact
+
+
+def expand_forecast(forecast):
+    """Forecast with the bound columns dropped by compact_forecast restored (for Prophet plots)."""
+    dropped = forecast.attrs.get("bounds_from_point")
+    if not dropped:
+        return forecast
+    restored = {col: forecast[col.rsplit("_", 1)[0]] for col in dropped}
+    return forecast.assign(**restored)
+
+
+def compact_frame(df):
+    """Copy of a frame with float64 columns as float32."""
+    float_cols = df.select_dtypes(include=[np.float64]).columns
+    return df.astype({col: np.float32 for col in float_cols}) if len(float_cols) else df
+
+
+def model_fingerprint(m):
+    """Content hash of a fitted Prophet model (training data, parameters, components)."""
+    h = hashlib.sha256()
+    h.update(fingerprint_frame(m.history[["ds", "y"]]).encode())
+    for name in sorted(m.params):
+        h.update(name.encode())
+        h.update(np.ascontiguousarray(m.params[name]).tobytes())
+    h.update(json.dumps({
+        "seasonalities": sorted(m.seasonalities),
+        "holidays": m.train_holiday_names.tolist() if m.train_holiday_names is not None else None,
+        "interval_width": m.interval_width,
+        "uncertainty_samples": m.uncertainty_samples,
+        "mcmc_samples": m.mcmc_samples,
+    }, default=str).encode())
+    return h.hexdigest()
+
+
+def model_nbytes(m):
+    """Approximate in-memory size of a fitted Prophet model."""
+    nbytes = int(m.history.memory_usage(deep=True).sum()) if m.history is not None else 0
+    return nbytes + sum(np.asarray(v).nbytes for v in m.params.values())
+
+
+def artifact_key(obj):
+    """Content-hash key for a DataFrame or a fitted Prophet model."""
+    if isinstance(obj, pd.DataFrame):
+        return f"frame-{fingerprint_frame(obj)[:32]}"
+    return f"model-{model_fingerprint(obj)[:32]}"
+
+
+def artifact_nbytes(obj):
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    return model_nbytes(obj)
+
+
+class ArtifactStore(BoundedLRU):
+    """Content-addressed LRU of session artifacts with a TTL, shared by all sessions."""
+
+    def __init__(self, memory_limit_mb=DEFAULT_STORE_MEMORY_MB, ttl_seconds=DEFAULT_STORE_TTL_SECONDS):
+        super().__init__(memory_limit_mb, ttl_seconds=ttl_seconds)
+        self.shared_puts = 0
+
+    def put(self, obj, kind):
+        """Store obj (or reuse an identical stored copy); returns its key."""
+        key = artifact_key(obj)
+        _, hit = self.get_or_build(key, lambda: (obj, kind), lambda entry: artifact_nbytes(entry[0]))
+        if hit:
+            self.shared_puts += 1
+        return key
+
+    def get(self, key):
+        """The stored object, or None if it was evicted or has expired."""
+        if key is None:
+            return None
+        entry = super().get(key)
+        return entry[0] if entry is not None else None
+
+    def stats(self):
+        """Entry counts and memory by kind, plus eviction counters."""
+        by_kind = {}
+        for _, (_, kind), nbytes in self.items():
+            count, total = by_kind.get(kind, (0, 0))
+            by_kind[kind] = (count + 1, total + nbytes)
+        stats = super().stats()
+        stats["by_kind"] = {kind: (count, total / (1024 * 1024)) for kind, (count, total) in by_kind.items()}
+        stats["shared_puts"] = self.shared_puts
+        return stats
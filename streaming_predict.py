@@ -0,0 +1,124 @@
+"""
+Streaming prediction for long horizons.
+make_future_dataframe + predict build the whole history-plus-horizon frame
+at once, and the interval simulation holds a samples x horizon matrix of
+trend paths. Here the future grid is generated lazily, chunk by chunk, the
+in-sample history can be skipped, and every chunk is predicted on its own -
+trend paths carry their slope and level across chunk boundaries, so the
+intervals follow the same simulation as Prophet's - and handed to the caller
+(e.g. appended to the export file). Peak memory follows the chunk size, not
+the horizon.
+"""
+
+import numpy as np
+import pandas as pd
+
+from holiday_engine import cover_holiday_years
+from uncertainty import (
+    INTERVAL_COLUMNS, assemble_forecast, global_entropy, interval_bounds, predict_intervals
+)
+
+# Rows per chunk; each holds a few samples x rows matrices (~8 MB each at 1000 samples)
+DEFAULT_STREAM_CHUNK_ROWS = 1024
+
+
+def future_grid(last_date, forecast_periods, forecast_freq, chunk_rows=DEFAULT_STREAM_CHUNK_ROWS):
+    """The dates make_future_dataframe would add after last_date, in DatetimeIndex chunks."""
+    cursor, remaining = last_date, int(forecast_periods)
+    while remaining > 0:
+        n = min(chunk_rows, remaining)
+        # Same construction as make_future_dataframe, restarted from the previous chunk's end
+        dates = pd.date_range(start=cursor, periods=n + 1, freq=forecast_freq)
+        dates = dates[dates > cursor][:n]
+        yield dates
+        cursor = dates[-1]
+        remaining -= len(dates)
+
+
+class TrendPaths:
+    """Future linear-trend uncertainty paths, simulated one chunk at a time.
+
+    Same process as Prophet's _sample_uncertainty: slope changes arrive at
+    the historical changepoint rate with Laplace-distributed sizes, are
+    averaged with the previous step and integrated twice. Each path's last
+    change, slope and level carry over to the next chunk.
+    """
+
+    def __init__(self, m, n_samples, step):
+        self.step = step
+        self.likelihood = len(m.changepoints_t) * step
+        self.mean_delta = np.mean(np.abs(m.params['delta'][0])) + 1e-8
+        self.change = np.zeros(n_samples)
+        self.slope = np.zeros(n_samples)
+        self.level = np.zeros(n_samples)
+
+    def next(self, n_rows, rng):
+        """Trend deviations (samples x n_rows, in scaled units) for the next n_rows steps."""
+        shape = (len(self.slope), n_rows)
+        changed = rng.uniform(size=shape) < self.likelihood
+        change = np.zeros(shape)
+        change[changed] = rng.laplace(0, self.mean_delta, size=int(changed.sum()))
+        smoothed = (change + np.column_stack([self.change, change[:, :-1]])) / 2
+        slope = self.slope[:, None] + np.cumsum(smoothed, axis=1)
+        level = self.level[:, None] + np.cumsum(slope, axis=1)
+        self.change, self.slope, self.level = change[:, -1], slope[:, -1], level[:, -1]
+        return level * self.step
+
+
+def _predict_chunk(m, dates, paths, rng):
+    """Forecast rows for one chunk of dates; paths is None for history rows."""
+    df = m.setup_dataframe(pd.DataFrame({'ds': dates}))
+    df['trend'] = m.predict_trend(df)
+    seasonal_components = m.predict_seasonal_components(df)
+    intervals = None
+    if m.uncertainty_samples:
+        trend = df['trend'].to_numpy()
+        n_samples = int(m.uncertainty_samples)
+        if paths is None:
+            # History rows carry no trend uncertainty
+            trends = np.broadcast_to(trend, (n_samples, len(trend)))
+        else:
+            trends = trend + paths.next(len(trend), rng) * m.y_scale
+        bounds = interval_bounds(
+            m, trends, seasonal_components['additive_terms'].to_numpy(),
+            seasonal_components['multiplicative_terms'].to_numpy(), rng
+        )
+        intervals = pd.DataFrame(dict(zip(INTERVAL_COLUMNS, bounds)))
+    return assemble_forecast(m, df, intervals, seasonal_components)
+
+
+def predict_chunks(m, forecast_periods, forecast_freq, chunk_rows=DEFAULT_STREAM_CHUNK_ROWS,
+                   include_history=False, seed=None):
+    """Forecast frames (m.predict's columns) of at most chunk_rows rows, history first if included.
+
+    The trend path step is the first future chunk's mean spacing, which is
+    the whole horizon's for fixed frequencies. MCMC fits and non-linear
+    trends are predicted in one piece.
+    """
+    # Country calendars for the whole horizon up front, not one chunk at a time
+    last_date = pd.date_range(
+        start=m.history_dates.max(), periods=int(forecast_periods) + 1, freq=forecast_freq
+    )[-1]
+    cover_holiday_years(m, [m.history_dates.min(), last_date])
+
+    if m.mcmc_samples or m.growth != 'linear':
+        future = m.make_future_dataframe(
+            periods=forecast_periods, freq=forecast_freq, include_history=include_history
+        )
+        yield predict_intervals(m, future)
+        return
+
+    # Without a seed, np.random.seed still makes the intervals reproducible
+    rng = np.random.default_rng(seed if seed is not None else global_entropy())
+    if include_history:
+        history_dates = m.history_dates
+        for start in range(0, len(history_dates), chunk_rows):
+            yield _predict_chunk(m, history_dates.iloc[start:start + chunk_rows], None, rng)
+
+    paths = None
+    for dates in future_grid(m.history_dates.max(), forecast_periods, forecast_freq, chunk_rows):
+        if paths is None and m.uncertainty_samples:
+            t = (dates - m.start) / m.t_scale
+            step = np.diff(t).mean() if len(t) > 1 else np.diff(m.history['t']).mean()
+            paths = TrendPaths(m, int(m.uncertainty_samples), step)
+        yield _predict_chunk(m, dates, paths, rng)
@@ -0,0 +1,60 @@
+"""Size-bounded LRU shared by the in-memory caches."""
+
+import pandas as pd
+
+from bounded_cache import BoundedLRU
+from session_store import ArtifactStore
+
+MB = 1024 * 1024
+
+
+def test_evicts_least_recently_used_beyond_limit():
+    cache = BoundedLRU(memory_limit_mb=2)
+    cache.put("a", "A", MB)
+    cache.put("b", "B", MB)
+    assert cache.get("a") == "A"
+    cache.put("c", "C", MB)
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["evicted"] == 1
+
+
+def test_keeps_newest_entry_over_limit():
+    cache = BoundedLRU(memory_limit_mb=1)
+    cache.put("a", "A", 1)
+    cache.put("big", "B", 3 * MB)
+    assert len(cache) == 1
+    assert cache.get("big") == "B"
+
+
+def test_get_or_build_builds_once():
+    cache = BoundedLRU(memory_limit_mb=1)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return "value"
+
+    assert cache.get_or_build("k", build, len) == ("value", False)
+    assert cache.get_or_build("k", build, len) == ("value", True)
+    assert len(calls) == 1
+    assert cache.nbytes("k") == 5
+
+
+def test_ttl_expires_unused_entries():
+    cache = BoundedLRU(memory_limit_mb=1, ttl_seconds=0)
+    cache.put("a", "A", 1)
+    cache._entries["a"][2] -= 1
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_artifact_store_reuses_identical_content():
+    store = ArtifactStore()
+    frame = pd.DataFrame({"y": range(10)})
+    key = store.put(frame, "history")
+    assert store.put(frame.copy(), "history") == key
+    stats = store.stats()
+    assert stats["entries"] == 1 and stats["shared_puts"] == 1
+    assert stats["by_kind"]["history"][0] == 1
+    assert store.get(key) is frame
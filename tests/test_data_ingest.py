@@ -0,0 +1,28 @@
+"""Date parsing on ingest."""
+
+import pandas as pd
+
+from data_ingest import infer_date_format, parse_ds
+
+
+def test_parse_does_not_depend_on_earlier_columns():
+    day_first = pd.Series(["13/02/2024", "14/02/2024"])
+    assert parse_ds(day_first).tolist() == [pd.Timestamp("2024-02-13"), pd.Timestamp("2024-02-14")]
+
+    # Ambiguous on its own: read month first, as pd.to_datetime does
+    ambiguous = pd.Series(["01/02/2024"])
+    assert parse_ds(ambiguous).tolist() == pd.to_datetime(ambiguous).tolist()
+    assert parse_ds(ambiguous).tolist() == [pd.Timestamp("2024-01-02")]
+
+
+def test_format_decided_by_whole_column():
+    # Only one value, away from the sampled ones, shows the column is day first
+    values = pd.Series(["01/02/2024"] * 50 + ["13/02/2024"] + ["01/03/2024"] * 500)
+    assert infer_date_format(values) == "%d/%m/%Y"
+    assert parse_ds(values).iloc[0] == pd.Timestamp("2024-02-01")
+
+
+def test_unambiguous_formats():
+    assert infer_date_format(pd.Series(["2024-01-01", "2024-02-01"])) == "%Y-%m-%d"
+    assert infer_date_format(pd.Series(["2024-01-02 10:00:00"])) == "%Y-%m-%d %H:%M:%S"
+    assert infer_date_format(pd.Series(["not a date"])) is None
@@ -0,0 +1,35 @@
+"""Streaming export writer."""
+
+import pandas as pd
+import pytest
+
+from forecast_export import ExportWriter
+
+
+def _frames():
+    ds = pd.date_range("2024-01-01", periods=3, freq="D")
+    narrow = pd.DataFrame({"series": "baseline", "ds": ds, "yhat": [1.0, 2.0, 3.0]})
+    wide = pd.DataFrame({"series": "prophet", "ds": ds, "trend": [0.5, 0.6, 0.7], "yhat": [4.0, 5.0, 6.0]})
+    return narrow, wide
+
+
+def test_wider_frame_after_narrow_one_raises(tmp_path):
+    narrow, wide = _frames()
+    with ExportWriter(str(tmp_path / "out.csv")) as writer:
+        writer.write(narrow)
+        with pytest.raises(ValueError, match="trend"):
+            writer.write(wide)
+
+
+@pytest.mark.parametrize("name", ["out.csv", "out.csv.gz", "out.parquet"])
+def test_declared_columns_keep_every_frame(tmp_path, name):
+    narrow, wide = _frames()
+    path = str(tmp_path / name)
+    with ExportWriter(path, columns=["series", "ds", "yhat", "trend"]) as writer:
+        writer.write(narrow)
+        writer.write(wide)
+    written = pd.read_parquet(path) if name.endswith(".parquet") else pd.read_csv(path)
+    assert list(written.columns) == ["series", "ds", "yhat", "trend", "run_date"]
+    assert written["yhat"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    assert written["trend"].isna().tolist() == [True] * 3 + [False] * 3
+    assert written["trend"].iloc[3:].tolist() == [0.5, 0.6, 0.7]
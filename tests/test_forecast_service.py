@@ -0,0 +1,42 @@
+"""Request validation in the HTTP forecasting service."""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from forecast_service import ForecastService, make_server
+
+DATA = {"ds": ["2023-01-01", "2023-01-02", "2023-01-03"], "y": [10, 12, 11]}
+
+
+@pytest.fixture
+def server():
+    server = make_server(port=0, service=ForecastService(workers=1))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.service.shutdown()
+    server.server_close()
+
+
+def _post(server, payload):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_address[1]}/forecast",
+        data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_custom_holidays_path_rejected(server):
+    status, body = _post(server, {"data": DATA, "config": {"custom_holidays": "/etc/passwd"}})
+    assert status == 400
+    assert body["error"] == "Not supported by the service (use the CLI): custom_holidays"
+
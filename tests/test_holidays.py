@@ -0,0 +1,53 @@
+"""Country holiday calendars beyond the fitted horizon."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_engine import fit_prophet, quiet_stan_logging
+from model_registry import load_model, predict_only, save_model
+from streaming_predict import predict_chunks
+
+CHRISTMASES = ["2022-12-25", "2023-12-25", "2024-12-25", "2025-12-25"]
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    quiet_stan_logging()
+    ds = pd.date_range("2022-01-01", "2023-12-31", freq="D")
+    rng = np.random.default_rng(0)
+    y = 100 + 20 * ((ds.month == 12) & (ds.day == 25)) + rng.normal(0, 1, len(ds))
+    history = pd.DataFrame({"ds": ds, "y": y})
+    # 30-day fit horizon: the fit's calendars stop at 2024
+    m = fit_prophet(history, {"uncertainty_samples": 0}, 30, "D", country_code="US")
+    return m, history
+
+
+def _christmas_effects(forecast):
+    effects = forecast.set_index("ds")["holidays"]
+    return [effects.loc[day] for day in CHRISTMASES]
+
+
+def test_predict_only_beyond_fit_horizon(fitted):
+    m, _ = fitted
+    effects = _christmas_effects(predict_only(m, 800, "D"))
+    assert effects[0] > 10
+    assert effects == pytest.approx([effects[0]] * len(CHRISTMASES))
+
+
+def test_saved_model_beyond_fit_horizon(fitted, tmp_path):
+    m, history = fitted
+    model_id = save_model(
+        "holidays", m, history, {}, country_code="US", forecast_periods=30,
+        forecast_freq="D", registry_dir=str(tmp_path)
+    )
+    expected = _christmas_effects(predict_only(m, 800, "D"))
+
+    loaded, _ = load_model(model_id, registry_dir=str(tmp_path))
+    assert _christmas_effects(predict_only(loaded, 800, "D")) == pytest.approx(expected)
+
+    loaded, _ = load_model(model_id, registry_dir=str(tmp_path))
+    chunks = pd.concat(
+        predict_chunks(loaded, 800, "D", chunk_rows=256, include_history=True), ignore_index=True
+    )
+    assert _christmas_effects(chunks) == pytest.approx(expected)
@@ -0,0 +1,46 @@
+"""Model registry ID validation."""
+
+import os
+
+import pytest
+
+from model_registry import delete_model, load_model
+
+
+def _saved(registry_dir, model_id):
+    os.makedirs(os.path.join(registry_dir, model_id))
+    with open(os.path.join(registry_dir, model_id, "meta.json"), "w") as f:
+        f.write("{}")
+
+
+def test_delete_model_removes_saved_model(tmp_path):
+    _saved(str(tmp_path), "sales-20240101")
+    delete_model("sales-20240101", registry_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize("model_id", ["", ".", "..", "../models", "a/b", "a/../b", os.sep + "tmp"])
+def test_invalid_model_ids_are_rejected(tmp_path, model_id):
+    registry_dir = tmp_path / "models"
+    _saved(str(tmp_path), "outside")
+    registry_dir.mkdir()
+    with pytest.raises(ValueError):
+        delete_model(model_id, registry_dir=str(registry_dir))
+    with pytest.raises(ValueError):
+        load_model(model_id, registry_dir=str(registry_dir))
+    assert os.path.isdir(tmp_path / "outside")
+
+
+def test_symlink_out_of_registry_is_rejected(tmp_path):
+    registry_dir = tmp_path / "models"
+    registry_dir.mkdir()
+    _saved(str(tmp_path), "outside")
+    os.symlink(tmp_path / "outside", registry_dir / "link")
+    with pytest.raises(ValueError):
+        delete_model("link", registry_dir=str(registry_dir))
+    assert os.path.isdir(tmp_path / "outside")
+
+
+def test_delete_missing_model_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        delete_model("missing", registry_dir=str(tmp_path))
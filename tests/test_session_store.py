@@ -0,0 +1,47 @@
+"""Compact forecast storage and export precision."""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from forecast_export import ExportCache, export_bytes
+from session_store import ArtifactStore, compact_forecast, expand_forecast
+
+
+def _forecast():
+    n = 5
+    yhat = 12345678.91 + np.arange(n)
+    return pd.DataFrame({
+        "ds": pd.date_range("2024-01-01", periods=n, freq="D"),
+        "trend": yhat - 0.25,
+        "yhat_lower": yhat - 1000.5,
+        "yhat_upper": yhat + 1000.5,
+        "weekly": np.linspace(-1.5, 1.5, n),
+        "weekly_lower": np.linspace(-1.5, 1.5, n),
+        "weekly_upper": np.linspace(-1.5, 1.5, n),
+        "yhat": yhat,
+    })
+
+
+def test_compact_keeps_forecast_precision():
+    forecast = _forecast()
+    compact = compact_forecast(forecast)
+    for col in ("yhat", "yhat_lower", "yhat_upper", "trend"):
+        assert compact[col].dtype == np.float64
+        np.testing.assert_array_equal(compact[col], forecast[col])
+    # Components are stored as float32 and their copied bounds dropped
+    assert compact["weekly"].dtype == np.float32
+    assert "weekly_lower" not in compact
+    assert "weekly_lower" in expand_forecast(compact)
+
+
+def test_large_yhat_round_trips_through_store_and_export():
+    forecast = _forecast()
+    store = ArtifactStore()
+    stored = store.get(store.put(compact_forecast(forecast), "forecast"))
+    data = export_bytes(ExportCache(), "large-yhat", stored, "csv", ["yhat", "yhat_lower", "yhat_upper"])
+    exported = pd.read_csv(io.BytesIO(data))
+    assert "12345678.91" in data.decode()
+    np.testing.assert_array_equal(exported["yhat"], forecast["yhat"])
+    np.testing.assert_array_equal(exported["yhat_upper"], forecast["yhat_upper"])
@@ -0,0 +1,38 @@
+"""Chunked streaming prediction."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_engine import fit_prophet, quiet_stan_logging
+from streaming_predict import predict_chunks
+from uncertainty import predict_point
+
+
+@pytest.fixture(scope="module")
+def model():
+    quiet_stan_logging()
+    ds = pd.date_range("2022-01-01", periods=400, freq="D")
+    y = 10 + np.sin(np.arange(400) / 7) + np.random.default_rng(0).normal(0, 0.3, 400)
+    return fit_prophet(pd.DataFrame({"ds": ds, "y": y}), {"uncertainty_samples": 200}, 90, "D")
+
+
+def _stream(model):
+    return pd.concat(predict_chunks(model, 90, "D", chunk_rows=32), ignore_index=True)
+
+
+def test_seeding_twice_gives_identical_bounds(model):
+    np.random.seed(5)
+    first = _stream(model)
+    np.random.seed(5)
+    pd.testing.assert_frame_equal(first, _stream(model))
+
+
+def test_chunks_match_point_forecast(model):
+    streamed = _stream(model)
+    future = model.make_future_dataframe(periods=90, include_history=False)
+    point = predict_point(model, future)
+    assert list(streamed.columns) == list(model.predict(future).columns)
+    np.testing.assert_allclose(streamed["yhat"], point["yhat"])
+    assert (streamed["yhat_lower"] < streamed["yhat"]).all()
+    assert (streamed["yhat"] < streamed["yhat_upper"]).all()
@@ -0,0 +1,25 @@
+"""Tuning result ranking."""
+
+import numpy as np
+
+from tuning import rank_results
+
+
+def _result(mape, rmse):
+    return {
+        "params": {"changepoint_prior_scale": rmse},
+        "mape": mape, "rmse": rmse, "mae": rmse,
+        "seconds": 1.0, "error": None,
+    }
+
+
+def test_ranked_by_mape():
+    table = rank_results([_result(0.3, 1.0), _result(0.1, 2.0)])
+    assert table.attrs["ranked_by"] == "mape"
+    assert list(table["mape"]) == [0.1, 0.3]
+
+
+def test_falls_back_to_rmse_without_mape():
+    table = rank_results([_result(np.nan, 2.0), _result(np.nan, 1.0)])
+    assert table.attrs["ranked_by"] == "rmse"
+    assert list(table["rmse"]) == [1.0, 2.0]
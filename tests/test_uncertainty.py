@@ -0,0 +1,42 @@
+"""Two-phase predict: reproducible intervals and reuse of the point forecast."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_engine import fit_prophet, quiet_stan_logging
+from uncertainty import predict_forecast, predict_intervals
+
+
+@pytest.fixture(scope="module")
+def model():
+    quiet_stan_logging()
+    ds = pd.date_range("2022-01-01", periods=400, freq="D")
+    y = 10 + np.sin(np.arange(400) / 7) + np.random.default_rng(0).normal(0, 0.3, 400)
+    return fit_prophet(pd.DataFrame({"ds": ds, "y": y}), {"uncertainty_samples": 200}, 60, "D")
+
+
+def test_seeding_twice_gives_identical_bounds(model):
+    future = model.make_future_dataframe(periods=60)
+    np.random.seed(42)
+    first = predict_intervals(model, future, chunk_rows=64)
+    np.random.seed(42)
+    second = predict_intervals(model, future, chunk_rows=64)
+    pd.testing.assert_frame_equal(first, second)
+    np.random.seed(43)
+    assert not predict_intervals(model, future, chunk_rows=64)["yhat_upper"].equals(first["yhat_upper"])
+
+
+def test_point_forecast_reused_for_intervals(model):
+    future = model.make_future_dataframe(periods=60)
+    points = []
+    np.random.seed(7)
+    forecast = predict_forecast(model, future, on_point_forecast=points.append)
+    np.random.seed(7)
+    expected = predict_intervals(model, future)
+    pd.testing.assert_frame_equal(forecast, expected)
+    assert list(forecast.columns) == list(model.predict(future).columns)
+    # Point columns are carried over unchanged; only the bounds are added
+    point = points[0]
+    assert "yhat_lower" not in point
+    pd.testing.assert_frame_equal(forecast[point.columns], point)
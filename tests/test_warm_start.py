@@ -0,0 +1,51 @@
+"""Warm-started refits fall back to a cold start when parameter shapes change."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_engine import quiet_stan_logging
+from warm_start import warm_fit
+
+
+def _series(days):
+    ds = pd.date_range("2021-01-01", periods=days, freq="D")
+    rng = np.random.default_rng(1)
+    y = 50 + 0.05 * np.arange(days) + 3 * np.sin(2 * np.pi * ds.dayofweek / 7) + rng.normal(0, 0.5, days)
+    return pd.DataFrame({"ds": ds, "y": y})
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    quiet_stan_logging()
+
+
+def _refit(tmp_path, model_params, first_rows, second_rows):
+    history = _series(second_rows)
+    state_dir = str(tmp_path)
+    _, cold_rows = warm_fit(history.iloc[:first_rows], model_params, 7, "D", state_dir=state_dir)
+    assert cold_rows == 0
+    return warm_fit(history, model_params, 7, "D", state_dir=state_dir)
+
+
+def test_same_shapes_warm_start(tmp_path):
+    params = {"uncertainty_samples": 0}
+    m, warm_rows = _refit(tmp_path, params, 400, 420)
+    assert warm_rows == 400
+    assert m.params["beta"].shape[1] == len(m.train_component_cols)
+
+
+def test_changepoint_count_change_cold_starts(tmp_path):
+    # Short histories get fewer than n_changepoints changepoints
+    params = {"uncertainty_samples": 0, "yearly_seasonality": False}
+    m, warm_rows = _refit(tmp_path, params, 20, 30)
+    assert warm_rows == 0
+    assert len(m.changepoints) > 15
+
+
+def test_seasonality_change_cold_starts(tmp_path):
+    # Automatic yearly seasonality switches on once two years of history exist
+    params = {"uncertainty_samples": 0, "yearly_seasonality": "auto"}
+    m, warm_rows = _refit(tmp_path, params, 700, 740)
+    assert warm_rows == 0
+    assert "yearly" in m.seasonalities
@@ -0,0 +1,152 @@
+"""
+Parallel hyperparameter search with rolling-origin cross-validation.
+Each grid point is evaluated with prophet.diagnostics.cross_validation /
+performance_metrics in a worker process; the number of concurrent fits is
+capped and a search can be stopped early (by closing the result generator)
+or bounded by a time budget.
+"""
+
+import itertools
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from batch_forecast import default_worker_count
+from fit_backend import fit_model
+from forecast_engine import build_model, holiday_year_span, quiet_stan_logging
+
+# Parameters that can be tuned from the Advanced Options panel
+TUNABLE_PARAMS = [
+    "changepoint_prior_scale",
+    "changepoint_range",
+    "seasonality_prior_scale",
+    "holidays_prior_scale",
+]
+
+# Prior scales span orders of magnitude, so their grids are log-spaced
+LOG_SCALE_PARAMS = {"changepoint_prior_scale", "seasonality_prior_scale", "holidays_prior_scale"}
+
+METRICS = ["mape", "rmse", "mae"]
+
+
+def param_values(name, low, high, steps):
+    """Grid values for one parameter between low and high (inclusive)."""
+    if steps <= 1 or low == high:
+        return [float(low)]
+    if name in LOG_SCALE_PARAMS and low > 0:
+        values = np.geomspace(low, high, steps)
+    else:
+        values = np.linspace(low, high, steps)
+    return [float(round(v, 4)) for v in values]
+
+
+def build_param_grid(ranges, steps):
+    """Cartesian grid from {param: (low, high)}; returns a list of param dicts."""
+    names = list(ranges)
+    axes = [param_values(name, *ranges[name], steps) for name in names]
+    return [dict(zip(names, combo)) for combo in itertools.product(*axes)]
+
+
+def default_cv_windows(prepared_df):
+    """Reasonable (initial, period, horizon) in days for the data's span."""
+    span_days = max(1.0, (prepared_df['ds'].max() - prepared_df['ds'].min()) / pd.Timedelta(days=1))
+    horizon = max(1, int(span_days * 0.1))
+    initial = max(horizon * 3, int(span_days * 0.5))
+    period = max(1, horizon // 2)
+    return initial, period, horizon
+
+
+def evaluate_config(prepared_df, model_params, cv_windows, country_code=None, holidays_df=None):
+    """Fit one configuration and score it with rolling-origin cross-validation.
+
+    Returns a dict with the params, metrics, seconds and error.
+    """
+    from prophet.diagnostics import cross_validation, performance_metrics
+
+    quiet_stan_logging()
+    start = time.perf_counter()
+    result = {"params": model_params, "seconds": 0.0, "error": None}
+    result.update({metric: math.nan for metric in METRICS})
+    try:
+        initial, period, horizon = cv_windows
+        # Scoring only uses the point forecast, so skip interval simulation
+        m = build_model({**model_params, "uncertainty_samples": 0},
+                        country_code=country_code, holidays_df=holidays_df,
+                        holiday_years=holiday_year_span(prepared_df))
+        fit_model(m, prepared_df, model_params)
+        df_cv = cross_validation(
+            m,
+            initial=f"{initial} days",
+            period=f"{period} days",
+            horizon=f"{horizon} days",
+            disable_tqdm=True
+        )
+        df_p = performance_metrics(df_cv, rolling_window=1)
+        for metric in METRICS:
+            if metric in df_p.columns:
+                result[metric] = float(df_p[metric].iloc[0])
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_tuning(prepared_df, base_params, grid, cv_windows, country_code=None, holidays_df=None,
+               max_workers=None, time_budget=None):
+    """Evaluate every grid point on a process pool.
+
+    Generator: yields one result per configuration as it completes. At most
+    max_workers fits run at once. The search stops early (pending configs are
+    dropped) when the generator is closed - e.g. when a Streamlit rerun
+    interrupts the loop consuming it - or time_budget seconds have elapsed.
+    """
+    max_workers = max(1, min(max_workers or default_worker_count(), len(grid) or 1))
+    deadline = time.monotonic() + time_budget if time_budget else None
+
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {
+            executor.submit(
+                evaluate_config, prepared_df, {**base_params, **params}, cv_windows,
+                country_code, holidays_df
+            )
+            for params in grid
+        }
+        while pending:
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    return
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        # Drop queued configs; running fits finish in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def rank_results(results, metric="mape"):
+    """Results as a table sorted by metric (best first), failures last.
+
+    Falls back to RMSE when metric is undefined for every result (MAPE with
+    zero actuals); the metric used is in the table's attrs["ranked_by"].
+    """
+    rows = []
+    for r in results:
+        row = {name: r["params"].get(name) for name in TUNABLE_PARAMS}
+        row.update({m: r[m] for m in METRICS})
+        row["seconds"] = round(r["seconds"], 1)
+        row["error"] = r["error"] or ""
+        rows.append(row)
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    sort_metric = metric if table[metric].notna().any() else "rmse"
+    ranked = table.sort_values(sort_metric, na_position="last").reset_index(drop=True)
+    ranked.attrs["ranked_by"] = sort_metric
+    return ranked
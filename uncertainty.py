@@ -0,0 +1,151 @@
+"""
+Tiered uncertainty intervals.
+The point forecast (yhat and components) is cheap; the intervals come from
+simulating future trend paths and observation noise, which dominates predict
+time on long horizons. Forecasts are produced in two phases - point forecast
+first, intervals second - and the simulation is vectorized per row chunk and
+spread over a thread pool.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Tier -> Prophet uncertainty_samples
+UNCERTAINTY_TIERS = {
+    "none": 0,
+    "fast": 200,
+    "full": 1000,
+}
+
+# Rows simulated per task; bounds each task's working set to samples x rows
+DEFAULT_CHUNK_ROWS = 2048
+
+INTERVAL_COLUMNS = ['yhat_lower', 'yhat_upper', 'trend_lower', 'trend_upper']
+
+
+def predict_point(m, future):
+    """Forecast without uncertainty intervals (no simulation); same as m.predict with 0 samples."""
+    df = m.setup_dataframe(future.copy())
+    df['trend'] = m.predict_trend(df)
+    return assemble_forecast(m, df, None, m.predict_seasonal_components(df))
+
+
+def global_entropy():
+    """Seed drawn from NumPy's global generator, so np.random.seed makes intervals reproducible."""
+    return int(np.random.randint(2**32, dtype=np.uint64))
+
+
+def interval_bounds(m, trends, xb_a, xb_m, rng):
+    """yhat/trend interval bounds from trend paths (samples x rows) plus observation noise."""
+    lower_p = 100 * (1.0 - m.interval_width) / 2
+    upper_p = 100 * (1.0 + m.interval_width) / 2
+    noise = rng.normal(0, m.params['sigma_obs'][0], trends.shape) * m.y_scale
+    yhat = trends * (1 + xb_m) + xb_a + noise
+    yhat_lower, yhat_upper = m.percentile(yhat, [lower_p, upper_p], axis=0)
+    trend_lower, trend_upper = m.percentile(trends, [lower_p, upper_p], axis=0)
+    return yhat_lower, yhat_upper, trend_lower, trend_upper
+
+
+def _interval_chunk(m, rows, future_trends, future_offset, trend, xb_a, xb_m, n_samples, seed):
+    """yhat/trend percentiles for one contiguous block of rows."""
+    start, stop = rows
+    if stop <= future_offset:
+        # History rows carry no trend uncertainty
+        trends = np.broadcast_to(trend[start:stop], (n_samples, stop - start))
+    else:
+        trends = future_trends[:, start - future_offset:stop - future_offset]
+    return interval_bounds(
+        m, trends, xb_a[start:stop], xb_m[start:stop], np.random.default_rng(seed)
+    )
+
+
+def _simulate_intervals(m, future, point, max_workers=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Vectorized equivalent of Prophet's predict_uncertainty for MAP fits.
+
+    Works from the point forecast: its trend and additive/multiplicative
+    terms are the deterministic parts of every simulated path.
+    """
+    trend = point['trend'].to_numpy()
+    xb_a = point['additive_terms'].to_numpy()
+    xb_m = point['multiplicative_terms'].to_numpy()
+    n_samples = int(m.uncertainty_samples)
+
+    # Future trend paths are cumulative from the end of history, so they are
+    # simulated once over the whole horizon and sliced per chunk
+    history_end = m.history['ds'].max()
+    future_offset = int((point['ds'] <= history_end).sum())
+    if future_offset < len(point):
+        future_rows = future[pd.to_datetime(future['ds']) > history_end]
+        future_trends = m.sample_predictive_trend_vectorized(
+            m.setup_dataframe(future_rows.copy()), n_samples, 0
+        )
+    else:
+        future_trends = None
+
+    # Row chunks never straddle the history/future boundary
+    chunks = [
+        (start, min(start + chunk_rows, future_offset)) for start in range(0, future_offset, chunk_rows)
+    ] + [
+        (start, min(start + chunk_rows, len(point))) for start in range(future_offset, len(point), chunk_rows)
+    ]
+    seeds = np.random.SeedSequence(global_entropy()).spawn(len(chunks))
+
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(
+            lambda args: _interval_chunk(
+                m, args[0], future_trends, future_offset, trend, xb_a, xb_m, n_samples, args[1]
+            ),
+            zip(chunks, seeds)
+        ))
+
+    return pd.DataFrame({
+        name: np.concatenate([part[i] for part in parts]) for i, name in enumerate(INTERVAL_COLUMNS)
+    })
+
+
+def predict_intervals(m, future, max_workers=None, chunk_rows=DEFAULT_CHUNK_ROWS, point=None):
+    """Full forecast (same columns as m.predict) with chunked interval simulation.
+
+    point, the predict_point frame for future if already computed, is reused
+    so only the interval bounds are added. MCMC fits and models without
+    uncertainty samples fall back to m.predict.
+    """
+    if not m.uncertainty_samples:
+        return point if point is not None else m.predict(future)
+    if m.mcmc_samples:
+        return m.predict(future)
+
+    if point is None:
+        point = predict_point(m, future)
+    intervals = _simulate_intervals(m, future, point, max_workers=max_workers, chunk_rows=chunk_rows)
+    # m.predict's column order: ds, trend, [cap], [floor], intervals, components, yhat
+    n_leading = 2 + ('cap' in point) + bool(m.logistic_floor)
+    return pd.concat((point.iloc[:, :n_leading], intervals, point.iloc[:, n_leading:]), axis=1)
+
+
+def assemble_forecast(m, df, intervals, seasonal_components):
+    """Forecast frame in m.predict's column order from its parts (intervals may be None)."""
+    cols = ['ds', 'trend']
+    if 'cap' in df:
+        cols.append('cap')
+    if m.logistic_floor:
+        cols.append('floor')
+    forecast = pd.concat((df[cols], intervals, seasonal_components), axis=1)
+    forecast['yhat'] = (
+        forecast['trend'] * (1 + forecast['multiplicative_terms'])
+        + forecast['additive_terms']
+    )
+    return forecast
+
+
+def predict_forecast(m, future, on_point_forecast=None, max_workers=None):
+    """Two-phase predict: on_point_forecast(point_df) is called before intervals are computed."""
+    point = None
+    if on_point_forecast is not None and m.uncertainty_samples:
+        point = predict_point(m, future)
+        on_point_forecast(point)
+    return predict_intervals(m, future, max_workers=max_workers, point=point)
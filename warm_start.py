@@ -0,0 +1,178 @@
+"""
+Warm-started incremental refits.
+After each fit the model is persisted together with a fingerprint of its
+training history. When a later upload extends that history (same rows plus
+new ones, same model settings) the Stan optimizer is initialised from the
+previous fit's parameters (k, m, delta, beta, sigma_obs) instead of defaults.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+from prophet.serialize import model_to_json, model_from_json
+
+from forecast_cache import CACHE_DIR, fingerprint_frame
+from fit_backend import fit_model
+from forecast_engine import build_model, holiday_year_span
+from uncertainty import predict_forecast
+
+WARM_START_DIR = os.path.join(CACHE_DIR, "warm_start")
+
+# Stored fit states kept per model configuration (oldest removed first)
+MAX_STATES_PER_CONFIG = 20
+
+
+def config_key(model_params, country_code=None, holidays_df=None):
+    """Hash of everything that determines the shape of the Stan parameters."""
+    payload = {
+        "params": model_params,
+        "country": country_code,
+        "holidays": fingerprint_frame(holidays_df),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def warm_start_params(m):
+    """Initial values for Stan taken from a fitted model."""
+    res = {}
+    for pname in ['k', 'm', 'sigma_obs']:
+        if m.mcmc_samples == 0:
+            res[pname] = m.params[pname][0][0]
+        else:
+            res[pname] = np.mean(m.params[pname])
+    for pname in ['delta', 'beta']:
+        if m.mcmc_samples == 0:
+            res[pname] = m.params[pname][0]
+        else:
+            res[pname] = np.mean(m.params[pname], axis=0)
+    return res
+
+
+def init_shapes_match(init, model_inputs):
+    """Whether warm-start inits have the Stan parameter shapes of model_inputs (Prophet.preprocess).
+
+    Prophet silently replaces inits of the wrong shape with its defaults, so
+    a mismatch has to be caught before fitting to avoid reporting a warm
+    start that did not happen.
+    """
+    return (
+        all(np.ndim(init[pname]) == 0 for pname in ['k', 'm', 'sigma_obs'])
+        and np.shape(init['delta']) == (model_inputs.S,)
+        and np.shape(init['beta']) == (model_inputs.K,)
+    )
+
+
+def save_fit_state(prepared_df, model, key, state_dir=WARM_START_DIR):
+    """Persist a fitted model keyed by the fingerprint of its history."""
+    config_dir = os.path.join(state_dir, key)
+    os.makedirs(config_dir, exist_ok=True)
+    state = {
+        "rows": len(prepared_df),
+        "last_ds": str(prepared_df['ds'].max()),
+        "history": fingerprint_frame(prepared_df),
+        "saved_at": time.time(),
+        "model": model_to_json(model),
+    }
+    path = os.path.join(config_dir, f"{state['history']}.json")
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+    # Keep only the most recent states for this configuration
+    states = sorted(
+        (os.path.join(config_dir, name) for name in os.listdir(config_dir) if name.endswith(".json")),
+        key=os.path.getmtime
+    )
+    for old_path in states[:-MAX_STATES_PER_CONFIG]:
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+
+
+def find_previous_fit(prepared_df, key, state_dir=WARM_START_DIR):
+    """Return the stored model whose history is a strict prefix of prepared_df.
+
+    The longest matching prefix wins. Returns (model, rows) or (None, 0).
+    """
+    config_dir = os.path.join(state_dir, key)
+    if not os.path.isdir(config_dir):
+        return None, 0
+
+    candidates = []
+    for name in os.listdir(config_dir):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(config_dir, name), "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if 0 < state["rows"] < len(prepared_df):
+            candidates.append(state)
+
+    for state in sorted(candidates, key=lambda s: s["rows"], reverse=True):
+        prefix = prepared_df.iloc[:state["rows"]]
+        if fingerprint_frame(prefix) == state["history"]:
+            return model_from_json(state["model"]), state["rows"]
+    return None, 0
+
+
+def warm_fit(prepared_df, model_params, forecast_periods, forecast_freq,
+             country_code=None, holidays_df=None, state_dir=WARM_START_DIR):
+    """Fit that warm-starts from a previous fit of the same series; no predict.
+
+    Returns (model, warm_rows) where warm_rows is the number of history rows
+    covered by the model used as the starting point (0 for a cold start).
+    The new fit is persisted for the next refresh.
+    """
+    key = config_key(model_params, country_code, holidays_df)
+    previous, warm_rows = find_previous_fit(prepared_df, key, state_dir)
+    years = holiday_year_span(prepared_df, forecast_periods, forecast_freq)
+
+    m = build_model(model_params, country_code=country_code, holidays_df=holidays_df,
+                    holiday_years=years)
+    init = None
+    if previous is not None:
+        init = warm_start_params(previous)
+        probe = build_model(model_params, country_code=country_code, holidays_df=holidays_df,
+                            holiday_years=years)
+        if not init_shapes_match(init, probe.preprocess(prepared_df)):
+            # Parameter shapes changed (e.g. new holidays in range, more changepoints): cold start
+            init, warm_rows = None, 0
+
+    if init is not None:
+        fit_model(m, prepared_df, model_params, init=init)
+    else:
+        fit_model(m, prepared_df, model_params)
+
+    try:
+        save_fit_state(prepared_df, m, key, state_dir)
+    except OSError:
+        pass
+    return m, warm_rows
+
+
+def warm_fit_forecast(prepared_df, model_params, forecast_periods, forecast_freq,
+                      country_code=None, holidays_df=None, state_dir=WARM_START_DIR,
+                      on_point_forecast=None, on_stage=None):
+    """fit_forecast that warm-starts from a previous fit of the same series.
+
+    Returns (model, forecast, warm_rows); see warm_fit.
+    """
+    if on_stage is not None:
+        on_stage("fitting")
+    m, warm_rows = warm_fit(
+        prepared_df, model_params, forecast_periods, forecast_freq,
+        country_code=country_code, holidays_df=holidays_df, state_dir=state_dir
+    )
+
+    if on_stage is not None:
+        on_stage("predicting")
+    future = m.make_future_dataframe(periods=forecast_periods, freq=forecast_freq)
+    forecast = predict_forecast(m, future, on_point_forecast=on_point_forecast)
+    return m, forecast, warm_rows